@@ -0,0 +1,70 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# compara a árvore concreta montada com o Tree do nani (com __dict__) e com o Tree de __slots__
+# do compilador: memória por nó e tempo para percorrer a árvore inteira
+# uso: python benchmarks/bench_arvore.py [numero de funções]
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import compilador
+import nani
+from gera_programa import geraPrograma
+
+TreeCompacto = compilador.Tree
+
+
+def montaArvore(parser, data, classe):
+    # as ações do parser buscam o nome Tree no módulo na hora de criar o nó
+    compilador.Tree = classe
+    fluxo = compilador.FluxoTokens(compilador.AnalisadorRapido())
+    fluxo.input(data)
+    for _ in fluxo:
+        pass
+    tracemalloc.start()
+    arvore = parser.parse(fluxo)
+    memoria, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    compilador.Tree = TreeCompacto
+    return arvore, memoria
+
+
+# percorre como os passes do compilador percorrem: lê type, leaf e children de todos os nós
+def percorre(arvore):
+    nos = 0
+    pilha = [arvore]
+    while pilha:
+        no = pilha.pop()
+        nos += 1
+        if no.type == 'var' and no.leaf is None:
+            pass
+        pilha.extend(no.children)
+    return nos
+
+
+def mede(arvore, repeticoes=5):
+    melhor = None
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        percorre(arvore)
+        tempo = time.perf_counter() - inicio
+        melhor = tempo if melhor is None else min(melhor, tempo)
+    return melhor
+
+
+if __name__ == '__main__':
+    numero_funcoes = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    _, parser_yacc = compilador.constroiAnalisadores()
+    parser = compilador.ParserDescendente(parser_yacc)
+    programa = geraPrograma(numero_funcoes)
+
+    for nome, classe in (('nani.Tree', nani.Tree), ('slots', TreeCompacto)):
+        arvore, memoria = montaArvore(parser, programa, classe)
+        nos = percorre(arvore)
+        tempo = mede(arvore)
+        print("%-10s %8d nós %8.1f MB %6.1f bytes/nó   percurso %7.1f ms (%5.0f ns/nó)" % (
+            nome, nos, memoria / 1e6, memoria / nos, tempo * 1000, tempo * 1e9 / nos))
+        del arvore
@@ -0,0 +1,92 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# mede o cache de árvores (--cache-ast): tempo do léxico + sintático + semântico contra o tempo de
+# carregar a entrada do cache, tamanho da entrada em disco, e confere a poda LRU
+# uso: python benchmarks/bench_cache_arvore.py [numero de funções]
+import contextlib
+import io
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+from comum import melhorTempo, mesmaArvore, reiniciaGlobais
+from gera_programa import geraPrograma
+
+import compilador
+
+
+# léxico, sintático e semântico como o driver faz com --reducao-direta
+def analisa(parser, data):
+    reiniciaGlobais(compilador)
+    compilador.ARVORE_REDUZIDA = True
+    fluxo = compilador.FluxoTokens(compilador.AnalisadorRapido())
+    fluxo.input(data)
+    saida = io.StringIO()
+    with contextlib.redirect_stdout(saida):
+        arvore = compilador.ParserDescendente(parser).parse(fluxo)
+        compilador.recomecoReduzida(arvore)
+        compilador.verificaTipoRetornaReduzida(arvore)
+        compilador.tabela_raiz.procuraPelaMain()
+        compilador.tabela_raiz.verificaVariaveisNaoUtilizadas()
+        compilador.diagnosticos.escreve()
+    compilador.ARVORE_REDUZIDA = False
+    return arvore, saida.getvalue()
+
+
+if __name__ == '__main__':
+    numero_funcoes = int(sys.argv[1]) if len(sys.argv) > 1 else 300
+    _, parser = compilador.constroiAnalisadores()
+    programa = geraPrograma(numero_funcoes)
+    fonte = programa.encode('utf-8')
+    diretorio = tempfile.mkdtemp(prefix='cache-arvores-')
+    try:
+        def compilaDoZero():
+            return analisa(parser, programa)
+
+        def carrega():
+            chave = compilador.chaveCacheArvore(fonte, True)
+            return compilador.carregaCacheArvore(diretorio, chave)
+
+        tempo_analise = melhorTempo(compilaDoZero)
+        arvore, saida = compilaDoZero()
+        chave = compilador.chaveCacheArvore(fonte, True)
+        compilador.salvaCacheArvore(diretorio, chave, arvore, compilador.tabela_raiz, compilador.diagnosticos)
+        tempo_carga = melhorTempo(carrega)
+        entrada = carrega()
+
+        tabelas = io.StringIO()
+        with contextlib.redirect_stdout(tabelas):
+            compilador.tabela_raiz.printaArvore()
+        tabelas_cache = io.StringIO()
+        with contextlib.redirect_stdout(tabelas_cache):
+            entrada['tabelas'].printaArvore()
+        do_cache = compilador.Diagnosticos()
+        do_cache.adicionaSerializados(entrada['diagnosticos'])
+        if not mesmaArvore(arvore, entrada['arvore']) or do_cache.formata() != saida or \
+                tabelas.getvalue() != tabelas_cache.getvalue():
+            print("A entrada do cache não reproduz a análise")
+            sys.exit(1)
+
+        tamanho = os.path.getsize(os.path.join(diretorio, chave + '.ast'))
+        print("entrada: %d funções, %.1f KB de fonte" % (numero_funcoes, len(fonte) / 1024))
+        print("léxico + sintático + semântico: %8.1f ms" % (tempo_analise * 1000))
+        print("carga do cache:                 %8.1f ms  (%.1f KB em disco)" % (tempo_carga * 1000, tamanho / 1024))
+        print("ganho:                          %8.1fx" % (tempo_analise / tempo_carga))
+
+        # LRU: com limite para ~2 entradas, a menos usada recentemente é a que sai
+        limite = 2.5 * tamanho / (1024 * 1024)
+        for i in range(3):
+            compilador.salvaCacheArvore(diretorio, 'extra%d' % i, arvore, compilador.tabela_raiz,
+                                        compilador.diagnosticos, limite)
+            if i == 1:
+                time.sleep(0.01)
+                os.utime(os.path.join(diretorio, 'extra0.ast'))  # extra0 usada de novo
+            time.sleep(0.01)
+        restantes = sorted(nome for nome in os.listdir(diretorio) if nome.endswith('.ast'))
+        print("poda LRU: restaram %s" % ', '.join(restantes))
+        if restantes != ['extra0.ast', 'extra2.ast']:
+            sys.exit(1)
+    finally:
+        shutil.rmtree(diretorio)
@@ -0,0 +1,72 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# mede a análise semântica com a escrita dos erros e avisos num programa que gera dezenas de milhares
+# deles, contra uma versão anterior do compilador.py (que fazia um print por mensagem) e confere que
+# a saída em texto é a mesma. A saída vai para um arquivo com buffer de linha, como um terminal: um
+# print por mensagem é uma escrita por linha, o coletor de diagnósticos escreve tudo de uma vez.
+# Também mede a saída em json e com todos os avisos suprimidos
+# uso: python benchmarks/bench_diagnosticos.py <compilador.py de referência> [numero de funções]
+#      git show HEAD~1:compilador.py > /tmp/referencia.py
+#      python benchmarks/bench_diagnosticos.py /tmp/referencia.py 5000
+import contextlib
+import io
+import os
+import sys
+import tempfile
+
+from comum import DIRETORIO, carregaCompilador, fluxoDe, melhorTempo, reiniciaGlobais
+from gera_programa import geraProgramaAvisos
+
+
+def analisa(compilador, arvore, saida, **opcoes):
+    reiniciaGlobais(compilador)
+    with contextlib.redirect_stdout(saida):
+        compilador.recomecoReduzida(arvore)
+        compilador.verificaTipoRetornaReduzida(arvore)
+        compilador.tabela_raiz.procuraPelaMain()
+        compilador.tabela_raiz.verificaVariaveisNaoUtilizadas()
+        if hasattr(compilador, 'diagnosticos'):
+            compilador.diagnosticos.escreve(**opcoes)
+    saida.flush()
+
+
+def arvoreReduzida(compilador, programa):
+    _, parser = compilador.constroiAnalisadores()
+    compilador.ARVORE_REDUZIDA = True
+    with contextlib.redirect_stdout(io.StringIO()):
+        arvore = parser.parse(lexer=fluxoDe(compilador, programa))
+    compilador.ARVORE_REDUZIDA = False
+    return arvore
+
+
+def mede(compilador, arvore, **opcoes):
+    with tempfile.TemporaryFile('w', buffering=1, encoding='utf-8') as terminal:
+        return melhorTempo(lambda: analisa(compilador, arvore, terminal, **opcoes), 3)
+
+
+if __name__ == '__main__':
+    if len(sys.argv) < 2:
+        print("uso: python benchmarks/bench_diagnosticos.py <compilador.py de referência> [numero de funções]")
+        sys.exit(2)
+    numero_funcoes = int(sys.argv[2]) if len(sys.argv) > 2 else 5000
+    atual = carregaCompilador('compilador', os.path.join(DIRETORIO, 'compilador.py'))
+    referencia = carregaCompilador('compilador_referencia', sys.argv[1])
+    programa = geraProgramaAvisos(numero_funcoes)
+    arvore = arvoreReduzida(atual, programa)
+    arvore_ref = arvoreReduzida(referencia, programa)
+
+    saidas = []
+    for compilador, arvore_versao in ((atual, arvore), (referencia, arvore_ref)):
+        saida = io.StringIO()
+        analisa(compilador, arvore_versao, saida)
+        saidas.append(saida.getvalue())
+    if saidas[0] != saidas[1]:
+        print("As duas versões não produzem as mesmas mensagens")
+        sys.exit(1)
+    avisos = [codigo for codigo, (_, severidade) in atual.CODIGOS_DIAGNOSTICO.items() if severidade == 'aviso']
+
+    print("entrada: %d funções, %d mensagens" % (numero_funcoes, saidas[0].count('\n')))
+    print("print por mensagem (referência): %8.1f ms" % (mede(referencia, arvore_ref) * 1000))
+    print("coletor, texto:                  %8.1f ms" % (mede(atual, arvore) * 1000))
+    print("coletor, json:                   %8.1f ms" % (mede(atual, arvore, formato='json') * 1000))
+    print("coletor, avisos suprimidos:      %8.1f ms" % (mede(atual, arvore, suprimidos=avisos) * 1000))
@@ -0,0 +1,68 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# mede o tempo do módulo gerado pelo KodoGen até o executável: o caminho antigo do --run (grava o
+# meu_modulo.ll e chama llvm-as, llc e gcc) contra a emissão no processo (emiteModulo pelo
+# llvmlite.binding e só o gcc para ligar), com o gerador de código no mesmo nível de otimização nos
+# dois (-O0 e -O2, o padrão do llc). Confere que os executáveis escrevem a mesma saída. O llc e o
+# llvmlite podem ser de versões diferentes do LLVM: o tempo do gerador de código entra nos dois
+# uso: python benchmarks/bench_emissao.py [numero de funções]
+import os
+import subprocess
+import sys
+import tempfile
+
+from comum import DIRETORIO, carregaCompilador, melhorTempo
+from gera_programa import geraPrograma
+
+
+# módulo como o driver gera: com a análise semântica antes, que liga os nomes às declarações (o KodoGen
+# precisa delas para deixar os escalares locais em SSA)
+def modulo(compilador, programa):
+    return compilador.CompilerSession(reducao_direta=True).compile(programa).modulo
+
+
+def porSubprocessos(compilador, mod, nivel):
+    with open('meu_modulo.ll', 'w') as arquivo:
+        arquivo.write(str(mod))
+    subprocess.check_call(['llvm-as', 'meu_modulo.ll', '-o', 'meu_modulo.bc'])
+    subprocess.check_call(['llc', '-O%d' % nivel, 'meu_modulo.bc', '-o', 'meu_modulo.s',
+                           '--mtriple', compilador.TRIPLO_ALVO])
+    subprocess.check_call(['gcc', 'meu_modulo.s', '-o', 'exec', '-no-pie', '-Wl,--defsym=main=principal'])
+
+
+def noProcesso(compilador, mod, nivel):
+    compilador.emiteModulo(mod, 'meu_modulo.o', nivel=nivel)
+    if compilador.ligaExecutavel('meu_modulo.o') != 0:
+        raise RuntimeError("gcc falhou")
+
+
+def executa(entrada):
+    return subprocess.run(['./exec'], input=entrada, capture_output=True, text=True).stdout
+
+
+if __name__ == '__main__':
+    numero_funcoes = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    compilador = carregaCompilador('compilador', os.path.join(DIRETORIO, 'compilador.py'))
+    mod = modulo(compilador, geraPrograma(numero_funcoes))
+    print("entrada: %d funções" % numero_funcoes)
+    diretorio = os.getcwd()
+    with tempfile.TemporaryDirectory() as temporario:
+        os.chdir(temporario)
+        try:
+            for nivel in (0, 2):
+                compilador.maquinaAlvo(nivel)  # cada máquina alvo é criada uma vez por processo
+                porSubprocessos(compilador, mod, nivel)
+                saida_antiga = executa('3\n')
+                noProcesso(compilador, mod, nivel)
+                if executa('3\n') != saida_antiga:
+                    print("Os dois executáveis não escrevem a mesma saída")
+                    sys.exit(1)
+                tempo_antigo = melhorTempo(lambda: porSubprocessos(compilador, mod, nivel), 3)
+                tempo_novo = melhorTempo(lambda: noProcesso(compilador, mod, nivel), 3)
+                tempo_objeto = melhorTempo(lambda: compilador.emiteModulo(mod, 'meu_modulo.o', nivel=nivel), 3)
+                print("-O%d llvm-as + llc + gcc:      %8.1f ms" % (nivel, tempo_antigo * 1000))
+                print("-O%d emiteModulo + gcc:        %8.1f ms   %5.2fx" % (nivel, tempo_novo * 1000,
+                                                                            tempo_antigo / tempo_novo))
+                print("     só o emiteModulo:       %8.1f ms" % (tempo_objeto * 1000))
+        finally:
+            os.chdir(diretorio)
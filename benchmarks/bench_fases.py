@@ -0,0 +1,101 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# tempo de cada fase do compilador num programa grande: léxico, sintático, semântico (na árvore
+# concreta e na reduzida) e geração de código. Com o caminho de outro compilador.py (por exemplo
+# uma versão anterior tirada do git) mede as duas versões lado a lado e confere que as mensagens
+# e o código gerado são os mesmos
+# uso: python benchmarks/bench_fases.py [numero de funções] [compilador.py de referência]
+#      git show HEAD~1:compilador.py > /tmp/referencia.py
+#      python benchmarks/bench_fases.py 500 /tmp/referencia.py
+import contextlib
+import io
+import os
+import sys
+import tempfile
+
+from comum import DIRETORIO, carregaCompilador, fluxoDe, melhorTempo, reiniciaGlobais
+from gera_programa import geraPrograma
+
+FASES = ('léxico', 'sintático', 'semântico (concreta)', 'semântico (reduzida)', 'código')
+
+
+# as versões com o coletor de diagnósticos só escrevem os erros e avisos no fim da análise
+def escreveDiagnosticos(compilador):
+    if hasattr(compilador, 'diagnosticos'):
+        compilador.diagnosticos.escreve()
+        compilador.diagnosticos.limpa()
+
+
+def semantico(compilador, arvore, direta):
+    reiniciaGlobais(compilador)
+    if direta:
+        compilador.recomecoReduzida(arvore)
+        compilador.verificaTipoRetornaReduzida(arvore)
+    else:
+        compilador.recomeco(arvore)
+        compilador.verificaTipoRetorna(arvore)
+    compilador.tabela_raiz.procuraPelaMain()
+    # as versões com o fluxo de dados tiram dele os avisos de variável não inicializada e não utilizada
+    if direta and hasattr(compilador, 'verificaFluxoDeDados'):
+        compilador.verificaFluxoDeDados(arvore)
+    else:
+        compilador.tabela_raiz.verificaVariaveisNaoUtilizadas()
+    escreveDiagnosticos(compilador)
+
+
+def codigo(compilador, arvore):
+    diretorio = os.getcwd()
+    with tempfile.TemporaryDirectory() as temporario:
+        os.chdir(temporario)  # o KodoGen grava meu_modulo.ll no diretório atual
+        try:
+            return str(compilador.KodoGen(arvore).module)
+        finally:
+            os.chdir(diretorio)
+
+
+def medeFases(compilador, programa, repeticoes=3):
+    _, parser = compilador.constroiAnalisadores()
+    tempos = {}
+    saida = io.StringIO()
+    with contextlib.redirect_stdout(saida):
+        tempos['léxico'] = melhorTempo(lambda: fluxoDe(compilador, programa), repeticoes)
+        fluxo = fluxoDe(compilador, programa)
+
+        def analisa(direta):
+            fluxo.reinicia()
+            compilador.ARVORE_REDUZIDA = direta
+            arvore = parser.parse(lexer=fluxo)
+            compilador.ARVORE_REDUZIDA = False
+            return arvore
+
+        tempos['sintático'] = melhorTempo(lambda: analisa(False), repeticoes)
+        concreta = analisa(False)
+        reduzida = analisa(True)
+        tempos['semântico (concreta)'] = melhorTempo(lambda: semantico(compilador, concreta, False), repeticoes)
+        tempos['semântico (reduzida)'] = melhorTempo(lambda: semantico(compilador, reduzida, True), repeticoes)
+        tempos['código'] = melhorTempo(lambda: codigo(compilador, reduzida), repeticoes)
+        ir = codigo(compilador, reduzida)
+    return tempos, saida.getvalue(), ir
+
+
+if __name__ == '__main__':
+    numero_funcoes = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    programa = geraPrograma(numero_funcoes)
+    versoes = [('atual', carregaCompilador('compilador', os.path.join(DIRETORIO, 'compilador.py')))]
+    if len(sys.argv) > 2:
+        versoes.append(('referência', carregaCompilador('compilador_referencia', sys.argv[2])))
+
+    resultados = []
+    for nome, compilador in versoes:
+        resultados.append(medeFases(compilador, programa))
+    if len(resultados) == 2 and resultados[0][1:] != resultados[1][1:]:
+        print("As duas versões não produzem as mesmas mensagens e o mesmo código")
+        sys.exit(1)
+
+    print("entrada: %d funções, %.1f KB de fonte" % (numero_funcoes, len(programa) / 1024))
+    print("%-22s" % 'fase' + ''.join('%14s' % nome for nome, _ in versoes))
+    for fase in FASES:
+        linha = "%-22s" % fase + ''.join('%11.1f ms' % (tempos[fase] * 1000) for tempos, _, _ in resultados)
+        if len(resultados) == 2:
+            linha += '   %5.2fx' % (resultados[1][0][fase] / resultados[0][0][fase])
+        print(linha)
@@ -0,0 +1,57 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# mede o verificaFluxoDeDados (grafo de fluxo, definições que chegam e variáveis vivas) numa função
+# com cada vez mais variáveis locais, separando a montagem do grafo das duas análises: com os
+# conjuntos de bits o tempo cresce perto do linear com o número de variáveis. Também mostra o tempo
+# da análise semântica inteira na árvore reduzida com o fluxo de dados
+# uso: python benchmarks/bench_fluxo.py [máximo de variáveis]
+import contextlib
+import io
+import os
+import sys
+
+from bench_fases import semantico
+from comum import DIRETORIO, carregaCompilador, fluxoDe, melhorTempo
+from gera_programa import geraProgramaMuitasVariaveis
+
+
+def arvoreReduzida(compilador, programa):
+    _, parser = compilador.constroiAnalisadores()
+    compilador.ARVORE_REDUZIDA = True
+    arvore = parser.parse(lexer=fluxoDe(compilador, programa))
+    compilador.ARVORE_REDUZIDA = False
+    return arvore
+
+
+def mede(compilador, programa):
+    arvore = arvoreReduzida(compilador, programa)
+    tempos = {}
+    with contextlib.redirect_stdout(io.StringIO()):
+        tempos['semântico'] = melhorTempo(lambda: semantico(compilador, arvore, True), 3)
+    indice = compilador.nomesResolvidos(arvore, True)
+    funcao = indice.funcoes[0]
+
+    def grafo():
+        indice.atributos.pop('grafoDaFuncao', None)
+        return compilador.grafoDaFuncao(funcao)
+
+    tempos['grafo'] = melhorTempo(grafo, 3)
+    g = grafo()
+    tempos['definições'] = melhorTempo(lambda: compilador.DefinicoesQueChegam(g, g.mascara(g.parametros)), 3)
+    tempos['vivas'] = melhorTempo(lambda: compilador.VariaveisVivas(g).vivasEm(g.alcancaveis()), 3)
+    return tempos, g
+
+
+if __name__ == '__main__':
+    maior = int(sys.argv[1]) if len(sys.argv) > 1 else 8000
+    compilador = carregaCompilador('compilador', os.path.join(DIRETORIO, 'compilador.py'))
+    sys.setrecursionlimit(100000)
+
+    print("%10s %8s %14s %10s %12s %10s" % ('variáveis', 'blocos', 'semântico', 'grafo', 'definições', 'vivas'))
+    variaveis = maior // 8
+    while variaveis <= maior:
+        tempos, g = mede(compilador, geraProgramaMuitasVariaveis(variaveis))
+        print("%10d %8d %11.1f ms %7.1f ms %9.1f ms %7.1f ms" % (
+            variaveis, len(g.blocos), tempos['semântico'] * 1000, tempos['grafo'] * 1000,
+            tempos['definições'] * 1000, tempos['vivas'] * 1000))
+        variaveis *= 2
@@ -0,0 +1,58 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# mede a análise semântica e a geração de código de uma função cada vez maior contra uma versão
+# anterior do compilador.py: com o índice da árvore (IndiceArvore) o tempo cresce linear com o
+# tamanho da função; a busca em largura que cada consulta fazia (parâmetros, retornas) era quadrática
+# uso: python benchmarks/bench_indice.py <compilador.py de referência> [comandos na maior função]
+#      git show HEAD~1:compilador.py > /tmp/referencia.py
+#      python benchmarks/bench_indice.py /tmp/referencia.py 16000
+import contextlib
+import io
+import os
+import sys
+import time
+
+from bench_fases import codigo, semantico
+from comum import DIRETORIO, carregaCompilador, fluxoDe, melhorTempo
+from gera_programa import geraProgramaFuncaoLonga
+
+
+def mede(compilador, programa):
+    _, parser = compilador.constroiAnalisadores()
+    fluxo = fluxoDe(compilador, programa)
+    saida = io.StringIO()
+    tempos = {}
+    with contextlib.redirect_stdout(saida):
+        fluxo.reinicia()
+        concreta = parser.parse(lexer=fluxo)
+        fluxo.reinicia()
+        compilador.ARVORE_REDUZIDA = True
+        reduzida = parser.parse(lexer=fluxo)
+        compilador.ARVORE_REDUZIDA = False
+        tempos['semântico'] = melhorTempo(lambda: semantico(compilador, concreta, False), 3)
+        tempos['código'] = melhorTempo(lambda: codigo(compilador, reduzida), 3)
+        ir = codigo(compilador, reduzida)
+    return tempos, saida.getvalue(), ir
+
+
+if __name__ == '__main__':
+    if len(sys.argv) < 2:
+        print("uso: python benchmarks/bench_indice.py <compilador.py de referência> [comandos]")
+        sys.exit(2)
+    maior = int(sys.argv[2]) if len(sys.argv) > 2 else 16000
+    atual = carregaCompilador('compilador', os.path.join(DIRETORIO, 'compilador.py'))
+    referencia = carregaCompilador('compilador_referencia', sys.argv[1])
+
+    print("%9s %24s %24s" % ('comandos', 'semântico atual / ref', 'código atual / ref'))
+    comandos = maior // 8
+    while comandos <= maior:
+        programa = geraProgramaFuncaoLonga(comandos)
+        tempos, saida, ir = mede(atual, programa)
+        tempos_ref, saida_ref, ir_ref = mede(referencia, programa)
+        if (saida, ir) != (saida_ref, ir_ref):
+            print("As duas versões não produzem as mesmas mensagens e o mesmo código")
+            sys.exit(1)
+        print("%9d %10.1f / %8.1f ms %10.1f / %8.1f ms" % (
+            comandos, tempos['semântico'] * 1000, tempos_ref['semântico'] * 1000,
+            tempos['código'] * 1000, tempos_ref['código'] * 1000))
+        comandos *= 2
@@ -0,0 +1,35 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# compara o tempo de construção do lexer/parser com o cache de tabelas frio e quente
+# uso: python benchmarks/bench_inicializacao.py [repeticoes]
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import compilador
+
+
+def mede(diretorio, limpa):
+    if limpa:
+        shutil.rmtree(diretorio, ignore_errors=True)
+    inicio = time.perf_counter()
+    compilador.constroiAnalisadores(diretorio)
+    return time.perf_counter() - inicio
+
+
+if __name__ == '__main__':
+    repeticoes = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    diretorio = tempfile.mkdtemp(prefix='bench_cache_')
+    try:
+        frio = [mede(diretorio, True) for _ in range(repeticoes)]
+        quente = [mede(diretorio, False) for _ in range(repeticoes)]
+    finally:
+        shutil.rmtree(diretorio, ignore_errors=True)
+
+    print("cache frio:   %8.2f ms (melhor de %d)" % (min(frio) * 1000, repeticoes))
+    print("cache quente: %8.2f ms (melhor de %d)" % (min(quente) * 1000, repeticoes))
+    print("ganho:        %8.1fx" % (min(frio) / min(quente)))
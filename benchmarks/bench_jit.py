@@ -0,0 +1,72 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# mede o tempo do módulo gerado pelo KodoGen até a saída do programa: o caminho do --run (emiteModulo,
+# gcc para ligar e ./exec num processo novo) contra o --jit (executaJIT: MCJIT do llvmlite e chamada da
+# principal no próprio processo). O programa do JIT lê e escreve pelos descritores 0 e 1 do processo,
+# que aqui são trocados por arquivos temporários; confere que as duas saídas são iguais
+# uso: python benchmarks/bench_jit.py [numero de funções]
+import os
+import subprocess
+import sys
+import tempfile
+
+from bench_emissao import executa, modulo, noProcesso
+from comum import DIRETORIO, carregaCompilador, melhorTempo
+from gera_programa import geraPrograma
+
+REPETICOES = 5
+
+
+def comDescritores(funcao, entrada, saida):
+    # troca o stdin/stdout do processo (os do C, que o programa do JIT usa) pelos arquivos
+    originais = os.dup(0), os.dup(1)
+    sys.stdout.flush()
+    os.dup2(entrada.fileno(), 0)
+    os.dup2(saida.fileno(), 1)
+    try:
+        return funcao()
+    finally:
+        os.dup2(originais[0], 0)
+        os.dup2(originais[1], 1)
+        os.close(originais[0])
+        os.close(originais[1])
+
+
+if __name__ == '__main__':
+    numero_funcoes = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    compilador = carregaCompilador('compilador', os.path.join(DIRETORIO, 'compilador.py'))
+    mod = modulo(compilador, geraPrograma(numero_funcoes))
+    print("entrada: %d funções" % numero_funcoes)
+    diretorio = os.getcwd()
+    with tempfile.TemporaryDirectory() as temporario:
+        os.chdir(temporario)
+        try:
+            compilador.maquinaAlvo()
+            noProcesso(compilador, mod, 2)
+            saida_exec = executa('3\n')
+
+            # uma linha de entrada por execução do JIT (o scanf não pode chegar ao fim do arquivo)
+            with open('entrada.txt', 'w') as arquivo:
+                arquivo.write('3\n' * (REPETICOES + 1))
+            resultados = []
+            with open('entrada.txt') as entrada, open('saida.txt', 'w') as saida:
+                comDescritores(lambda: compilador.executaJIT(mod), entrada, saida)
+                tempo_jit = melhorTempo(
+                    lambda: resultados.append(comDescritores(lambda: compilador.executaJIT(mod), entrada, saida)),
+                    REPETICOES)
+            with open('saida.txt') as arquivo:
+                linhas = arquivo.read().splitlines()
+            por_execucao = len(linhas) // (REPETICOES + 1)
+            if '\n'.join(linhas[:por_execucao]) + '\n' != saida_exec:
+                print("O JIT e o executável não escrevem a mesma saída")
+                sys.exit(1)
+
+            tempo_exec = melhorTempo(lambda: (noProcesso(compilador, mod, 2), executa('3\n')), REPETICOES)
+            compilacao = min(resultado.tempoCompilacao for resultado in resultados)
+            execucao = min(resultado.tempoExecucao for resultado in resultados)
+            print("emiteModulo + gcc + ./exec:  %8.1f ms" % (tempo_exec * 1000))
+            print("executaJIT:                  %8.1f ms   %5.2fx" % (tempo_jit * 1000, tempo_exec / tempo_jit))
+            print("  compilação (MCJIT):        %8.1f ms" % (compilacao * 1000))
+            print("  execução da principal:     %8.1f ms" % (execucao * 1000))
+        finally:
+            os.chdir(diretorio)
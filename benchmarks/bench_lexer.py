@@ -0,0 +1,113 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# compara o analisador léxico do ply com o AnalisadorRapido, medindo o tempo até o FluxoTokens ter
+# todos os tokens do arquivo (o que o compilador faz antes do parser): com o ply é um token() por
+# token, com o rápido é a varredura em bloco do preenche
+# antes de medir, confere se os dois geram exatamente os mesmos tokens e diagnósticos, pelo
+# FluxoTokens e pelo token() (o varre, que a varredura em bloco usa nos pedaços especiais)
+# uso: python benchmarks/bench_lexer.py [numero de funções]
+import sys
+import time
+
+from comum import reiniciaGlobais
+from gera_programa import geraPrograma
+
+import compilador
+
+# trechos com casos de borda do léxico (comentários aninhados, chaves soltas, caracteres inválidos)
+CASOS_DE_BORDA = [
+    'inteiro: a\n{ comentario\n com 1.5 e 2e+3 e && dentro }\na := .5 - -2.5\n',
+    '{ aninhado { de novo } ainda comentario }\nb := a <> 3 <= 4 >= 5\n',
+    'a := 1 } \n\n  b := 2 $ ? @\n',
+    '{ nunca fecha\n\n',
+    # comentário sem fim terminando em ignorados que também são tokens (o prefixo não pode devolvê-los)
+    'se/ {<=,>) [ [ *:= ',
+    'a { b := c, (d) [e] + f - g * h / i > j < k =',
+    'x := y[2][3] := 4 && 5 || 6\t\t: , ( ) !\n',
+    'flutuante: ação, três\nação := três * 1.0\n',
+    'a := 1 { c }{ d } b\n{ e\n}c { f && g }\td  \t',
+    'x := 1 {}\n{ a }\n\n  { b { c } } y\n}  $ } z { fim',
+]
+
+
+# o input() do lexer do ply não volta a linha nem sai de um comentário aberto: cada entrada usa uma
+# cópia do lexer como saiu do constroiAnalisadores (como no CompilerSession)
+def novoLexer(lexer):
+    return lexer.clone() if isinstance(lexer, compilador.lex.Lexer) else lexer
+
+
+def tokeniza(lexer, data):
+    reiniciaGlobais(compilador)
+    lexer = novoLexer(lexer)
+    lexer.input(data)
+    tokens = []
+    while True:
+        tok = lexer.token()
+        if not tok:
+            break
+        tokens.append((tok.type, tok.value, tok.lineno, tok.lexpos))
+    diagnosticos = (list(compilador.CARACTERES_INVALIDOS), list(compilador.ABRE_CHAVES_LINHA),
+                    list(compilador.FECHA_CHAVES_SOLO))
+    return tokens, diagnosticos
+
+
+def tokenizaFluxo(lexer, data):
+    reiniciaGlobais(compilador)
+    fluxo = compilador.FluxoTokens(novoLexer(lexer))
+    fluxo.input(data)
+    fluxo.esgota()
+    tokens = [(tok.type, tok.value, tok.lineno, tok.lexpos) for tok in fluxo]
+    diagnosticos = (list(compilador.CARACTERES_INVALIDOS), list(compilador.ABRE_CHAVES_LINHA),
+                    list(compilador.FECHA_CHAVES_SOLO))
+    return tokens, diagnosticos
+
+
+# no modo mapeado o lexpos é em bytes, converte para caracteres antes de comparar com o ply
+def tokenizaMapeado(lexer, data, tokeniza=tokeniza):
+    binario = data.encode('utf-8')
+    caractere = []  # posição em caracteres de cada byte
+    for i, c in enumerate(data):
+        caractere.extend([i] * len(c.encode('utf-8')))
+    tokens, diagnosticos = tokeniza(lexer, binario)
+    tokens = [(tipo, valor, linha, caractere[posicao]) for tipo, valor, linha, posicao in tokens]
+    return tokens, diagnosticos
+
+
+def mede(lexer, data, repeticoes=3):
+    melhor = None
+    for _ in range(repeticoes):
+        reiniciaGlobais(compilador)
+        fluxo = compilador.FluxoTokens(novoLexer(lexer))
+        inicio = time.perf_counter()
+        fluxo.input(data)
+        fluxo.esgota()
+        tempo = time.perf_counter() - inicio
+        melhor = tempo if melhor is None else min(melhor, tempo)
+    return melhor
+
+
+if __name__ == '__main__':
+    numero_funcoes = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    lexer_ply, _ = compilador.constroiAnalisadores()
+    rapido = compilador.AnalisadorRapido()
+    mapeado = compilador.AnalisadorMapeado()
+
+    programa = geraPrograma(numero_funcoes)
+    for caso in CASOS_DE_BORDA + [programa]:
+        esperado = tokeniza(lexer_ply, caso)
+        obtidos = [tokenizaFluxo(lexer_ply, caso), tokeniza(rapido, caso), tokenizaFluxo(rapido, caso),
+                   tokenizaMapeado(mapeado, caso), tokenizaMapeado(mapeado, caso, tokenizaFluxo)]
+        if any(obtido != esperado for obtido in obtidos):
+            print("Divergência entre os analisadores léxicos na entrada:\n%s" % caso[:200])
+            sys.exit(1)
+    print("%d entradas com tokens e diagnósticos idênticos" % (len(CASOS_DE_BORDA) + 1))
+
+    tempo_ply = mede(lexer_ply, programa)
+    tempo_rapido = mede(rapido, programa)
+    tempo_mapeado = mede(mapeado, programa.encode('utf-8'))
+    tamanho = len(programa.encode('utf-8')) / 1e6
+    print("entrada: %.2f MB" % tamanho)
+    print("ply:     %8.1f ms (%6.2f MB/s)" % (tempo_ply * 1000, tamanho / tempo_ply))
+    print("rapido:  %8.1f ms (%6.2f MB/s)" % (tempo_rapido * 1000, tamanho / tempo_rapido))
+    print("mapeado: %8.1f ms (%6.2f MB/s)" % (tempo_mapeado * 1000, tamanho / tempo_mapeado))
+    print("ganho:   %8.1fx (rapido) %8.1fx (mapeado)" % (tempo_ply / tempo_rapido, tempo_ply / tempo_mapeado))
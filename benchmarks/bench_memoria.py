@@ -0,0 +1,56 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# pico de memória (RSS) para analisar um programa grande lendo o arquivo como texto ou mapeado (--mmap),
+# só até os tokens (FluxoTokens.input) e até a árvore. Cada medida roda num processo separado para o
+# pico de uma não contaminar a outra
+# uso: python benchmarks/bench_memoria.py [numero de funções]
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+
+DIRETORIO = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(DIRETORIO))
+
+
+def analisa(modo, caminho, etapa):
+    import compilador
+    lexer, parser = compilador.constroiAnalisadores()
+    if modo == 'mapeado':
+        data = compilador.abreMapeado(caminho)
+        lexer = compilador.AnalisadorMapeado()
+    else:
+        data = open(caminho, 'r', encoding='utf-8').read()
+        if modo == 'rapido':
+            lexer = compilador.AnalisadorRapido()
+    # como no analisaFonte: o parser lê do FluxoTokens, que guarda todos os tokens do arquivo
+    fluxo = compilador.FluxoTokens(lexer)
+    fluxo.input(data)
+    if etapa == 'arvore':
+        arvore = parser.parse(lexer=fluxo)
+    # ru_maxrss é em KB no linux
+    print(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)
+
+
+if __name__ == '__main__':
+    if len(sys.argv) > 1 and sys.argv[1] == '--filho':
+        analisa(sys.argv[2], sys.argv[3], sys.argv[4])
+        sys.exit(0)
+
+    from gera_programa import geraPrograma
+    numero_funcoes = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    with tempfile.NamedTemporaryFile('w', suffix='.tpp', delete=False, encoding='utf-8') as arquivo:
+        arquivo.write(geraPrograma(numero_funcoes))
+    try:
+        print("entrada: %.2f MB" % (os.path.getsize(arquivo.name) / 1e6))
+        print("         pico RSS  tokens      árvore")
+        for modo in ('ply', 'rapido', 'mapeado'):
+            picos = []
+            for etapa in ('tokens', 'arvore'):
+                saida = subprocess.run([sys.executable, os.path.abspath(__file__), '--filho', modo, arquivo.name, etapa],
+                                       stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, universal_newlines=True)
+                picos.append(int(saida.stdout.split()[-1]) / 1024)
+            print("%-8s %13.1f MB %8.1f MB" % ((modo,) + tuple(picos)))
+    finally:
+        os.unlink(arquivo.name)
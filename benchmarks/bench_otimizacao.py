@@ -0,0 +1,51 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# tempo de execução dos executáveis gerados em cada -O (sem -O é o módulo como o KodoGen gera, com o
+# gerador de código no -O2 do llc) para os programas do corpusExecucao, e o tempo de emissão do objeto
+# em cada nível. Confere que todos os níveis escrevem a mesma saída
+# uso: python benchmarks/bench_otimizacao.py [escala]
+import os
+import subprocess
+import sys
+import tempfile
+
+from bench_emissao import modulo
+from comum import DIRETORIO, carregaCompilador, melhorTempo
+from gera_programa import corpusExecucao
+
+NIVEIS = [None, '0', '1', '2', '3', 's']
+
+
+def executa():
+    return subprocess.run(['./exec'], capture_output=True, text=True, check=True).stdout
+
+
+if __name__ == '__main__':
+    escala = int(sys.argv[1]) if len(sys.argv) > 1 else 2
+    compilador = carregaCompilador('compilador', os.path.join(DIRETORIO, 'compilador.py'))
+    print("escala: %d (tempos em ms; emissão + tempo de execução)" % escala)
+    print("%-10s" % "" + "".join("%16s" % ('-O' + nivel if nivel else 'sem -O') for nivel in NIVEIS))
+    diretorio = os.getcwd()
+    with tempfile.TemporaryDirectory() as temporario:
+        os.chdir(temporario)
+        try:
+            for nome, programa in corpusExecucao(escala).items():
+                mod = modulo(compilador, programa)
+                colunas = []
+                saida_esperada = None
+                for nivel in NIVEIS:
+                    compilador.emiteModulo(mod, 'meu_modulo.o', otimizacao=nivel)
+                    if compilador.ligaExecutavel('meu_modulo.o') != 0:
+                        raise RuntimeError("gcc falhou")
+                    saida = executa()
+                    if saida_esperada is None:
+                        saida_esperada = saida
+                    elif saida != saida_esperada:
+                        print("%s: o -O%s não escreve a mesma saída" % (nome, nivel))
+                        sys.exit(1)
+                    emissao = melhorTempo(lambda: compilador.emiteModulo(mod, 'meu_modulo.o', otimizacao=nivel), 3)
+                    execucao = melhorTempo(executa, 3)
+                    colunas.append("%6.1f + %7.1f" % (emissao * 1000, execucao * 1000))
+                print("%-10s" % nome + "".join("%16s" % coluna for coluna in colunas))
+        finally:
+            os.chdir(diretorio)
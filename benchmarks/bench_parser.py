@@ -0,0 +1,48 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# compara o tempo do parser LALR do yacc com o do ParserDescendente (a igualdade das árvores e das
+# mensagens fica no tests/test_parser_descendente.py)
+# uso: python benchmarks/bench_parser.py [numero de funções]
+import contextlib
+import gc
+import io
+import sys
+
+from comum import fluxoDe, melhorTempo
+from gera_programa import geraPrograma
+
+import compilador
+
+
+def analisa(parser, fluxo):
+    fluxo.reinicia()
+    compilador.ERRO_SINTATICO = False
+    compilador.diagnosticos.limpa()
+    saida = io.StringIO()
+    with contextlib.redirect_stdout(saida):
+        arvore = parser.parse(lexer=fluxo) if parser is PARSER_YACC else parser.parse(fluxo)
+        compilador.diagnosticos.escreve()
+    return arvore, saida.getvalue(), compilador.ERRO_SINTATICO
+
+
+def mede(parser, fluxo, repeticoes=3):
+    return melhorTempo(lambda: analisa(parser, fluxo), repeticoes)
+
+
+if __name__ == '__main__':
+    numero_funcoes = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    _, PARSER_YACC = compilador.constroiAnalisadores()
+    descendente = compilador.ParserDescendente(PARSER_YACC)
+
+    fluxo = fluxoDe(compilador, geraPrograma(numero_funcoes))
+    tempo_yacc = mede(PARSER_YACC, fluxo)
+    tempo_rd = mede(descendente, fluxo)
+    gc.disable()  # o descendente desliga o coletor durante a análise; mede o yacc assim também
+    tempo_yacc_sem_gc = mede(PARSER_YACC, fluxo)
+    gc.enable()
+    quantidade = len(fluxo.tokens)
+    print("entrada: %d tokens" % quantidade)
+    print("yacc:        %8.1f ms (%8.0f tokens/s)" % (tempo_yacc * 1000, quantidade / tempo_yacc))
+    print("yacc sem gc: %8.1f ms (%8.0f tokens/s)" % (tempo_yacc_sem_gc * 1000, quantidade / tempo_yacc_sem_gc))
+    print("descendente: %8.1f ms (%8.0f tokens/s)" % (tempo_rd * 1000, quantidade / tempo_rd))
+    print("ganho:       %8.1fx (%.1fx sem gc)" % (tempo_yacc / tempo_rd, tempo_yacc_sem_gc / tempo_rd))
@@ -0,0 +1,111 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# mede o percurso iterativo (percorreArvore) contra o percurso recursivo que os passes usavam:
+# custo por nó só com pre e com pre + pos, e compila programas com se/repita aninhados em
+# profundidades muito acima do limite de recursão do Python (léxico, sintático, semântico e código)
+# uso: python benchmarks/bench_percurso.py [numero de funções] [profundidade máxima]
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import time
+
+from comum import fluxoDe, melhorTempo, reiniciaGlobais
+from gera_programa import geraPrograma, geraProgramaAninhado
+
+import compilador
+
+
+# como os passes eram antes: uma chamada recursiva por nó
+def percorreRecursivo(no, pre, pos=None, contexto=None):
+    if no:
+        contexto_filhos = pre(no, contexto)
+        for filho in no.children:
+            percorreRecursivo(filho, pre, pos, contexto_filhos)
+        if pos is not None:
+            pos(no, contexto)
+
+
+def custoPorNo(arvore):
+    visitados = []
+
+    def pre(no, contexto):
+        visitados.append(no)
+        return no
+
+    def pos(no, contexto):
+        pass
+
+    percorreRecursivo(arvore, pre)
+    ordem_recursiva = visitados[:]
+    del visitados[:]
+    compilador.percorreArvore(arvore, pre)
+    if [id(no) for no in visitados] != [id(no) for no in ordem_recursiva]:
+        print("O percurso iterativo não visita os nós na mesma ordem")
+        sys.exit(1)
+    nos = len(visitados)
+
+    resultados = []
+    for nome, recursivo, iterativo in (
+            ('pre', lambda: percorreRecursivo(arvore, pre), lambda: compilador.percorreArvore(arvore, pre)),
+            ('pre + pos', lambda: percorreRecursivo(arvore, pre, pos),
+             lambda: compilador.percorreArvore(arvore, pre, pos))):
+        tempos = []
+        for funcao in (recursivo, iterativo):
+            tempos.append(melhorTempo(lambda: (funcao(), visitados.clear()), 5))
+        resultados.append((nome, tempos))
+    return nos, resultados
+
+
+# o que o driver faz com --reducao-direta -g
+def compilaAninhado(parser, programa):
+    reiniciaGlobais(compilador)
+    compilador.ARVORE_REDUZIDA = True
+    tempos = {}
+    with contextlib.redirect_stdout(io.StringIO()):
+        inicio = time.perf_counter()
+        arvore = compilador.ParserDescendente(parser).parse(fluxoDe(compilador, programa, False))
+        tempos['sintático'] = time.perf_counter() - inicio
+
+        inicio = time.perf_counter()
+        compilador.recomecoReduzida(arvore)
+        compilador.verificaTipoRetornaReduzida(arvore)
+        compilador.tabela_raiz.procuraPelaMain()
+        compilador.tabela_raiz.verificaVariaveisNaoUtilizadas()
+        compilador.diagnosticos.escreve()
+        tempos['semântico'] = time.perf_counter() - inicio
+
+        inicio = time.perf_counter()
+        diretorio = os.getcwd()
+        with tempfile.TemporaryDirectory() as temporario:
+            os.chdir(temporario)  # o KodoGen grava meu_modulo.ll no diretório atual
+            try:
+                gerador = compilador.KodoGen(arvore)
+            finally:
+                os.chdir(diretorio)
+        tempos['código'] = time.perf_counter() - inicio
+    compilador.ARVORE_REDUZIDA = False
+    return tempos, len(str(gerador.module).splitlines())
+
+
+if __name__ == '__main__':
+    numero_funcoes = int(sys.argv[1]) if len(sys.argv) > 1 else 300
+    profundidade_maxima = int(sys.argv[2]) if len(sys.argv) > 2 else 20000
+    _, parser = compilador.constroiAnalisadores()
+
+    compilador.ARVORE_REDUZIDA = True
+    arvore = compilador.ParserDescendente(parser).parse(fluxoDe(compilador, geraPrograma(numero_funcoes), False))
+    compilador.ARVORE_REDUZIDA = False
+    nos, resultados = custoPorNo(arvore)
+    print("árvore reduzida de %d funções: %d nós (mesma ordem de visita nos dois percursos)" % (numero_funcoes, nos))
+    for nome, (recursivo, iterativo) in resultados:
+        print("%-9s recursivo %6.0f ns/nó   iterativo %6.0f ns/nó" % (
+            nome, recursivo * 1e9 / nos, iterativo * 1e9 / nos))
+
+    print("limite de recursão do Python: %d" % sys.getrecursionlimit())
+    for profundidade in sorted({p for p in (1000, 5000, profundidade_maxima) if p <= profundidade_maxima}):
+        tempos, linhas_ir = compilaAninhado(parser, geraProgramaAninhado(profundidade))
+        print("aninhamento %6d: sintático %7.1f ms  semântico %7.1f ms  código %8.1f ms  (%d linhas de IR)" % (
+            profundidade, tempos['sintático'] * 1000, tempos['semântico'] * 1000, tempos['código'] * 1000,
+            linhas_ir))
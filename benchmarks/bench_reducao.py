@@ -0,0 +1,106 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# compara o caminho atual (árvore concreta -> recomeco -> arv_reduzida) com a redução direta nas
+# ações do parser (--reducao-direta): confere que as mensagens da análise semântica, as tabelas de
+# símbolos e a árvore reduzida são as mesmas e depois mede tempo e pico de memória dos dois
+# uso: python benchmarks/bench_reducao.py [numero de funções]
+import contextlib
+import io
+import sys
+import tracemalloc
+
+from comum import fluxoDe, melhorTempo, mesmaArvore, reiniciaGlobais
+from gera_programa import geraPrograma
+
+import compilador
+
+# programas pequenos que passam pelos avisos e erros da análise semântica
+CASOS_SEMANTICOS = [
+    'inteiro: a\nflutuante: b\na := 1\n'
+    'inteiro principal()\n  inteiro: c\n  c := b\n  escreva(c)\n  retorna(c)\nfim\n',
+    'inteiro: v[10], w[2.5]\ninteiro principal()\n  inteiro: i, i\n  flutuante: i\n  leia(i)\n'
+    '  v[i] := i + 1\n  retorna(-1)\nfim\n',
+    'flutuante f(inteiro: x, flutuante: y[])\n  retorna(x)\nfim\n'
+    'g()\n  retorna(1.5)\nfim\n'
+    'inteiro principal()\n  inteiro: n\n  n := f(n)\n  g()\n  principal()\n  h(1)\n  retorna(z)\nfim\n',
+    'inteiro principal()\n  inteiro: a, b\n  flutuante: c\n  a := 1.5\n  c := 2\n  b := a\n'
+    '  se a > b && b < 3 então\n    inteiro: d\n    d := (a)\n    repita\n      flutuante: e\n'
+    '      e := d * c\n      escreva(e)\n    até e >= 10\n  senão\n    retorna(b)\n  fim\n'
+    '  retorna(f(2))\nfim\n',
+    'inteiro: tipo, corpo\ninteiro principal()\n  tipo := corpo\n  escreva(tipo)\n  corpo\n  retorna(0)\nfim\n',
+    'inteiro f()\n  inteiro: m[n + 1]\n  m[0] := x := 2\n  se 1 então\n    retorna(m[0])\n  fim\n  retorna(1)\nfim\n',
+    # argumentos com mais de um fator: f(x + 1) é um argumento só
+    'inteiro f(inteiro: a, inteiro: b)\n  retorna(a + b)\nfim\n'
+    'inteiro principal()\n  inteiro: x\n  x := 1\n  x := f(x + 1)\n  x := f(x, f(x * 2, 1))\n  x := f()\n'
+    '  retorna(x)\nfim\n',
+]
+
+
+# o mesmo que o driver faz entre o parse e a geração de código
+def compila(parser, fluxo, direta):
+    reiniciaGlobais(compilador)
+    fluxo.reinicia()
+    compilador.ARVORE_REDUZIDA = direta
+    result = parser.parse(lexer=fluxo)
+    if direta:
+        compilador.recomecoReduzida(result)
+        if result:
+            compilador.verificaTipoRetornaReduzida(result)
+    else:
+        compilador.recomeco(result)
+        compilador.verificaTipoRetorna(result)
+    compilador.tabela_raiz.procuraPelaMain()
+    compilador.tabela_raiz.verificaVariaveisNaoUtilizadas()
+    compilador.diagnosticos.escreve()
+    arvore = result if direta else compilador.arv_reduzida(result)
+    compilador.ARVORE_REDUZIDA = False
+    return arvore
+
+
+def compilaCapturando(parser, fluxo, direta):
+    saida = io.StringIO()
+    with contextlib.redirect_stdout(saida):
+        arvore = compila(parser, fluxo, direta)
+        compilador.tabela_raiz.printaArvore()
+    return arvore, saida.getvalue()
+
+
+def mede(parser, fluxo, direta, repeticoes=3):
+    with contextlib.redirect_stdout(io.StringIO()):
+        return melhorTempo(lambda: compila(parser, fluxo, direta), repeticoes)
+
+
+def picoMemoria(parser, fluxo, direta):
+    tracemalloc.start()
+    with contextlib.redirect_stdout(io.StringIO()):
+        arvore = compila(parser, fluxo, direta)
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del arvore
+    return pico
+
+
+if __name__ == '__main__':
+    numero_funcoes = int(sys.argv[1]) if len(sys.argv) > 1 else 300
+    _, parser = compilador.constroiAnalisadores()
+    sys.setrecursionlimit(100000)  # arv_reduzida (nani) é recursiva
+
+    programa = geraPrograma(numero_funcoes)
+    casos = CASOS_SEMANTICOS + [geraPrograma(20)]
+    for caso in casos:
+        fluxo = fluxoDe(compilador, caso)
+        arvore, saida = compilaCapturando(parser, fluxo, False)
+        arvore_direta, saida_direta = compilaCapturando(parser, fluxo, True)
+        if saida != saida_direta or not mesmaArvore(arvore, arvore_direta):
+            print("Divergência entre as reduções na entrada:\n%s" % caso[:200])
+            sys.exit(1)
+    print("%d entradas com análise semântica, tabelas e árvore reduzida idênticas" % len(casos))
+
+    fluxo = fluxoDe(compilador, programa)
+    tempo = mede(parser, fluxo, False)
+    tempo_direta = mede(parser, fluxo, True)
+    pico = picoMemoria(parser, fluxo, False)
+    pico_direta = picoMemoria(parser, fluxo, True)
+    print("entrada: %d funções, %d tokens" % (numero_funcoes, len(fluxo.tokens)))
+    print("concreta + arv_reduzida: %8.1f ms  pico %7.1f MB" % (tempo * 1000, pico / 1e6))
+    print("redução direta:          %8.1f ms  pico %7.1f MB" % (tempo_direta * 1000, pico_direta / 1e6))
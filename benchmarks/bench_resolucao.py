@@ -0,0 +1,37 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# mede a análise semântica e a geração de código de programas com cada vez mais funções, cada uma
+# com variáveis de nomes próprios, contra uma versão anterior do compilador.py e confere que as
+# mensagens e o código gerado são os mesmos: com os nomes ligados às linhas das tabelas pelo
+# resolveNomes o tempo cresce linear; procurar cada nome em todas as tabelas era quadrático
+# uso: python benchmarks/bench_resolucao.py <compilador.py de referência> [máximo de funções]
+#      git show HEAD~1:compilador.py > /tmp/referencia.py
+#      python benchmarks/bench_resolucao.py /tmp/referencia.py 4000
+import os
+import sys
+
+from comum import DIRETORIO, carregaCompilador
+from bench_indice import mede
+from gera_programa import geraProgramaNomesLocais
+
+if __name__ == '__main__':
+    if len(sys.argv) < 2:
+        print("uso: python benchmarks/bench_resolucao.py <compilador.py de referência> [máximo de funções]")
+        sys.exit(2)
+    maior = int(sys.argv[2]) if len(sys.argv) > 2 else 4000
+    atual = carregaCompilador('compilador', os.path.join(DIRETORIO, 'compilador.py'))
+    referencia = carregaCompilador('compilador_referencia', sys.argv[1])
+
+    print("%8s %24s %24s" % ('funções', 'semântico atual / ref', 'código atual / ref'))
+    funcoes = maior // 8
+    while funcoes <= maior:
+        programa = geraProgramaNomesLocais(funcoes)
+        tempos, saida, ir = mede(atual, programa)
+        tempos_ref, saida_ref, ir_ref = mede(referencia, programa)
+        if (saida, ir) != (saida_ref, ir_ref):
+            print("As duas versões não produzem as mesmas mensagens e o mesmo código")
+            sys.exit(1)
+        print("%8d %10.1f / %8.1f ms %10.1f / %8.1f ms" % (
+            funcoes, tempos['semântico'] * 1000, tempos_ref['semântico'] * 1000,
+            tempos['código'] * 1000, tempos_ref['código'] * 1000))
+        funcoes *= 2
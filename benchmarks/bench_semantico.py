@@ -0,0 +1,70 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# mede como a análise semântica (árvore concreta e reduzida) cresce com o tamanho da entrada, em
+# programas com muitas funções e em programas com se/repita aninhados, e compara com uma versão
+# anterior do compilador.py (mensagens e tabelas têm que ser as mesmas). Com as consultas às
+# tabelas memorizadas por escopo e os atributos memorizados por nó o custo por nó fica constante;
+# subir a cadeia de escopos inteira a cada nome deixava o aninhamento quadrático
+# uso: python benchmarks/bench_semantico.py <compilador.py de referência> [maior profundidade]
+#      git show HEAD~1:compilador.py > /tmp/referencia.py
+#      python benchmarks/bench_semantico.py /tmp/referencia.py 8000
+import contextlib
+import io
+import os
+import sys
+
+from bench_fases import semantico
+from comum import DIRETORIO, carregaCompilador, fluxoDe, melhorTempo
+from gera_programa import geraPrograma, geraProgramaAninhado
+
+
+def contaNos(arvore):
+    nos = 0
+    pilha = [arvore]
+    while pilha:
+        no = pilha.pop()
+        if no is not None:
+            nos += 1
+            pilha.extend(no.children)
+    return nos
+
+
+def mede(compilador, programa):
+    _, parser = compilador.constroiAnalisadores()
+    fluxo = fluxoDe(compilador, programa)
+    saida = io.StringIO()
+    tempos = {}
+    with contextlib.redirect_stdout(saida):
+        fluxo.reinicia()
+        concreta = parser.parse(lexer=fluxo)
+        fluxo.reinicia()
+        compilador.ARVORE_REDUZIDA = True
+        reduzida = parser.parse(lexer=fluxo)
+        compilador.ARVORE_REDUZIDA = False
+        tempos['concreta'] = melhorTempo(lambda: semantico(compilador, concreta, False), 3)
+        compilador.tabela_raiz.printaArvore()
+        tempos['reduzida'] = melhorTempo(lambda: semantico(compilador, reduzida, True), 3)
+        compilador.tabela_raiz.printaArvore()
+    return tempos, saida.getvalue(), contaNos(concreta)
+
+
+if __name__ == '__main__':
+    if len(sys.argv) < 2:
+        print("uso: python benchmarks/bench_semantico.py <compilador.py de referência> [maior profundidade]")
+        sys.exit(2)
+    maior = int(sys.argv[2]) if len(sys.argv) > 2 else 8000
+    atual = carregaCompilador('compilador', os.path.join(DIRETORIO, 'compilador.py'))
+    referencia = carregaCompilador('compilador_referencia', sys.argv[1])
+
+    print("%-22s %9s %26s %26s" % ('entrada', 'nós', 'concreta atual / ref', 'reduzida atual / ref'))
+    entradas = [('%d funções' % (maior // 10 // d), geraPrograma(maior // 10 // d)) for d in (8, 4, 2, 1)]
+    entradas += [('aninhamento %d' % (maior // d), geraProgramaAninhado(maior // d, 10)) for d in (8, 4, 2, 1)]
+    for nome, programa in entradas:
+        tempos, saida, nos = mede(atual, programa)
+        tempos_ref, saida_ref, _ = mede(referencia, programa)
+        if saida != saida_ref:
+            print("As duas versões não produzem as mesmas mensagens e tabelas")
+            sys.exit(1)
+        print("%-22s %9d %8.1f / %8.1f ms (%4.2f µs/nó) %8.1f / %8.1f ms" % (
+            nome, nos, tempos['concreta'] * 1000, tempos_ref['concreta'] * 1000, tempos['concreta'] * 1e6 / nos,
+            tempos['reduzida'] * 1000, tempos_ref['reduzida'] * 1000))
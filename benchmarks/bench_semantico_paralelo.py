@@ -0,0 +1,63 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# mede a análise semântica com os corpos das funções verificados em processos (recomecoParalelo)
+# contra a análise serial num programa com milhares de funções, na árvore concreta e na reduzida, e
+# confere que as mensagens e as tabelas de símbolos são as mesmas. O ganho depende dos núcleos da
+# máquina: com um núcleo só os processos concorrem entre si e o paralelo fica mais lento
+# uso: python benchmarks/bench_semantico_paralelo.py [numero de funções] [processos ...]
+#      python benchmarks/bench_semantico_paralelo.py 4000 1 2 4
+import contextlib
+import io
+import os
+import sys
+
+from comum import fluxoDe, melhorTempo
+from gera_programa import geraPrograma
+
+# importado pelo nome (e não pelo carregaCompilador): os processos recebem a função de cada fatia
+# por referência ao módulo
+import compilador
+
+
+def arvoreDe(compilador, programa, reduzida):
+    _, parser = compilador.constroiAnalisadores()
+    compilador.ARVORE_REDUZIDA = reduzida
+    with contextlib.redirect_stdout(io.StringIO()):
+        arvore = parser.parse(lexer=fluxoDe(compilador, programa))
+    compilador.ARVORE_REDUZIDA = False
+    return arvore
+
+
+# só o passo que monta as tabelas e confere os corpos; o resto da análise é igual nos dois modos
+def analisa(compilador, arvore, reduzida, processos):
+    saida = io.StringIO()
+    with compilador.estadoDaCompilacao(compilador.estadoInicial()):
+        compilador.ARVORE_REDUZIDA = reduzida
+        with contextlib.redirect_stdout(saida):
+            compilador.indiceDe(arvore)  # o analisaFonte monta o índice nos dois modos
+            if processos is None:
+                compilador.recomecoDaArvore(arvore, reduzida)
+            else:
+                compilador.recomecoParalelo(arvore, reduzida, processos)
+            compilador.diagnosticos.escreve()
+            compilador.tabela_raiz.printaArvore()
+    return saida.getvalue()
+
+
+if __name__ == '__main__':
+    numero_funcoes = int(sys.argv[1]) if len(sys.argv) > 1 else 4000
+    quantidades = [int(p) for p in sys.argv[2:]] or [1, 2, 4]
+    programa = geraPrograma(numero_funcoes)
+    print("entrada: %d funções, %d núcleos" % (numero_funcoes, os.cpu_count() or 1))
+
+    for nome, reduzida in (('concreta', False), ('reduzida', True)):
+        arvore = arvoreDe(compilador, programa, reduzida)
+        serial = analisa(compilador, arvore, reduzida, None)
+        print("árvore %s:" % nome)
+        print("  serial:          %8.1f ms" % (melhorTempo(lambda: analisa(compilador, arvore, reduzida, None), 3) * 1000))
+        for processos in quantidades:
+            if analisa(compilador, arvore, reduzida, processos) != serial:
+                print("A análise com %d processos não dá o mesmo resultado da serial" % processos)
+                sys.exit(1)
+            tempo = melhorTempo(lambda: analisa(compilador, arvore, reduzida, processos), 3)
+            print("  %2d processos:    %8.1f ms" % (processos, tempo * 1000))
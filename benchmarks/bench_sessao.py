@@ -0,0 +1,77 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# latência por compilação com um CompilerSession num processo já aquecido (tabelas do lex/yacc
+# carregadas uma vez) contra um processo novo do compilador.py -g por fonte, que paga o import e a
+# carga das tabelas toda vez. Confere que o código gerado pela sessão é o mesmo do -g
+# uso: python benchmarks/bench_sessao.py [numero de fontes] [funções por fonte]
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from comum import DIRETORIO, carregaCompilador
+from gera_programa import geraPrograma
+
+COMPILADOR = os.path.join(DIRETORIO, 'compilador.py')
+PROCESSOS = 20  # processos novos medidos (cada um leva centenas de ms)
+
+
+def percentil(tempos, p):
+    ordenados = sorted(tempos)
+    return ordenados[min(len(ordenados) - 1, int(len(ordenados) * p))]
+
+
+def resumo(nome, tempos):
+    print("%-28s %8.2f ms/fonte  (p50 %7.2f  p95 %7.2f  %d fontes)" % (
+        nome, sum(tempos) * 1000 / len(tempos), percentil(tempos, 0.5) * 1000, percentil(tempos, 0.95) * 1000,
+        len(tempos)))
+
+
+def processoNovo(caminho, flags):
+    inicio = time.perf_counter()
+    subprocess.run([sys.executable, COMPILADOR, '-g', caminho] + flags, stdout=subprocess.DEVNULL, check=True)
+    return time.perf_counter() - inicio
+
+
+if __name__ == '__main__':
+    numero_fontes = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    funcoes = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    compilador = carregaCompilador('compilador', COMPILADOR)
+    fontes = [geraPrograma(funcoes, semente=i) for i in range(numero_fontes)]
+
+    for nome, opcoes, flags in (('padrão', {}, []),
+                                ('rápido', {'lexer': 'rapido'}, ['--lexer', 'rapido'])):
+        print("%s: %d fontes de %d funções" % (nome, numero_fontes, funcoes))
+        inicio = time.perf_counter()
+        sessao = compilador.CompilerSession(**opcoes)
+        print("%-28s %8.2f ms" % ("criação da sessão", (time.perf_counter() - inicio) * 1000))
+
+        tempos = []
+        for fonte in fontes:
+            inicio = time.perf_counter()
+            resultado = sessao.compile(fonte)
+            tempos.append(time.perf_counter() - inicio)
+            if not resultado.sucesso:
+                print("Erro ao compilar um fonte gerado:\n%s" % resultado.diagnosticos.formata())
+                sys.exit(1)
+        resumo("sessão aquecida", tempos)
+
+        with tempfile.TemporaryDirectory() as temporario:
+            tempos = []
+            for i, fonte in enumerate(fontes[:PROCESSOS]):
+                caminho = os.path.join(temporario, 'fonte%d.tpp' % i)
+                with open(caminho, 'w', encoding='utf-8') as arquivo:
+                    arquivo.write(fonte)
+                diretorio = os.getcwd()
+                os.chdir(temporario)  # o -g grava meu_modulo.ll no diretório atual
+                try:
+                    tempos.append(processoNovo(caminho, flags))
+                    with open('meu_modulo.ll', encoding='utf-8') as arquivo:
+                        ir_processo = arquivo.read()
+                finally:
+                    os.chdir(diretorio)
+                if ir_processo != sessao.compile(fonte).ir:
+                    print("A sessão e o compilador.py -g não geram o mesmo código")
+                    sys.exit(1)
+        resumo("processo novo por fonte", tempos)
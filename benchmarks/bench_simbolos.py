@@ -0,0 +1,59 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# mede a análise semântica (árvore concreta e reduzida) de programas com cada vez mais variáveis
+# globais contra uma versão anterior do compilador.py e confere que as mensagens e as tabelas de
+# símbolos exibidas são as mesmas: com as tabelas indexadas por nome o tempo cresce linear com o
+# número de globais; a busca linear nas linhas de cada tabela era quadrática
+# uso: python benchmarks/bench_simbolos.py <compilador.py de referência> [máximo de globais]
+#      git show HEAD~1:compilador.py > /tmp/referencia.py
+#      python benchmarks/bench_simbolos.py /tmp/referencia.py 8000
+import contextlib
+import io
+import os
+import sys
+
+from bench_fases import semantico
+from comum import DIRETORIO, carregaCompilador, fluxoDe, melhorTempo
+from gera_programa import geraProgramaGlobais
+
+
+def mede(compilador, programa):
+    _, parser = compilador.constroiAnalisadores()
+    fluxo = fluxoDe(compilador, programa)
+    saida = io.StringIO()
+    tempos = {}
+    with contextlib.redirect_stdout(saida):
+        fluxo.reinicia()
+        concreta = parser.parse(lexer=fluxo)
+        fluxo.reinicia()
+        compilador.ARVORE_REDUZIDA = True
+        reduzida = parser.parse(lexer=fluxo)
+        compilador.ARVORE_REDUZIDA = False
+        tempos['concreta'] = melhorTempo(lambda: semantico(compilador, concreta, False), 3)
+        compilador.tabela_raiz.printaArvore()
+        tempos['reduzida'] = melhorTempo(lambda: semantico(compilador, reduzida, True), 3)
+        compilador.tabela_raiz.printaArvore()
+    return tempos, saida.getvalue()
+
+
+if __name__ == '__main__':
+    if len(sys.argv) < 2:
+        print("uso: python benchmarks/bench_simbolos.py <compilador.py de referência> [máximo de globais]")
+        sys.exit(2)
+    maior = int(sys.argv[2]) if len(sys.argv) > 2 else 8000
+    atual = carregaCompilador('compilador', os.path.join(DIRETORIO, 'compilador.py'))
+    referencia = carregaCompilador('compilador_referencia', sys.argv[1])
+
+    print("%8s %24s %24s" % ('globais', 'concreta atual / ref', 'reduzida atual / ref'))
+    globais = maior // 8
+    while globais <= maior:
+        programa = geraProgramaGlobais(globais)
+        tempos, saida = mede(atual, programa)
+        tempos_ref, saida_ref = mede(referencia, programa)
+        if saida != saida_ref:
+            print("As duas versões não produzem as mesmas mensagens e tabelas")
+            sys.exit(1)
+        print("%8d %10.1f / %8.1f ms %10.1f / %8.1f ms" % (
+            globais, tempos['concreta'] * 1000, tempos_ref['concreta'] * 1000,
+            tempos['reduzida'] * 1000, tempos_ref['reduzida'] * 1000))
+        globais *= 2
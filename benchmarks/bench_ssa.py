@@ -0,0 +1,67 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# módulo gerado pelo KodoGen sem os passes de otimização do LLVM (sem -O): número de instruções do IR,
+# tempo da geração de código (compilação com geraCodigo menos a compilação só com a análise), tempo
+# da emissão do objeto no -O0 do gerador de código e tempo de execução do executável com o gerador
+# de código no -O0 e no -O2 (o do --run sem -O), para os programas do corpusExecucao e um programa
+# grande do geraPrograma. Com o caminho de outro compilador.py (por exemplo uma versão anterior
+# tirada do git) mede as duas versões lado a lado e confere que os executáveis escrevem a mesma saída
+# uso: python benchmarks/bench_ssa.py [escala] [compilador.py de referência]
+#      git show HEAD~1:compilador.py > /tmp/referencia.py
+#      python benchmarks/bench_ssa.py 1 /tmp/referencia.py
+import os
+import subprocess
+import sys
+import tempfile
+
+from comum import DIRETORIO, carregaCompilador, melhorTempo
+from gera_programa import corpusExecucao, geraPrograma
+
+
+def instrucoes(modulo):
+    return sum(1 for linha in str(modulo).splitlines() if linha.startswith('  ') and not linha.endswith(':'))
+
+
+def mede(compilador, programa):
+    def compila(geraCodigo):
+        return compilador.CompilerSession(reducao_direta=True, geraCodigo=geraCodigo).compile(programa)
+
+    modulo = compila(True).modulo
+    codigo = max(melhorTempo(lambda: compila(True), 3) - melhorTempo(lambda: compila(False), 3), 0.0)
+    emissao = melhorTempo(lambda: compilador.emiteModulo(modulo, 'meu_modulo.o', nivel=0), 3)
+    medidas = [instrucoes(modulo), codigo, emissao]
+    for nivel in (0, 2):
+        compilador.emiteModulo(modulo, 'meu_modulo.o', nivel=nivel)
+        if compilador.ligaExecutavel('meu_modulo.o') != 0:
+            raise RuntimeError("gcc falhou")
+        medidas.append(melhorTempo(lambda: subprocess.run(['./exec'], input=b'3\n', capture_output=True), 3))
+    saida = subprocess.run(['./exec'], input='3\n', capture_output=True, text=True).stdout
+    return medidas, saida
+
+
+def linha(nome, medidas):
+    return "%-10s %8d" % (nome, medidas[0]) + "".join("%12.1f" % (tempo * 1000) for tempo in medidas[1:])
+
+
+if __name__ == '__main__':
+    escala = int(sys.argv[1]) if len(sys.argv) > 1 else 1
+    compilador = carregaCompilador('compilador', os.path.join(DIRETORIO, 'compilador.py'))
+    referencia = carregaCompilador('referencia', sys.argv[2]) if len(sys.argv) > 2 else None
+    programas = dict(corpusExecucao(escala))
+    programas['grande'] = geraPrograma(200 * escala)
+    print("%-10s %8s %12s %12s %12s %12s" % ("", "instr.", "código ms", "objeto ms", "exec. llc0", "exec. llc2"))
+    diretorio = os.getcwd()
+    with tempfile.TemporaryDirectory() as temporario:
+        os.chdir(temporario)
+        try:
+            for nome, programa in programas.items():
+                medidas, saida = mede(compilador, programa)
+                print(linha(nome, medidas))
+                if referencia is not None:
+                    medidas_referencia, saida_referencia = mede(referencia, programa)
+                    print(linha("  (ref.)", medidas_referencia))
+                    if saida != saida_referencia:
+                        print("%s: as duas versões não escrevem a mesma saída" % nome)
+                        sys.exit(1)
+        finally:
+            os.chdir(diretorio)
@@ -0,0 +1,71 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# mede a geração de código com os tipos das expressões vindos do anotaTipos contra uma versão anterior
+# do compilador.py (que comparava os tipos do LLVM como strings) e confere que o código gerado é o
+# mesmo. Num programa que mistura inteiro e flutuante, com locais que escondem globais de outro tipo,
+# mede só a versão atual (a anterior usava o endereço da global) e confere o módulo com o verificador
+# do LLVM
+# uso: python benchmarks/bench_tipagem.py <compilador.py de referência> [numero de funções]
+#      git show HEAD~1:compilador.py > /tmp/referencia.py
+#      python benchmarks/bench_tipagem.py /tmp/referencia.py 500
+import contextlib
+import io
+import os
+import sys
+
+from llvmlite import binding as llvm
+
+from bench_fases import codigo
+from comum import DIRETORIO, carregaCompilador, fluxoDe, melhorTempo, reiniciaGlobais
+from gera_programa import geraPrograma, geraProgramaTiposMistos
+
+
+def arvoreAnalisada(compilador, programa):
+    _, parser = compilador.constroiAnalisadores()
+    reiniciaGlobais(compilador)
+    compilador.ARVORE_REDUZIDA = True
+    with contextlib.redirect_stdout(io.StringIO()):
+        arvore = parser.parse(lexer=fluxoDe(compilador, programa))
+        compilador.recomecoReduzida(arvore)
+        compilador.verificaTipoRetornaReduzida(arvore)
+    compilador.ARVORE_REDUZIDA = False
+    return arvore
+
+
+def geraCodigo(compilador, arvore):
+    with contextlib.redirect_stdout(io.StringIO()):  # como no -g, o KodoGen escreve o módulo na saída
+        return codigo(compilador, arvore)
+
+
+# a anotação fica memoizada no índice da árvore: mede numa árvore nova a cada repetição
+def tempoAnotacao(compilador, programa):
+    arvores = [arvoreAnalisada(compilador, programa) for _ in range(3)]
+    return melhorTempo(lambda: compilador.anotaTipos(arvores.pop()), 3)
+
+
+if __name__ == '__main__':
+    if len(sys.argv) < 2:
+        print("uso: python benchmarks/bench_tipagem.py <compilador.py de referência> [numero de funções]")
+        sys.exit(2)
+    numero_funcoes = int(sys.argv[2]) if len(sys.argv) > 2 else 500
+    atual = carregaCompilador('compilador', os.path.join(DIRETORIO, 'compilador.py'))
+    referencia = carregaCompilador('compilador_referencia', sys.argv[1])
+    sys.setrecursionlimit(100000)
+
+    programa = geraPrograma(numero_funcoes)
+    arvore = arvoreAnalisada(atual, programa)
+    arvore_ref = arvoreAnalisada(referencia, programa)
+    if geraCodigo(atual, arvore) != geraCodigo(referencia, arvore_ref):
+        print("As duas versões não geram o mesmo código")
+        sys.exit(1)
+    print("entrada: %d funções" % numero_funcoes)
+    print("código, referência:          %8.1f ms" % (melhorTempo(lambda: geraCodigo(referencia, arvore_ref), 3) * 1000))
+    print("código, tipos anotados:      %8.1f ms" % (melhorTempo(lambda: geraCodigo(atual, arvore), 3) * 1000))
+    print("  só o anotaTipos:           %8.1f ms" % (tempoAnotacao(atual, programa) * 1000))
+
+    misto = geraProgramaTiposMistos(numero_funcoes)
+    arvore = arvoreAnalisada(atual, misto)
+    llvm.parse_assembly(geraCodigo(atual, arvore)).verify()
+    print("tipos mistos (módulo verificado pelo LLVM):")
+    print("código, tipos anotados:      %8.1f ms" % (melhorTempo(lambda: geraCodigo(atual, arvore), 3) * 1000))
+    print("  só o anotaTipos:           %8.1f ms" % (tempoAnotacao(atual, misto) * 1000))
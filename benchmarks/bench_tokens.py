@@ -0,0 +1,84 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# memória por token: lista de LexToken, lista de tuplas (tipo, valor) como o driver fazia, e BufferTokens
+# (token a token, preenchido em bloco pelo AnalisadorRapido.preenche e, no modo mapeado, o
+# BufferTokensMapeado, que não guarda valores)
+# uso: python benchmarks/bench_tokens.py [numero de funções]
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import compilador
+from gera_programa import geraPrograma
+
+
+def mede(constroi):
+    tracemalloc.start()
+    inicio = time.perf_counter()
+    resultado = constroi()
+    tempo = time.perf_counter() - inicio
+    memoria, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return resultado, memoria, tempo
+
+
+if __name__ == '__main__':
+    numero_funcoes = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    programa = geraPrograma(numero_funcoes)
+    lexer = compilador.AnalisadorRapido()
+
+    def lexTokens():
+        lexer.input(programa)
+        return list(lexer)
+
+    def tuplas():
+        lexer.input(programa)
+        return [(tok.type, str(tok.value)) for tok in lexer]
+
+    def buffer():
+        lexer.input(programa)
+        b = compilador.BufferTokens()
+        for tok in lexer:
+            b.append(tok)
+        return b
+
+    def preenchido():
+        lexer.input(programa)
+        b = compilador.BufferTokens()
+        lexer.preenche(b)
+        return b
+
+    def mapeado():
+        mapeado = compilador.AnalisadorMapeado()
+        mapeado.input(compilador.abreMapeado(arquivo.name))
+        b = mapeado.novoBuffer()
+        mapeado.preenche(b)
+        return b
+
+    with tempfile.NamedTemporaryFile('w', suffix='.tpp', delete=False, encoding='utf-8') as arquivo:
+        arquivo.write(programa)
+
+    lista, memoria_lista, tempo_lista = mede(lexTokens)
+    quantidade = len(lista)
+    del lista
+    _, memoria_tuplas, tempo_tuplas = mede(tuplas)
+    b, memoria_buffer, tempo_buffer = mede(buffer)
+    assert len(b) == quantidade
+    b, memoria_preenchido, tempo_preenchido = mede(preenchido)
+    assert len(b) == quantidade
+    b, memoria_mapeado, tempo_mapeado = mede(mapeado)
+    assert len(b) == quantidade
+    del b
+    os.unlink(arquivo.name)
+
+    print("tokens: %d" % quantidade)
+    print("lista de LexToken:   %7.1f bytes/token  (%6.0f ms)" % (memoria_lista / quantidade, tempo_lista * 1000))
+    print("lista de tuplas:     %7.1f bytes/token  (%6.0f ms)" % (memoria_tuplas / quantidade, tempo_tuplas * 1000))
+    print("BufferTokens:        %7.1f bytes/token  (%6.0f ms)" % (memoria_buffer / quantidade, tempo_buffer * 1000))
+    print("  (preenche):        %7.1f bytes/token  (%6.0f ms)" % (memoria_preenchido / quantidade,
+                                                                 tempo_preenchido * 1000))
+    print("  (mapeado):         %7.1f bytes/token  (%6.0f ms)" % (memoria_mapeado / quantidade, tempo_mapeado * 1000))
@@ -0,0 +1,65 @@
+# -*- coding: utf-8 -*-
+# funções usadas por vários benchmarks: carregar uma versão do compilador, zerar as globais entre
+# uma compilação e outra, tokenizar uma entrada, medir tempo e comparar árvores
+import importlib.util
+import os
+import sys
+import time
+
+DIRETORIO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, DIRETORIO)
+
+
+def carregaCompilador(nome, caminho):
+    spec = importlib.util.spec_from_file_location(nome, caminho)
+    modulo = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(modulo)
+    return modulo
+
+
+def reiniciaGlobais(compilador):
+    compilador.tabela_raiz = compilador.Table(nome="global")
+    compilador.guardaTipo = ""
+    compilador.semantic_error = False
+    compilador.ERRO_SINTATICO = False
+    if hasattr(compilador, 'diagnosticos'):
+        compilador.diagnosticos.limpa()
+    del compilador.CARACTERES_INVALIDOS[:]
+    del compilador.ABRE_CHAVES_LINHA[:]
+    del compilador.FECHA_CHAVES_SOLO[:]
+
+
+# com tokeniza=True lê todos os tokens antes, assim o tempo medido depois não inclui o léxico (o
+# FluxoTokens atual já preenche tudo no input, as versões anteriores do compilador liam sob demanda)
+def fluxoDe(compilador, data, tokeniza=True):
+    fluxo = compilador.FluxoTokens(compilador.AnalisadorRapido())
+    fluxo.input(data)
+    if tokeniza:
+        for _ in fluxo:
+            pass
+    return fluxo
+
+
+def melhorTempo(funcao, repeticoes=3):
+    melhor = None
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        funcao()
+        tempo = time.perf_counter() - inicio
+        melhor = tempo if melhor is None else min(melhor, tempo)
+    return melhor
+
+
+# comparação iterativa: as árvores dos programas grandes passam do limite de recursão
+def mesmaArvore(a, b):
+    pilha = [(a, b)]
+    while pilha:
+        a, b = pilha.pop()
+        if a is None or b is None:
+            if a is not b:
+                return False
+            continue
+        if a.type != b.type or a.leaf != b.leaf or len(a.children) != len(b.children):
+            return False
+        pilha.extend(zip(a.children, b.children))
+    return True
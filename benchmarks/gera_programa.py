@@ -0,0 +1,246 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# gera programas T++ sintéticos (grandes) para os benchmarks
+# uso: python benchmarks/gera_programa.py <numero de funções> > programa.tpp
+import random
+import sys
+
+
+def geraFuncao(indice, rnd):
+    nome = 'funcao%d' % indice
+    linhas = [
+        '{ função gerada número %d: calcula 1.5 * x + y }' % indice,
+        'inteiro %s(inteiro: x, flutuante: y)' % nome,
+        '  inteiro: a, b, c',
+        '  flutuante: f',
+        '  inteiro: vetor[10]',
+        '  a := x + %d' % rnd.randint(0, 1000),
+        '  b := a * 2 - x / 3',
+        '  f := y * %d.%d' % (rnd.randint(0, 99), rnd.randint(0, 99)),
+        '  c := 0',
+        '  repita',
+        '    vetor[c] := c * a',
+        '    c := c + 1',
+        '  até c = 10',
+        '  se a > b então',
+        '    escreva(a)',
+        '  senão',
+        '    escreva(f)',
+        '  fim',
+    ]
+    if indice > 0:
+        linhas.append('  b := funcao%d(a, f)' % rnd.randint(0, indice - 1))
+    linhas += [
+        '  retorna(a + b)',
+        'fim',
+        '',
+    ]
+    return '\n'.join(linhas)
+
+
+def geraPrograma(numero_funcoes, semente=42):
+    rnd = random.Random(semente)
+    partes = ['inteiro: global_a, global_b', 'flutuante: global_f', '']
+    for i in range(numero_funcoes):
+        partes.append(geraFuncao(i, rnd))
+    partes += [
+        'inteiro principal()',
+        '  inteiro: n',
+        '  leia(n)',
+        '  global_a := funcao%d(n, 2.5)' % (numero_funcoes - 1) if numero_funcoes else '  global_a := n',
+        '  escreva(global_a)',
+        '  retorna(0)',
+        'fim',
+        '',
+    ]
+    return '\n'.join(partes)
+
+
+# programa com se e repita alternados, aninhados até a profundidade pedida, e uma expressão com
+# muitos termos no nível mais interno: nenhum passe do compilador pode depender da recursão do Python
+def geraProgramaAninhado(profundidade, termos=1000):
+    linhas = ['inteiro principal()', 'inteiro: a', 'a := 0']
+    for nivel in range(profundidade):
+        linhas.append('se a < 1 então' if nivel % 2 == 0 else 'repita')
+    linhas.append('a := a' + ' + 1' * termos)
+    for nivel in reversed(range(profundidade)):
+        linhas.append('fim' if nivel % 2 == 0 else 'até 1')
+    linhas += ['retorna(a)', 'fim', '']
+    return '\n'.join(linhas)
+
+
+# uma função só, com muitos parâmetros e um corpo longo (atribuições e se): o custo
+# dos passes que procuram parâmetros e retornas dentro da função cresce com o tamanho dela
+def geraProgramaFuncaoLonga(comandos, parametros=50):
+    lista = ', '.join('inteiro: p%d' % i for i in range(parametros))
+    linhas = ['inteiro longa(%s)' % lista, '  inteiro: a', '  a := p0']
+    for i in range(comandos):
+        linhas.append('  a := a + p%d' % (i % parametros))
+        if i % 100 == 99:
+            linhas += ['  se a > %d então' % i, '    escreva(a)', '  fim']
+    linhas += ['  retorna(a)', 'fim', '',
+               'inteiro principal()', '  retorna(longa(%s))' % ', '.join(['1'] * parametros), 'fim', '']
+    return '\n'.join(linhas)
+
+
+# muitas variáveis globais, todas inicializadas e lidas na principal: o custo das consultas às
+# tabelas de símbolos cresce com o número de nomes em cada escopo
+def geraProgramaGlobais(numero_globais):
+    linhas = ['inteiro: g%d' % i if i % 2 == 0 else 'flutuante: g%d' % i for i in range(numero_globais)]
+    linhas += ['inteiro principal()', '  inteiro: a', '  a := 0']
+    for i in range(numero_globais):
+        linhas += ['  g%d := a + %d' % (i, i), '  escreva(g%d)' % i]
+    linhas += ['  retorna(a)', 'fim', '']
+    return '\n'.join(linhas)
+
+
+# funções com variáveis locais de nomes próprios (v0 só na funcao0, v1 só na funcao1...): achar o
+# tipo de um nome procurando em todas as tabelas passa pelas tabelas das funções anteriores
+def geraProgramaNomesLocais(numero_funcoes):
+    linhas = []
+    for i in range(numero_funcoes):
+        linhas += ['inteiro funcao%d(inteiro: p%d)' % (i, i), '  inteiro: v%d' % i, '  v%d := p%d' % (i, i),
+                   '  se v%d > 0 então' % i, '    v%d := v%d - 1' % (i, i), '  fim',
+                   '  retorna(v%d)' % i, 'fim', '']
+    linhas += ['inteiro principal()', '  retorna(funcao0(1))', 'fim', '']
+    return '\n'.join(linhas)
+
+
+# cada função gera os avisos de variável não utilizada, atribuição de tipos distintos, variável não
+# inicializada e função não utilizada, e um erro de variável não declarada
+def geraProgramaAvisos(numero_funcoes):
+    linhas = []
+    for i in range(numero_funcoes):
+        linhas += ['inteiro funcao%d()' % i, '  inteiro: a, b, nunca', '  flutuante: f', '  a := 1.5',
+                   '  f := a', '  escreva(b)', '  x := a', '  retorna(a)', 'fim', '']
+    linhas += ['inteiro principal()', '  retorna(0)', 'fim', '']
+    return '\n'.join(linhas)
+
+
+# expressões que misturam inteiro e flutuante (operações, argumentos e atribuições que pedem
+# conversão) e locais com o mesmo nome de globais de outro tipo
+def geraProgramaTiposMistos(numero_funcoes):
+    linhas = ['inteiro: n', 'flutuante: x, y', '']
+    for i in range(numero_funcoes):
+        linhas += ['flutuante funcao%d(inteiro: a, flutuante: b)' % i, '  inteiro: x, v[4]', '  flutuante: c',
+                   '  x := a * 2', '  c := b + x * 1.5', '  v[1] := x + a', '  n := c / 2 + v[1]',
+                   '  se c > a então', '    escreva(c + a)', '  fim', '  retorna(c * b - x)', 'fim', '']
+        if i > 0:
+            linhas[-3:-3] = ['  c := funcao%d(c, x)' % (i - 1)]
+    linhas += ['inteiro principal()', '  y := funcao%d(n, 2)' % (numero_funcoes - 1) if numero_funcoes else '  y := n',
+               '  escreva(y)', '  retorna(0)', 'fim', '']
+    return '\n'.join(linhas)
+
+
+# uma função com muitas variáveis locais, escritas e lidas dentro de se e repita aninhados (algumas só
+# num dos ramos do se): o grafo de fluxo tem muitos blocos e cada conjunto do fluxo de dados tem um
+# bit por variável
+def geraProgramaMuitasVariaveis(numero_variaveis, por_bloco=20):
+    nomes = ['v%d' % i for i in range(numero_variaveis)]
+    linhas = ['inteiro principal()', '  inteiro: n']
+    linhas += ['  inteiro: %s' % ', '.join(nomes[i:i + por_bloco]) for i in range(0, numero_variaveis, por_bloco)]
+    linhas += ['  leia(n)']
+    for i in range(0, numero_variaveis, por_bloco):
+        grupo = nomes[i:i + por_bloco]
+        linhas += ['  repita']
+        linhas += ['    %s := n + %d' % (nome, j) for j, nome in enumerate(grupo[:-1])]
+        linhas += ['    se n > %d então' % i, '      %s := %s * 2' % (grupo[-1], grupo[0]), '    fim']
+        linhas += ['    n := n - 1', '  até n < %d' % i, '  escreva(%s + %s)' % (grupo[-1], grupo[-2])]
+    linhas += ['  retorna(n)', 'fim', '']
+    return '\n'.join(linhas)
+
+
+# programas pequenos que passam o tempo rodando (e não compilando), para medir o código gerado: laços
+# aninhados, recursão, vetor global e ponto flutuante. escala multiplica o trabalho de cada um
+def corpusExecucao(escala=1):
+    return {
+        'laco': '\n'.join([
+            'inteiro principal()',
+            '  inteiro: i, j, s',
+            '  s := 0',
+            '  i := 0',
+            '  repita',
+            '    j := 0',
+            '    repita',
+            '      s := s + i * j - s / 7',
+            '      j := j + 1',
+            '    até j = 2000',
+            '    i := i + 1',
+            '  até i = %d' % (1000 * escala),
+            '  escreva(s)',
+            '  retorna(0)',
+            'fim', '']),
+        # o retorna fica no fim: o KodoGen não gera nada depois de um retorna
+        'fib': '\n'.join([
+            'inteiro fib(inteiro: n)',
+            '  inteiro: r',
+            '  r := n',
+            '  se n > 1 então',
+            '    r := fib(n - 1) + fib(n - 2)',
+            '  fim',
+            '  retorna(r)',
+            'fim',
+            '',
+            'inteiro principal()',
+            '  escreva(fib(%d))' % (14 + escala),
+            '  retorna(0)',
+            'fim', '']),
+        'ordena': '\n'.join([
+            'inteiro: v[%d]' % (1000 * escala),
+            '',
+            'ordena(inteiro: n)',
+            '  inteiro: i, j, t',
+            '  i := 0',
+            '  repita',
+            '    j := 0',
+            '    repita',
+            '      se v[j] > v[j + 1] então',
+            '        t := v[j]',
+            '        v[j] := v[j + 1]',
+            '        v[j + 1] := t',
+            '      fim',
+            '      j := j + 1',
+            '    até j = n - 1 - i',
+            '    i := i + 1',
+            '  até i = n - 1',
+            'fim',
+            '',
+            'inteiro principal()',
+            '  inteiro: i, x',
+            '  x := 12345',
+            '  i := 0',
+            '  repita',
+            '    x := x * 1103 + 12345',
+            '    x := x - (x / 65536) * 65536',
+            '    v[i] := x',
+            '    i := i + 1',
+            '  até i = %d' % (1000 * escala),
+            '  ordena(%d)' % (1000 * escala),
+            '  escreva(v[0])',
+            '  escreva(v[%d])' % (1000 * escala - 1),
+            '  retorna(0)',
+            'fim', '']),
+        'integral': '\n'.join([
+            'flutuante f(flutuante: x)',
+            '  retorna(x * x * x - 2.0 * x + 1.0)',
+            'fim',
+            '',
+            'inteiro principal()',
+            '  inteiro: i, n',
+            '  flutuante: s, h',
+            '  n := %d' % (1000000 * escala),
+            '  h := 1.0 / n',
+            '  s := 0.0',
+            '  i := 0',
+            '  repita',
+            '    s := s + f(i * h) * h',
+            '    i := i + 1',
+            '  até i = n',
+            '  escreva(s)',
+            '  retorna(0)',
+            'fim', '']),
+    }
+
+
+if __name__ == '__main__':
+    sys.stdout.write(geraPrograma(int(sys.argv[1]) if len(sys.argv) > 1 else 100))
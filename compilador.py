@@ -13,12 +13,34 @@ from graphviz import Graph, Digraph
 from nani import aleatorio as arv_reduzida
 
 import argparse
+import collections
+import concurrent.futures
+import contextlib
+import ctypes
+import gc
+import hashlib
+import importlib.util
+import json
+import marshal
+import mmap
+import multiprocessing
+import re
+import shutil
+import struct
 import sys
+import tempfile
+import threading
+import time
+import zlib
 import ply.lex as lex
 import ply.yacc as yacc
 import logging
 import numbers
+import operator
+from array import array
+from itertools import accumulate
 
+from llvmlite import binding as llvm
 from llvmlite import ir
 
 # listas que armazenam dados para tratamento de erro léxico
@@ -29,6 +51,166 @@ CARACTERES_INVALIDOS = []
 # variavel sucesso analise sintática
 ERRO_SINTATICO = False
 
+# quando True as ações do parser já montam a árvore reduzida (a mesma que o arv_reduzida devolve),
+# sem passar pela árvore concreta
+ARVORE_REDUZIDA = False
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~ DIAGNÓSTICOS ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+# os erros e avisos das análises léxica, sintática e semântica não são mais impressos na hora: cada
+# um vira um Diagnostico (código, linha e as partes da mensagem, como eram passadas ao print) no
+# coletor global `diagnosticos`, e o driver escreve tudo de uma vez depois da análise. A mensagem
+# só é montada na escrita, então os diagnósticos descartados pelo limite de erros, pela supressão
+# por código ou pela remoção de repetidos não custam nada além do append.
+# No formato texto a saída é a mesma dos antigos print (rótulo da severidade + partes separadas por
+# espaço); no formato json cada diagnóstico é uma linha com severidade, codigo, linha e mensagem.
+# A linha é None nos diagnósticos semânticos (os nós da árvore não guardam a linha do fonte)
+
+# código -> (fase, severidade)
+CODIGOS_DIAGNOSTICO = {
+    'chave-fechada-sem-abrir': ('lexico', 'erro'),
+    'chave-aberta-sem-fechar': ('lexico', 'erro'),
+    'caractere-invalido': ('lexico', 'erro'),
+    'erro-sintatico': ('sintatico', 'erro'),
+    'falta-fim': ('sintatico', 'erro'),
+    'retorna-sem-argumento': ('sintatico', 'erro'),
+    'leia-sem-argumento': ('sintatico', 'erro'),
+    'escreva-sem-argumento': ('sintatico', 'erro'),
+    'dica-declaracao': ('sintatico', 'dica'),
+    'dica-indice': ('sintatico', 'dica'),
+    'dica-cabecalho': ('sintatico', 'dica'),
+    'dica-atribuicao': ('sintatico', 'dica'),
+    'variavel-nao-utilizada': ('semantico', 'aviso'),
+    'funcao-nao-utilizada': ('semantico', 'aviso'),
+    'variavel-nao-inicializada': ('semantico', 'aviso'),
+    'variavel-redeclarada': ('semantico', 'aviso'),
+    'atribuicao-tipos-distintos': ('semantico', 'aviso'),
+    'chamada-recursiva-principal': ('semantico', 'aviso'),
+    'principal-nao-declarada': ('semantico', 'erro'),
+    'indice-nao-inteiro': ('semantico', 'erro'),
+    'variavel-nao-declarada': ('semantico', 'erro'),
+    'funcao-nao-declarada': ('semantico', 'erro'),
+    'parametros-a-menos': ('semantico', 'erro'),
+    'tipo-retorno': ('semantico', 'erro'),
+}
+
+# rótulo que a saída em texto põe antes da mensagem (as mensagens léxicas e sintáticas nunca tiveram)
+ROTULOS_DIAGNOSTICO = {'erro': '[ERRO]:', 'aviso': '[AVISO]:'}
+
+# o json.dumps com ensure_ascii=False cria um codificador novo a cada chamada
+CODIFICADOR_JSON = json.JSONEncoder(ensure_ascii=False)
+
+
+class Diagnostico():
+    __slots__ = ('codigo', 'linha', 'partes')
+
+    def __init__(self, codigo, linha, partes):
+        self.codigo = codigo
+        self.linha = linha
+        self.partes = partes
+
+    @property
+    def fase(self):
+        return CODIGOS_DIAGNOSTICO[self.codigo][0]
+
+    @property
+    def severidade(self):
+        return CODIGOS_DIAGNOSTICO[self.codigo][1]
+
+    @property
+    def mensagem(self):
+        return ' '.join(map(str, self.partes))
+
+    def texto(self):
+        if self.fase == 'semantico':
+            return ROTULOS_DIAGNOSTICO[self.severidade] + ' ' + self.mensagem
+        return self.mensagem
+
+    def json(self):
+        return CODIFICADOR_JSON.encode({'severidade': self.severidade, 'codigo': self.codigo, 'linha': self.linha,
+                                        'mensagem': self.mensagem})
+
+
+class Diagnosticos():
+    def __init__(self):
+        self.limpa()
+
+    def limpa(self):
+        self.lista = []
+        self.errosSemanticos = 0
+
+    # partes como no print antigo: print("[AVISO]: Variavel '", nome, "' ...") vira
+    # emite('variavel-...', "Variavel '", nome, "' ...")
+    def emite(self, codigo, *partes, linha=None):
+        self.lista.append(Diagnostico(codigo, linha, partes))
+        if CODIGOS_DIAGNOSTICO[codigo] == ('semantico', 'erro'):
+            self.errosSemanticos += 1
+
+    # o semantic_error de antes: a geração de código não roda quando é True
+    @property
+    def erroSemantico(self):
+        return self.errosSemanticos > 0
+
+    def conta(self):
+        contagem = {}
+        for d in self.lista:
+            contagem[d.codigo] = contagem.get(d.codigo, 0) + 1
+        return contagem
+
+    # diagnósticos que vão para a saída: sem os códigos suprimidos, sem repetidos (mesmo código,
+    # linha e mensagem) se pedido, e só até o limite de erros (0 é sem limite)
+    def selecionados(self, suprimidos=(), limiteErros=0, semRepeticao=False):
+        suprimidos = set(suprimidos)
+        vistos = set()
+        erros = 0
+        escolhidos = []
+        omitidos = 0
+        for d in self.lista:
+            if d.codigo in suprimidos:
+                continue
+            if semRepeticao:
+                chave = (d.codigo, d.linha, d.partes)
+                if chave in vistos:
+                    continue
+                vistos.add(chave)
+            if CODIGOS_DIAGNOSTICO[d.codigo][1] == 'erro':
+                erros += 1
+                if limiteErros and erros > limiteErros:
+                    omitidos += 1
+                    continue
+            escolhidos.append(d)
+        return escolhidos, omitidos
+
+    def formata(self, formato='texto', suprimidos=(), limiteErros=0, semRepeticao=False):
+        escolhidos, omitidos = self.selecionados(suprimidos, limiteErros, semRepeticao)
+        if formato == 'json':
+            linhas = [d.json() for d in escolhidos]
+            if omitidos:
+                linhas.append(CODIFICADOR_JSON.encode({'severidade': 'nota', 'codigo': 'limite-erros', 'linha': None,
+                                                       'mensagem': '%d erros omitidos' % omitidos}))
+        else:
+            linhas = [d.texto() for d in escolhidos]
+            if omitidos:
+                linhas.append('[NOTA]: limite de %d erros atingido, %d erros omitidos' % (limiteErros, omitidos))
+        return ''.join(linha + '\n' for linha in linhas)
+
+    # uma única escrita na saída para todos os diagnósticos
+    def escreve(self, arquivo=None, **opcoes):
+        saida = self.formata(**opcoes)
+        if saida:
+            (arquivo or sys.stdout).write(saida)
+
+    # para o cache de árvores: tuplas só com str, int, float e None (o marshal não grava objetos)
+    def serializa(self):
+        return tuple((d.codigo, d.linha, tuple(p if p is None or isinstance(p, (str, int, float)) else str(p)
+                                               for p in d.partes)) for d in self.lista)
+
+    def adicionaSerializados(self, serializados):
+        for codigo, linha, partes in serializados:
+            self.emite(codigo, *partes, linha=linha)
+
+
+diagnosticos = Diagnosticos()
+
 # palavras reservadas da linguagem são definidas aqui
 palavras_reservadas = {
     'se': 'SE',
@@ -206,10 +388,647 @@ def t_error(t):
     t.lexer.skip(1)
 
 
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~ ANALISADOR LÉXICO RÁPIDO (SEM PLY) ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+# junta todas as regras t_* acima em uma única expressão regular por estado e trata os tokens num
+# laço só, sem chamar uma função por token. Segue a mesma ordem de prioridade do ply (funções na
+# ordem em que foram definidas, depois strings da maior para a menor regex, e o estado COMENTARIO
+# é inclusivo, então tenta as regras dele e depois as do INITIAL).
+
+# o que cada regra definida por função faz (as regras por string sempre geram token)
+TOKEN, IDENTIFICADOR, INTEIRO, FLUTUANTE, NOVA_LINHA, IGNORA, ERRO, FECHA_SOLO, ABRE_COMENTARIO, \
+    FECHA_COMENTARIO = range(10)
+
+ACOES_LEXICAS = {
+    't_start_comentario': ABRE_COMENTARIO,
+    't_IDENTIFICADOR': IDENTIFICADOR,
+    't_FECHA_CHAVES_SOLO': FECHA_SOLO,
+    't_FLUTUANTE': FLUTUANTE,
+    't_INTEIRO': INTEIRO,
+    't_NOVA_LINHA': NOVA_LINHA,
+    't_COMENTARIO_newline': NOVA_LINHA,
+    't_COMENTARIO_tab': IGNORA,
+    't_COMENTARIO_flut': IGNORA,
+    't_COMENTARIO_int': IGNORA,
+    't_COMENTARIO_ident': IGNORA,
+    't_COMENTARIO_end': FECHA_COMENTARIO,
+}
+
+
+# monta a lista de regras (nome, regex) de um estado, na mesma ordem que o ply usaria
+def regrasDoEstado(estado):
+    modulo = globals()
+    nomes_estados = [e[0] for e in states]
+    funcoes = []
+    strings = []
+    for nome, regra in modulo.items():
+        if not nome.startswith('t_') or nome.endswith('error') or nome.endswith('ignore'):
+            continue
+        partes = nome.split('_')
+        estado_regra = partes[1] if partes[1] in nomes_estados else 'INITIAL'
+        if estado_regra != estado:
+            continue
+        if callable(regra):
+            if nome not in ACOES_LEXICAS:
+                raise SyntaxError("Regra léxica '%s' sem ação no analisador rápido" % nome)
+            funcoes.append((nome, regra.__doc__))
+        else:
+            strings.append((nome, regra))
+    funcoes.sort(key=lambda item: modulo[item[0]].__code__.co_firstlineno)
+    strings.sort(key=lambda item: len(item[1]), reverse=True)
+    return funcoes + strings
+
+
+# traduz uma classe de caracteres com faixas fora do ascii (ex: À-ÿ) para alternativas em bytes utf-8
+def classeParaBytes(itens):
+    ascii = []
+    alternativas = []
+    for inicio, fim in itens:
+        if fim < 0x80:
+            ascii.append(re.escape(chr(inicio)) if inicio == fim else
+                         '%s-%s' % (re.escape(chr(inicio)), re.escape(chr(fim))))
+            continue
+        if fim > 0x7ff:
+            raise SyntaxError("Faixa '%s-%s' não suportada no modo mapeado" % (chr(inicio), chr(fim)))
+        if inicio < 0x80:
+            ascii.append('%s-\\x7f' % re.escape(chr(inicio)))
+            inicio = 0x80
+        # dois bytes: 110xxxxx 10xxxxxx, separa por byte inicial
+        for lider in range(0xc0 | (inicio >> 6), (0xc0 | (fim >> 6)) + 1):
+            baixo = 0x80 | (inicio & 0x3f) if lider == 0xc0 | (inicio >> 6) else 0x80
+            alto = 0x80 | (fim & 0x3f) if lider == 0xc0 | (fim >> 6) else 0xbf
+            alternativas.append('\\x%02x[\\x%02x-\\x%02x]' % (lider, baixo, alto))
+    if ascii:
+        alternativas.insert(0, '[%s]' % ''.join(ascii))
+    return '(?:%s)' % '|'.join(alternativas)
+
+
+# converte uma regex de texto para rodar sobre bytes utf-8 (usado com o arquivo mapeado em memória)
+# obs: \d e \w passam a aceitar só ascii, o que não muda nada para fontes T++ normais
+def regexParaBytes(regex):
+    saida = []
+    i = 0
+    while i < len(regex):
+        c = regex[i]
+        if c == '\\':
+            saida.append(regex[i:i + 2])
+            i += 2
+        elif c == '[':
+            fim = regex.index(']', i + 2 if regex[i + 1] in '^]' else i + 1)
+            conteudo = regex[i + 1:fim]
+            if all(ord(ch) < 0x80 for ch in conteudo):
+                saida.append(regex[i:fim + 1])
+            elif conteudo.startswith('^'):
+                raise SyntaxError("Classe negada com não ascii não suportada: %s" % regex[i:fim + 1])
+            else:
+                itens = []
+                j = 0
+                while j < len(conteudo):
+                    if conteudo[j] == '\\':
+                        itens.append((ord(conteudo[j + 1]), ord(conteudo[j + 1])))
+                        j += 2
+                    elif j + 2 < len(conteudo) and conteudo[j + 1] == '-':
+                        itens.append((ord(conteudo[j]), ord(conteudo[j + 2])))
+                        j += 3
+                    else:
+                        itens.append((ord(conteudo[j]), ord(conteudo[j])))
+                        j += 1
+                saida.append(classeParaBytes(itens))
+            i = fim + 1
+        elif ord(c) >= 0x80:
+            saida.append(''.join('\\x%02x' % b for b in c.encode('utf-8')))
+            i += 1
+        else:
+            saida.append(c)
+            i += 1
+    return ''.join(saida).encode('ascii')
+
+
+# compila a regex mestre de um estado: os caracteres ignorados viram um prefixo opcional de cada
+# casamento (o ply testa t_ignore antes das regras) e o grupo 'erro' pega qualquer outro caractere.
+# O prefixo é possessivo: o ply pula os ignorados um a um antes de testar as regras e nunca devolve um
+# deles, então no fim do texto um ignorado que também é token (ex: '=' no COMENTARIO) não vira token
+def compilaRegexMestre(regras, ignorados, binario=False):
+    prefixo = '[%s]*+' % ''.join(re.escape(c) for c in sorted(set(ignorados)))
+    if binario:
+        # em bytes o erro precisa pegar o caractere utf-8 inteiro, como o ply faria com o texto
+        grupos = [b'(?P<%s>%s)' % (nome.encode('ascii'), regexParaBytes(regex)) for nome, regex in regras]
+        grupos.append(b'(?P<erro>[\\xc0-\\xff][\\x80-\\xbf]*|(?s:.))')
+        regex = re.compile(regexParaBytes(prefixo) + b'(?:' + b'|'.join(grupos) + b')', re.VERBOSE)
+    else:
+        grupos = ['(?P<%s>%s)' % (nome, regex) for nome, regex in regras] + [r'(?P<erro>(?s:.))']
+        regex = re.compile(prefixo + '(?:' + '|'.join(grupos) + ')', re.VERBOSE)
+
+    # acao e tipo do token indexados pelo número do grupo (m.lastindex)
+    acoes = [None] * (regex.groups + 1)
+    tipos = [None] * (regex.groups + 1)
+    for nome, indice in regex.groupindex.items():
+        if nome == 'erro':
+            acoes[indice] = ERRO
+        elif nome in ACOES_LEXICAS:
+            acoes[indice] = ACOES_LEXICAS[nome]
+        else:
+            acoes[indice] = TOKEN
+            tipos[indice] = nome[2:]  # regra por string, o tipo do token é o próprio nome
+    return regex, acoes, tipos
+
+
+# regex dos pedaços da varredura em bloco: cada pedaço é o que vem antes de um lexema (ignorados,
+# quebras de linha e comentários sem '{' dentro) mais o lexema, com as mesmas alternativas da regex
+# mestre na mesma ordem. Não tem grupos, assim o findall devolve só a lista de textos. Também devolve
+# a regex do prefixo sozinho, que separa o lexema de cada pedaço na hora de classificar
+def compilaRegexPedacos(regras, ignorados, binario=False):
+    espacos = '[%s]*' % ''.join(re.escape(c) for c in sorted(set(ignorados + '\n')))
+    prefixo = r'%s(?:\{[^{}]*\}%s)*' % (espacos, espacos)
+    alternativas = []
+    caracteres = []  # regras seguidas de um caractere só viram uma classe (casa igual, testa uma vez)
+    for _, regex in regras + [(None, None)]:
+        literal = regex and re.fullmatch(r'\\(\W)|([^\\.^$*+?{}\[\]|()])', regex)
+        if literal:
+            caracteres.append(re.escape(literal.group(1) or literal.group(2)))
+            continue
+        if len(caracteres) > 1:
+            alternativas.append('[%s]' % ''.join(caracteres))
+        elif caracteres:
+            alternativas.append(caracteres[0])
+        caracteres = []
+        if regex is not None:
+            alternativas.append('(?:%s)' % regex)
+    if binario:
+        regex = regexParaBytes(prefixo) + b'(?:' + b'|'.join(map(regexParaBytes, alternativas)) + \
+            b'|[\\xc0-\\xff][\\x80-\\xbf]*|(?s:.))'
+        prefixo = regexParaBytes(prefixo)
+    else:
+        regex = prefixo + '(?:' + '|'.join(alternativas) + '|(?s:.))'
+    regex = re.compile(regex, re.VERBOSE)
+    if regex.groups:
+        raise SyntaxError("Regra léxica com grupo de captura não suportada na varredura em bloco")
+    return regex, re.compile(prefixo, re.VERBOSE)
+
+
+# código dos pedaços que o varre precisa tratar (caractere inválido, '}' solto, comentário aninhado,
+# sem fim ou com token dentro); os tipos de token vão de 0 a len(tokens) - 1
+ESPECIAL = 255
+
+# a varredura em bloco corta o texto em blocos de ~64K caracteres (bytes no modo mapeado): a lista de
+# pedaços ocupa bem mais que o próprio texto, e com o arquivo inteiro de uma vez o pico de memória do
+# léxico voltaria a crescer com o tamanho do fonte
+TAMANHO_BLOCO = 1 << 16
+
+
+class TabelaPedacos(dict):
+    # código do tipo de cada pedaço distinto, calculado na primeira vez que ele aparece. O mesmo cálculo
+    # guarda o índice do valor no buffer, quantas linhas o pedaço pula e o tamanho do lexema, que são
+    # lidos depois com map sobre a lista de pedaços (todos já classificados); lexemas guarda o tipo e
+    # o valor de cada lexema, que se repete em pedaços com recuos diferentes
+    def __init__(self, analisador, buffer):
+        self.analisador = analisador
+        self.buffer = buffer
+        self.valores = {}
+        self.linhas = {}
+        self.tamanhos = {}
+        self.lexemas = {}
+
+    def __missing__(self, pedaco):
+        codigo, valor, linhas, tamanho = self.analisador.classifica(pedaco, self)
+        self[pedaco] = codigo
+        self.valores[pedaco] = valor
+        self.linhas[pedaco] = linhas
+        self.tamanhos[pedaco] = tamanho
+        return codigo
+
+
+class AnalisadorRapido():
+    # mesma interface do lexer do ply (input, token, lineno, lexpos) para o yacc poder consumir
+    espacos = t_ignore + '\n'
+    quebra = '\n'
+    abre = '{'
+
+    def __init__(self):
+        inicial = regrasDoEstado('INITIAL')
+        # COMENTARIO é inclusivo: tenta as regras dele e depois as do INITIAL
+        self.inicial = compilaRegexMestre(inicial, t_ignore)
+        self.comentario = compilaRegexMestre(regrasDoEstado('COMENTARIO') + inicial, t_COMENTARIO_ignore)
+        self.pedacos, self.prefixo = compilaRegexPedacos(inicial, t_ignore)
+        self.reservadas = palavras_reservadas
+        self.lexdata = ''
+        self.lexpos = 0
+        self.lineno = 1
+        self.tokens = iter(())
+
+    def input(self, data):
+        self.lexdata = data
+        self.lexpos = 0
+        self.lineno = 1
+        self.tokens = self.varre()
+
+    def token(self):
+        return next(self.tokens, None)
+
+    def __iter__(self):
+        return self.tokens
+
+    # ~~~ varredura em bloco (usada pelo FluxoTokens) ~~~
+    # um findall por bloco corta o texto em pedaços "prefixo + lexema" e cada pedaço distinto é
+    # classificado uma vez pela TabelaPedacos. Os arrays do BufferTokens saem de map/accumulate sobre a
+    # lista de pedaços, sem criar um objeto por token. Os pedaços ESPECIAL passam pelo varre, que segue o
+    # ply passo a passo; se o varre sair do pedaço (comentário que continua depois dele) corta de novo a
+    # partir de onde ele parou
+    def preenche(self, buffer):
+        data = self.lexdata
+        tabela = TabelaPedacos(self, buffer)
+        pos = self.lexpos
+        lineno = self.lineno
+        while pos < len(data):
+            # corta logo depois de uma quebra de linha, onde nenhum token começou (um comentário cortado
+            # no meio vira pedaço ESPECIAL e o varre segue até o fim dele)
+            fim_bloco = data.find(self.quebra, pos + TAMANHO_BLOCO) + 1
+            if not fim_bloco:
+                fim_bloco = len(data)
+            pedacos = self.pedacos.findall(data, pos, fim_bloco)
+            codigos = bytes(map(tabela.__getitem__, pedacos))
+            inicio = 0
+            while True:
+                fim = codigos.find(ESPECIAL, inicio)
+                if fim == -1:
+                    fim = len(pedacos)
+                trecho = pedacos[inicio:fim]
+                if trecho:
+                    buffer.tipos.frombytes(codigos[inicio:fim])
+                    buffer.valores.extend(map(tabela.valores.__getitem__, trecho))
+                    # o token começa no fim do pedaço menos o tamanho do lexema
+                    fins = accumulate(map(len, trecho), initial=pos)
+                    next(fins)
+                    buffer.posicoes.extend(map(operator.sub, fins, map(tabela.tamanhos.__getitem__, trecho)))
+                    linhas = accumulate(map(tabela.linhas.__getitem__, trecho), initial=lineno)
+                    next(linhas)
+                    buffer.linhas.extend(linhas)
+                    pos = buffer.posicoes[-1] + tabela.tamanhos[trecho[-1]]
+                    lineno = buffer.linhas[-1]
+                if fim == len(pedacos):
+                    break
+                fim_pedaco = pos + len(pedacos[fim])
+                for tok in self.varre(pos, lineno, fim_pedaco, buffer.lexemaBruto):
+                    buffer.append(tok)
+                pos = self.lexpos
+                lineno = self.lineno
+                if pos != fim_pedaco:
+                    break  # comentário que continuou depois do pedaço: corta de novo a partir daqui
+                inicio = fim + 1
+        self.lexpos = len(data)
+        self.lineno = lineno
+
+    # tipo, índice do valor, linhas puladas e tamanho do lexema de um pedaço
+    def classifica(self, pedaco, tabela):
+        lexema = pedaco.lstrip(self.espacos)
+        if lexema.startswith(self.abre):
+            # comentário no prefixo: só fica no bloco se não gerar token (o ply gera os operadores
+            # que não estão no t_COMENTARIO_ignore, ex: &&)
+            inicio = self.prefixo.match(pedaco).end()
+            regex, acoes, _ = self.comentario
+            for m in regex.finditer(pedaco, len(pedaco) - len(lexema), inicio):
+                if acoes[m.lastindex] <= FLUTUANTE:
+                    return ESPECIAL, 0, 0, 0
+            lexema = pedaco[inicio:]
+        linhas = pedaco.count(self.quebra, 0, len(pedaco) - len(lexema))
+        if not lexema:
+            return ESPECIAL, 0, 0, 0  # só ignorados no fim do arquivo
+        classe = tabela.lexemas.get(lexema)
+        if classe is None:
+            classe = tabela.lexemas[lexema] = self.classificaLexema(lexema, tabela.buffer)
+        return classe[0], classe[1], linhas, len(lexema)
+
+    # tipo e índice do valor de um lexema (o mesmo lexema aparece em pedaços com prefixos diferentes)
+    def classificaLexema(self, lexema, buffer):
+        regex, acoes, tipos = self.inicial
+        m = regex.match(lexema)
+        indice = m.lastindex
+        acao = acoes[indice]
+        if acao == TOKEN:
+            tipo = tipos[indice]
+        elif acao == IDENTIFICADOR:
+            tipo = self.reservadas.get(lexema, 'IDENTIFICADOR')
+        elif acao == INTEIRO:
+            tipo = 'INTEIRO'
+        elif acao == FLUTUANTE:
+            tipo = 'FLUTUANTE'
+        else:
+            return ESPECIAL, 0
+        codigo = buffer.codigo_tipo[tipo]
+        return codigo, buffer.indiceLexema(codigo, lexema)
+
+    # buffer que o FluxoTokens entrega ao preenche
+    def novoBuffer(self):
+        return BufferTokens()
+
+    # texto do lexema guardado como valor (no modo mapeado o lexema vem em bytes)
+    def texto(self, lexema):
+        return lexema
+
+    # ~~~ varredura token a token ~~~
+    # com 'ate', para no primeiro casamento fora de comentário que termina nessa posição ou depois;
+    # deixa em lexpos e lineno onde parou. Com 'bruto' (modo mapeado) o valor de todo token é o lexema
+    # em bytes, sem converter
+    def varre(self, pos=0, lineno=1, ate=None, bruto=False):
+        data = self.lexdata
+        reservadas = self.reservadas
+        texto = self.texto
+        valor_texto, inteiro, flutuante = texto, int, float
+        if bruto:
+            valor_texto = inteiro = flutuante = bytes
+        LexToken = lex.LexToken
+        if ate is None:
+            ate = len(data)
+        profundidade = 0  # quantos '{' de comentário estão abertos (pilha de estados do ply)
+        while True:
+            regex, acoes, tipos = self.comentario if profundidade else self.inicial
+            mudou_estado = False
+            for m in regex.finditer(data, pos):
+                indice = m.lastindex
+                acao = acoes[indice]
+                if acao <= FLUTUANTE:  # os quatro casos que geram token
+                    valor = m.group(indice)
+                    tok = LexToken()
+                    if acao == TOKEN:
+                        tok.type = tipos[indice]
+                        tok.value = valor_texto(valor)
+                    elif acao == IDENTIFICADOR:
+                        tok.type = reservadas.get(valor, 'IDENTIFICADOR')
+                        tok.value = valor_texto(valor)
+                    elif acao == INTEIRO:
+                        tok.type = 'INTEIRO'
+                        tok.value = inteiro(valor)
+                    else:
+                        tok.type = 'FLUTUANTE'
+                        tok.value = flutuante(valor)
+                    tok.lineno = lineno
+                    tok.lexpos = m.end() - len(valor)
+                    yield tok
+                elif acao == NOVA_LINHA:
+                    lineno += m.end() - m.start(indice)
+                elif acao == ERRO:
+                    if not profundidade:
+                        CARACTERES_INVALIDOS.append((texto(m.group(indice)), lineno))
+                elif acao == FECHA_SOLO:
+                    FECHA_CHAVES_SOLO.append(lineno)
+                elif acao != IGNORA:
+                    if acao == ABRE_COMENTARIO:
+                        ABRE_CHAVES_LINHA.append(lineno)
+                        profundidade += 1
+                    else:
+                        if ABRE_CHAVES_LINHA:
+                            ABRE_CHAVES_LINHA.pop()
+                        profundidade -= 1
+                    pos = m.end()
+                    mudou_estado = True
+                    break
+                if not profundidade and m.end() >= ate:
+                    pos = m.end()
+                    break
+            else:
+                pos = len(data)
+            if not mudou_estado or (not profundidade and pos >= ate):
+                break
+        self.lineno = lineno
+        self.lexpos = pos
+
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~ ENTRADA MAPEADA EM MEMÓRIA ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+# para fontes muito grandes: o arquivo é mapeado com mmap e o lexer roda direto sobre os bytes, sem
+# uma cópia decodificada do fonte. Na varredura em bloco o buffer (BufferTokensMapeado) guarda só onde
+# está o lexema de cada token e o valor é lido do mapeamento e decodificado quando o token é pedido;
+# não há tabela de valores nem objeto por token.
+# no modo mapeado o lexpos é a posição em bytes e não em caracteres.
+
+def abreMapeado(caminho):
+    with open(caminho, 'rb') as arquivo:
+        if os.fstat(arquivo.fileno()).st_size == 0:
+            return b''  # mmap não aceita arquivo vazio
+        return mmap.mmap(arquivo.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+class AnalisadorMapeado(AnalisadorRapido):
+    # mesmo analisador rápido, mas com as regras traduzidas para bytes
+    espacos = AnalisadorRapido.espacos.encode('ascii')
+    quebra = b'\n'
+    abre = b'{'
+
+    def __init__(self):
+        inicial = regrasDoEstado('INITIAL')
+        self.inicial = compilaRegexMestre(inicial, t_ignore, binario=True)
+        self.comentario = compilaRegexMestre(regrasDoEstado('COMENTARIO') + inicial, t_COMENTARIO_ignore,
+                                             binario=True)
+        self.pedacos, self.prefixo = compilaRegexPedacos(inicial, t_ignore, binario=True)
+        # a palavra reservada é procurada pelos bytes, sem decodificar o lexema
+        self.reservadas = dict((chave.encode('utf-8'), tipo) for chave, tipo in palavras_reservadas.items())
+        self.lexdata = b''
+        self.lexpos = 0
+        self.lineno = 1
+        self.tokens = iter(())
+
+    def texto(self, lexema):
+        return lexema.decode('utf-8', 'replace')
+
+    def novoBuffer(self):
+        return BufferTokensMapeado(self.lexdata)
+
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~ FLUXO DE TOKENS ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+# tokens cujo valor muda de um token para outro; os demais (operadores, palavras reservadas)
+# sempre têm o mesmo lexema para o mesmo tipo
+TIPOS_COM_VALOR = ('IDENTIFICADOR', 'INTEIRO', 'FLUTUANTE')
+
+# conversão do lexema para o valor do token; nos outros tipos o valor é o próprio texto
+CONVERSOES_VALOR = {'INTEIRO': int, 'FLUTUANTE': float}
+
+
+class BufferTokens():
+    # armazena os tokens em arrays em vez de um LexToken por token: o tipo vira um número pequeno
+    # (posição na lista tokens) em array('B'), linha e posição em array('I'), e o valor é um índice
+    # numa tabela com os valores distintos (o mesmo identificador aparece muitas vezes no arquivo)
+    def __init__(self):
+        self.nomes_tipos = list(tokens)
+        self.codigo_tipo = dict((nome, i) for i, nome in enumerate(self.nomes_tipos))
+        self.tipos = array('B')
+        self.linhas = array('I')
+        self.posicoes = array('I')
+        self.valores = array('I')
+        self.tabela_valores = []
+        self.indice_valores = {}
+        self.valor_do_tipo = {}  # índice do valor dos tokens de lexema fixo, por código do tipo
+
+    lexemaBruto = False  # os tokens do varre chegam com o valor já convertido
+
+    def indiceValor(self, codigo, valor):
+        # o tipo entra na chave porque 1 e 1.0 são iguais num dict
+        chave = (codigo, valor)
+        indice = self.indice_valores.get(chave)
+        if indice is None:
+            indice = self.indice_valores[chave] = len(self.tabela_valores)
+            self.tabela_valores.append(valor)
+        return indice
+
+    # índice do valor de um lexema da varredura em bloco
+    def indiceLexema(self, codigo, lexema):
+        conversao = CONVERSOES_VALOR.get(self.nomes_tipos[codigo])
+        return self.indiceValor(codigo, conversao(lexema) if conversao else lexema)
+
+    def append(self, tok):
+        codigo = self.codigo_tipo[tok.type]
+        if tok.type in TIPOS_COM_VALOR:
+            indice = self.indiceValor(codigo, tok.value)
+        else:
+            # só lê o .value do primeiro token de cada tipo
+            indice = self.valor_do_tipo.get(codigo)
+            if indice is None:
+                indice = self.valor_do_tipo[codigo] = self.indiceValor(codigo, tok.value)
+        self.tipos.append(codigo)
+        self.linhas.append(tok.lineno)
+        self.posicoes.append(tok.lexpos)
+        self.valores.append(indice)
+
+    def __len__(self):
+        return len(self.tipos)
+
+    # recria o LexToken só quando alguém pede (o parser ou a listagem)
+    def __getitem__(self, i):
+        tok = lex.LexToken()
+        tok.type = self.nomes_tipos[self.tipos[i]]
+        tok.value = self.tabela_valores[self.valores[i]]
+        tok.lineno = self.linhas[i]
+        tok.lexpos = self.posicoes[i]
+        return tok
+
+    def __iter__(self):
+        for i in range(len(self.tipos)):
+            yield self[i]
+
+    def tamanhoEmBytes(self):
+        return sum(sys.getsizeof(a) for a in (self.tipos, self.linhas, self.posicoes, self.valores)) + \
+            sys.getsizeof(self.tabela_valores) + sum(sys.getsizeof(v) for v in self.tabela_valores) + \
+            sys.getsizeof(self.indice_valores)
+
+
+class BufferTokensMapeado(BufferTokens):
+    # buffer do modo mapeado: valores guarda o tamanho do lexema em bytes em vez do índice de um valor, e
+    # o lexema (de posicoes[i] a posicoes[i] + valores[i]) só é lido do mapeamento e convertido quando
+    # o token é pedido
+    lexemaBruto = True
+
+    def __init__(self, fonte):
+        super().__init__()
+        self.fonte = fonte
+        self.conversoes = [CONVERSOES_VALOR.get(nome) for nome in self.nomes_tipos]
+
+    def indiceLexema(self, codigo, lexema):
+        return len(lexema)
+
+    # tokens do varre com bruto=True: o valor é o lexema
+    def append(self, tok):
+        self.tipos.append(self.codigo_tipo[tok.type])
+        self.linhas.append(tok.lineno)
+        self.posicoes.append(tok.lexpos)
+        self.valores.append(len(tok.value))
+
+    def __getitem__(self, i):
+        tok = lex.LexToken()
+        codigo = self.tipos[i]
+        inicio = self.posicoes[i]
+        lexema = self.fonte[inicio:inicio + self.valores[i]]
+        conversao = self.conversoes[codigo]
+        tok.type = self.nomes_tipos[codigo]
+        tok.value = conversao(lexema) if conversao else lexema.decode('utf-8', 'replace')
+        tok.lineno = self.linhas[i]
+        tok.lexpos = inicio
+        return tok
+
+
+class FluxoTokens():
+    # fica entre o lexer e o parser guardando cada token lido, assim o arquivo é tokenizado uma vez
+    # só e a listagem de tokens e os relatórios leem daqui em vez de rodar o lexer de novo
+    def __init__(self, lexer):
+        self.lexer = lexer
+        self.tokens = BufferTokens()
+        self.posicao = 0  # próximo token entregue pelo token()
+        self.acabou = False
+
+    @property
+    def lineno(self):
+        return self.lexer.lineno
+
+    @property
+    def lexpos(self):
+        return self.lexer.lexpos
+
+    def input(self, data):
+        self.lexer.input(data)
+        self.tokens = BufferTokens()
+        self.posicao = 0
+        self.acabou = False
+        # o analisador rápido preenche o buffer de uma vez, sem um LexToken por token
+        if hasattr(self.lexer, 'preenche'):
+            self.tokens = self.lexer.novoBuffer()
+            self.lexer.preenche(self.tokens)
+            self.acabou = True
+
+    # volta pro começo do fluxo sem tokenizar de novo (para um segundo consumidor)
+    def reinicia(self):
+        self.posicao = 0
+
+    def puxa(self):
+        tok = self.lexer.token()
+        if tok is None:
+            self.acabou = True
+        else:
+            self.tokens.append(tok)
+        return tok
+
+    def token(self):
+        if self.posicao < len(self.tokens):
+            tok = self.tokens[self.posicao]
+        elif self.acabou:
+            return None
+        else:
+            tok = self.puxa()
+            if tok is None:
+                return None
+        self.posicao += 1
+        return tok
+
+    # lê do lexer o que ainda falta, sem montar tokens para o que o parser já consumiu
+    def esgota(self):
+        while not self.acabou:
+            self.puxa()
+
+    # percorre todos os tokens do arquivo, lendo do lexer só o que ainda não foi lido
+    def __iter__(self):
+        i = 0
+        while True:
+            if i < len(self.tokens):
+                yield self.tokens[i]
+                i += 1
+            elif self.acabou or self.puxa() is None:
+                return
+
+
 # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~ PARSER YACC ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
 
 # classe arvore
-from nani import Tree
+# mesmos campos do Tree do nani (.type, .children, .leaf), que é o que recomeco, arv_reduzida e o
+# KodoGen acessam, mas com __slots__: sem o __dict__ por nó a árvore concreta ocupa bem menos memória
+# e a leitura dos campos fica mais rápida. children continua sendo lista porque as listas da
+# gramática são montadas com append. linha é a Linha da tabela de símbolos ligada ao nó pelo
+# resolveNomes (vars, chamadas de função e parametros); linhaCodigo é a linha do fonte, guardada nas
+# vars, chamadas, declarações, parametros e retornas para os diagnósticos da análise semântica
+class Tree():
+    __slots__ = ('type', 'children', 'leaf', 'linha', 'linhaCodigo')
+
+    def __init__(self, type, children=None, leaf=None, linhaCodigo=None):
+        self.type = type
+        self.children = children if children is not None else []
+        self.leaf = leaf
+        self.linha = None
+        self.linhaCodigo = linhaCodigo
 
 # define a precedência dos operadores aritméticos
 precedence = (
@@ -227,8 +1046,10 @@ def p_programa(p):
 def p_lista_declaracoes(p):
     '''lista_declaracoes : lista_declaracoes declaracao
                          | declaracao'''
+    # lista plana: as declarações seguintes entram como filhas do mesmo nó (não gera uma cadeia)
     if len(p) == 3:
-        p[0] = Tree('lista_declaracoes', [p[1], p[2]])
+        p[1].children.append(p[2])
+        p[0] = p[1]
     else:
         p[0] = Tree('lista_declaracoes', [p[1]])
 
@@ -237,24 +1058,31 @@ def p_declaracao(p):
     '''declaracao : declaracao_variaveis
                   | inicializacao_variaveis
                   | declaracao_funcao'''
-    p[0] = Tree('declaracao', [p[1]])
+    if ARVORE_REDUZIDA:
+        p[0] = p[1]
+    else:
+        p[0] = Tree('declaracao', [p[1]])
 
 
 def p_declaracao_variaveis(p):
     'declaracao_variaveis : tipo DOIS_PONTOS lista_variaveis'
-    p[0] = Tree('declaracao_variaveis', [p[1], p[3]])
+    p[0] = Tree('declaracao_variaveis', [p[1], p[3]], linhaCodigo=p.lineno(2))
 
 
 def p_inicializacao_variaveis(p):
     'inicializacao_variaveis : atribuicao'
-    p[0] = Tree('inicializacao_variaveis', [p[1]])
+    if ARVORE_REDUZIDA:
+        p[0] = p[1]
+    else:
+        p[0] = Tree('inicializacao_variaveis', [p[1]])
 
 
 def p_lista_variaveis(p):
     '''lista_variaveis : lista_variaveis VIRGULA var
                        | var'''
     if len(p) == 4:
-        p[0] = Tree('lista_variaveis', [p[1], p[3]])
+        p[1].children.append(p[3])
+        p[0] = p[1]
     else:
         p[0] = Tree('lista_variaveis', [p[1]])
 
@@ -262,16 +1090,26 @@ def p_lista_variaveis(p):
 def p_var(p):
     '''var : IDENTIFICADOR
            | IDENTIFICADOR indice'''
-    if len(p) == 3:
-        p[0] = Tree('var', [p[2]], p[1])
+    if ARVORE_REDUZIDA:
+        # na árvore reduzida a var é o nó com o nome, e os filhos são as expressões dos índices
+        p[0] = Tree(p[1], p[2] if len(p) == 3 else [], linhaCodigo=p.lineno(1))
+    elif len(p) == 3:
+        p[0] = Tree('var', [p[2]], p[1], p.lineno(1))
     else:
-        p[0] = Tree('var', [], p[1])
+        p[0] = Tree('var', [], p[1], p.lineno(1))
 
 
 def p_indice(p):
     '''indice : indice ABRE_COLCHETES expressao FECHA_COLCHETES
               | ABRE_COLCHETES expressao FECHA_COLCHETES'''
-    if len(p) == 5:
+    if ARVORE_REDUZIDA:
+        # só uma lista com as expressões, quem vira nó é a var
+        if len(p) == 5:
+            p[1].append(p[3])
+            p[0] = p[1]
+        else:
+            p[0] = [p[2]]
+    elif len(p) == 5:
         p[0] = Tree('indice', [p[1], p[3]])
     else:
         p[0] = Tree('indice', [p[2]])
@@ -287,14 +1125,14 @@ def p_declaracao_funcao(p):
     '''declaracao_funcao : tipo cabecalho
                          | cabecalho'''
     if len(p) == 3:
-        p[0] = Tree('declaracao_funcao', [p[1], p[2]])
+        p[0] = Tree('declaracao_funcao', [p[1], p[2]], linhaCodigo=p[2].linhaCodigo)
     else:
-        p[0] = Tree('declaracao_funcao', [p[1]])
+        p[0] = Tree('declaracao_funcao', [p[1]], linhaCodigo=p[1].linhaCodigo)
 
 
 def p_cabecalho(p):
     'cabecalho : IDENTIFICADOR ABRE_PARENTESES lista_parametros FECHA_PARENTESES corpo FIM'
-    p[0] = Tree('cabecalho', [p[3], p[5]], p[1])
+    p[0] = Tree('cabecalho', [p[3], p[5]], p[1], p.lineno(1))
 
 
 def p_lista_parametros(p):
@@ -302,7 +1140,10 @@ def p_lista_parametros(p):
                          | parametro
                          | vazio'''
     if len(p) == 4:
-        p[0] = Tree('lista_parametros', [p[1], p[3]])
+        p[1].children.append(p[3])
+        p[0] = p[1]
+    elif p[1] is None:  # vazio na árvore reduzida
+        p[0] = Tree('lista_parametros', [])
     else:
         p[0] = Tree('lista_parametros', [p[1]])
 
@@ -311,16 +1152,20 @@ def p_parametro(p):
     '''parametro : tipo DOIS_PONTOS IDENTIFICADOR
                  | parametro ABRE_COLCHETES FECHA_COLCHETES'''
     if p[2] == ':':
-        p[0] = Tree('parametro', [p[1]], p[3])
+        p[0] = Tree('parametro', [p[1]], p[3], p.lineno(3))
     else:
-        p[0] = Tree('parametro', [p[1]])
+        p[0] = Tree('parametro', [p[1]], linhaCodigo=p[1].linhaCodigo)
 
 
 def p_corpo(p):
     '''corpo : corpo acao
              | vazio'''
+    # o corpo começa com o filho 'vazio' e as ações vão sendo adicionadas no mesmo nó
     if len(p) == 3:
-        p[0] = Tree('corpo', [p[1], p[2]])
+        p[1].children.append(p[2])
+        p[0] = p[1]
+    elif p[1] is None:  # vazio na árvore reduzida
+        p[0] = Tree('corpo', [])
     else:
         p[0] = Tree('corpo', [p[1]])
 
@@ -334,21 +1179,27 @@ def p_acao(p):
             | escreva
             | retorna'''
     # | erro'''
-    p[0] = Tree('acao', [p[1]])
+    if ARVORE_REDUZIDA:
+        p[0] = p[1]
+    else:
+        p[0] = Tree('acao', [p[1]])
 
 
 def p_se(p):
     '''se : SE expressao ENTAO corpo FIM
           | SE expressao ENTAO corpo SENAO corpo FIM'''
+    # a condição fica dentro de um nó 'expressao' também na árvore reduzida (o KodoGen espera assim)
+    condicao = Tree('expressao', [p[2]]) if ARVORE_REDUZIDA else p[2]
     if len(p) == 6:
-        p[0] = Tree('se', [p[2], p[4]])
+        p[0] = Tree('se', [condicao, p[4]])
     else:
-        p[0] = Tree('se', [p[2], p[4], p[6]])
+        p[0] = Tree('se', [condicao, p[4], p[6]])
 
 
 def p_repita(p):
     'repita : REPITA corpo ATE expressao'
-    p[0] = Tree('repita', [p[2], p[4]])
+    condicao = Tree('expressao', [p[4]]) if ARVORE_REDUZIDA else p[4]
+    p[0] = Tree('repita', [p[2], condicao])
 
 
 def p_atribuicao(p):
@@ -368,19 +1219,26 @@ def p_escreva(p):
 
 def p_retorna(p):
     'retorna : RETORNA ABRE_PARENTESES expressao FECHA_PARENTESES'
-    p[0] = Tree('retorna', [p[3]])
+    p[0] = Tree('retorna', [p[3]], linhaCodigo=p.lineno(1))
 
 
 def p_expressao(p):
     '''expressao : expressao_logica
                  | atribuicao'''
-    p[0] = Tree('expressao', [p[1]])
+    if ARVORE_REDUZIDA:
+        p[0] = p[1]
+    else:
+        p[0] = Tree('expressao', [p[1]])
 
 
+# na árvore reduzida os níveis de expressão com um filho só somem e a operação vira um nó com o
+# próprio operador: a + b -> Tree('+', [a, b])
 def p_expressao_logica(p):
     '''expressao_logica : expressao_simples
                         | expressao_logica operador_logico expressao_simples'''
-    if len(p) == 2:
+    if ARVORE_REDUZIDA:
+        p[0] = p[1] if len(p) == 2 else Tree(p[2], [p[1], p[3]])
+    elif len(p) == 2:
         p[0] = Tree('expressao_logica', [p[1]])
     else:
         p[0] = Tree('expressao_logica', [p[1], p[2], p[3]])
@@ -389,7 +1247,9 @@ def p_expressao_logica(p):
 def p_expressao_simples(p):
     '''expressao_simples : expressao_aditiva
                          | expressao_simples operador_relacional expressao_aditiva'''
-    if len(p) == 2:
+    if ARVORE_REDUZIDA:
+        p[0] = p[1] if len(p) == 2 else Tree(p[2], [p[1], p[3]])
+    elif len(p) == 2:
         p[0] = Tree('expressao_simples', [p[1]])
     else:
         p[0] = Tree('expressao_simples', [p[1], p[2], p[3]])
@@ -398,7 +1258,9 @@ def p_expressao_simples(p):
 def p_expressao_aditiva(p):
     '''expressao_aditiva : expressao_multiplicativa
                          | expressao_aditiva operador_soma expressao_multiplicativa'''
-    if len(p) == 2:
+    if ARVORE_REDUZIDA:
+        p[0] = p[1] if len(p) == 2 else Tree(p[2], [p[1], p[3]])
+    elif len(p) == 2:
         p[0] = Tree('expressao_aditiva', [p[1]])
     else:
         p[0] = Tree('expressao_aditiva', [p[1], p[2], p[3]])
@@ -407,7 +1269,9 @@ def p_expressao_aditiva(p):
 def p_expressao_multiplicativa(p):
     '''expressao_multiplicativa : expressao_unaria
                                 | expressao_multiplicativa operador_multiplicacao expressao_unaria'''
-    if len(p) == 2:
+    if ARVORE_REDUZIDA:
+        p[0] = p[1] if len(p) == 2 else Tree(p[2], [p[1], p[3]])
+    elif len(p) == 2:
         p[0] = Tree('expressao_multiplicativa', [p[1]])
     else:
         p[0] = Tree('expressao_multiplicativa', [p[1], p[2], p[3]])
@@ -417,12 +1281,15 @@ def p_expressao_unaria(p):
     '''expressao_unaria : fator
                         | operador_soma fator'''
     # | operador_negacao fator'''
-    if len(p) == 2:
+    if ARVORE_REDUZIDA:
+        p[0] = p[1] if len(p) == 2 else Tree(p[1], [p[2]])
+    elif len(p) == 2:
         p[0] = Tree('expressao_unaria', [p[1]])
     else:
         p[0] = Tree('expressao_unaria', [p[1], p[2]])
 
 
+# na árvore reduzida os operadores são só o texto, que vira o type do nó da operação
 def p_operador_relacinal(p):
     '''operador_relacional : MENOR
                            | MAIOR
@@ -430,25 +1297,25 @@ def p_operador_relacinal(p):
                            | DIFERENTE
                            | MENOR_IGUAL
                            | MAIOR_IGUAL'''
-    p[0] = Tree('operador_relacional', [], p[1])
+    p[0] = p[1] if ARVORE_REDUZIDA else Tree('operador_relacional', [], p[1])
 
 
 def p_operador_soma(p):
     '''operador_soma : MAIS
                      | MENOS'''
-    p[0] = Tree('operador_soma', [], p[1])
+    p[0] = p[1] if ARVORE_REDUZIDA else Tree('operador_soma', [], p[1])
 
 
 def p_operador_logico(p):
     '''operador_logico : E_LOGICO
                        | OU_LOGICO'''
-    p[0] = Tree('operador_logico', [], p[1])
+    p[0] = p[1] if ARVORE_REDUZIDA else Tree('operador_logico', [], p[1])
 
 
 def p_operador_multiplicacao(p):
     '''operador_multiplicacao : MULTIPLICA
                               | DIVIDIDO'''
-    p[0] = Tree('operador_multiplicacao', [], p[1])
+    p[0] = p[1] if ARVORE_REDUZIDA else Tree('operador_multiplicacao', [], p[1])
 
 
 def p_fator(p):
@@ -456,7 +1323,9 @@ def p_fator(p):
              | var
              | chamada_funcao
              | numero'''
-    if len(p) == 2:
+    if ARVORE_REDUZIDA:
+        p[0] = p[1] if len(p) == 2 else p[2]
+    elif len(p) == 2:
         p[0] = Tree('fator', [p[1]])
     else:
         p[0] = Tree('fator', [p[2]])
@@ -465,28 +1334,35 @@ def p_fator(p):
 def p_numero(p):
     '''numero : INTEIRO
               | FLUTUANTE'''
-    p[0] = Tree('numero', [], p[1])
+    if ARVORE_REDUZIDA:
+        p[0] = Tree(p[1])  # o próprio valor é o type do nó
+    else:
+        p[0] = Tree('numero', [], p[1])
 
 
 def p_chamada_funcao(p):
     'chamada_funcao : IDENTIFICADOR ABRE_PARENTESES lista_argumentos FECHA_PARENTESES'
-    p[0] = Tree('chamada_funcao', [p[3]], p[1])
+    p[0] = Tree('chamada_funcao', [p[3]], p[1], p.lineno(1))
 
 
 def p_lista_argumentos(p):
     '''lista_argumentos : lista_argumentos VIRGULA expressao
                         | expressao
                         | vazio'''
-    if len(p) == 2:
-        p[0] = Tree('lista_argumentos', [p[1]])
+    if len(p) == 4:
+        p[1].children.append(p[3])
+        p[0] = p[1]
+    elif p[1] is None:  # vazio na árvore reduzida
+        p[0] = Tree('lista_argumentos', [])
     else:
-        p[0] = Tree('lista_argumentos', [p[1], p[3]])
+        p[0] = Tree('lista_argumentos', [p[1]])
 
 
 def p_vazio(p):
     'vazio : '
-    p[0] = Tree("vazio")
-    pass
+    # na árvore reduzida o vazio não vira nó, as listas ficam sem filhos
+    if not ARVORE_REDUZIDA:
+        p[0] = Tree("vazio")
 
 
 # ~~~~~~~~~~ alguns tratamentos de erro simples ~~~~~~~~~~~~~~~~~~~
@@ -495,91 +1371,640 @@ def p_error(p):
     global ERRO_SINTATICO
     ERRO_SINTATICO = True
     if p:
-        print('Erro sintatico: %s na linha %d' % (p.value, p.lineno))
+        diagnosticos.emite('erro-sintatico', 'Erro sintatico: %s na linha %d' % (p.value, p.lineno), linha=p.lineno)
     else:
-        print('Esta faltando um "fim"')
+        diagnosticos.emite('falta-fim', 'Esta faltando um "fim"')
 
 
 def p_retorna_error(p):
     'retorna : RETORNA ABRE_PARENTESES error FECHA_PARENTESES'
-    print("Função retorna não está recebendo nenhum argumento")
+    diagnosticos.emite('retorna-sem-argumento', "Função retorna não está recebendo nenhum argumento",
+                       linha=p.lineno(1))
 
 
 def p_declaracao_variaveis_error(p):
     'declaracao_variaveis : error DOIS_PONTOS lista_variaveis'
-    print("Dica: possível erro na declaração de variável")
+    diagnosticos.emite('dica-declaracao', "Dica: possível erro na declaração de variável", linha=p.lineno(2))
 
 
 def p_indice_error(p):
     '''indice : indice ABRE_COLCHETES error FECHA_COLCHETES
           | ABRE_COLCHETES error FECHA_COLCHETES'''
-    print("Dica: possível erro no índice entre colchetes")
+    diagnosticos.emite('dica-indice', "Dica: possível erro no índice entre colchetes")
 
 
 def p_declaracao_cabecalho_error(p):
     'cabecalho : IDENTIFICADOR ABRE_PARENTESES lista_parametros FECHA_PARENTESES error FIM'
-    print("Dica: possível erro no cabeçalho da função")
+    diagnosticos.emite('dica-cabecalho', "Dica: possível erro no cabeçalho da função", linha=p.lineno(1))
 
 
 def p_atribuicao_error(p):
     'atribuicao : error ATRIBUIR expressao'
-    print("Dica: possível erro na atribuição")
+    diagnosticos.emite('dica-atribuicao', "Dica: possível erro na atribuição", linha=p.lineno(2))
 
 
 def p_leia_error(p):
     'leia : LEIA ABRE_PARENTESES error FECHA_PARENTESES'
-    print("Função leia não está recebendo nenhum argumento")
+    diagnosticos.emite('leia-sem-argumento', "Função leia não está recebendo nenhum argumento", linha=p.lineno(1))
 
 
 def p_escreva_error(p):
     '''escreva : ESCREVA ABRE_PARENTESES error FECHA_PARENTESES'''
-    print("Função escreva não está recebendo nenhum argumento")
+    diagnosticos.emite('escreva-sem-argumento', "Função escreva não está recebendo nenhum argumento",
+                       linha=p.lineno(1))
 
 
 # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~ FIM PARSER YACC ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
 
-# função recursiva para percorrer a árvore gerada e colocar no padrão aceito pela biblioteca anytree
-def inorderTraversal2(root, pai=None):
-    if root:
-        temp = Node(root.type, parent=pai)
-        if (root.leaf):
-            Node(root.leaf, parent=temp)
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~ PARSER DESCENDENTE RECURSIVO ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+# alternativa ao yacc (--parser descendente): descida recursiva para os comandos e precedence
+# climbing para as expressões. Monta exatamente a mesma árvore que as ações p_* acima montariam,
+# então recomeco, arv_reduzida e o resto do compilador não mudam. Os conflitos da gramática são
+# resolvidos como o yacc resolve (shift): '+'/'-' depois de uma expressão continuam a expressão e
+# IDENTIFICADOR seguido de '(' é chamada de função.
+# Se encontrar um erro de sintaxe, devolve os tokens ao começo e deixa o yacc analisar o arquivo,
+# assim as mensagens de erro e a recuperação de erros continuam sendo as do yacc. O mesmo acontece
+# quando o aninhamento passa do limite de recursão do Python (o yacc usa uma pilha explícita).
+# Com ARVORE_REDUZIDA monta a árvore reduzida, igual às ações do yacc nesse modo.
+
+# níveis de precedência das expressões binárias: (nó da expressão, nó do operador, tokens do operador)
+NIVEIS_EXPRESSAO = (
+    ('expressao_logica', 'operador_logico', ('E_LOGICO', 'OU_LOGICO')),
+    ('expressao_simples', 'operador_relacional', ('MENOR', 'MAIOR', 'IGUAL', 'DIFERENTE', 'MENOR_IGUAL',
+                                                  'MAIOR_IGUAL')),
+    ('expressao_aditiva', 'operador_soma', ('MAIS', 'MENOS')),
+    ('expressao_multiplicativa', 'operador_multiplicacao', ('MULTIPLICA', 'DIVIDIDO')),
+)
+
+# tokens que podem começar uma ação dentro de um corpo
+INICIO_ACAO = ('TIPO_INTEIRO', 'TIPO_FLUTUANTE', 'SE', 'REPITA', 'LEIA', 'ESCREVA', 'RETORNA', 'IDENTIFICADOR',
+               'ABRE_PARENTESES', 'INTEIRO', 'FLUTUANTE', 'MAIS', 'MENOS')
+
+
+class ErroDescendente(Exception):
+    pass
 
-        for filho in root.children:
-            inorderTraversal2(filho, temp)
 
+class ParserDescendente():
+    def __init__(self, parser_yacc=None):
+        self.parser_yacc = parser_yacc  # usado quando o arquivo tem erro de sintaxe
+
+    def parse(self, lexer):
+        self.lexer = lexer
+        self.token_atual = lexer.token()
+        self.tipo = self.token_atual.type if self.token_atual else '$end'
+        self.seguinte = None  # segundo token de lookahead, lido só quando precisa
+        self.pendente = None  # var já lida que ainda vai virar fator
+        self.reduzida = ARVORE_REDUZIDA
+        # a árvore não tem ciclos, então o coletor de lixo cíclico só gastaria tempo varrendo os
+        # nós que acabaram de ser criados (em programas grandes isso é a maior parte do tempo)
+        coletor_ligado = gc.isenabled()
+        gc.disable()
+        try:
+            return self.programa()
+        except (ErroDescendente, RecursionError):
+            if self.parser_yacc is None or not hasattr(lexer, 'reinicia'):
+                raise
+        finally:
+            if coletor_ligado:
+                gc.enable()
+        # erro de sintaxe: o yacc refaz a análise com o coletor de volta como o chamador deixou
+        lexer.reinicia()
+        return self.parser_yacc.parse(lexer=lexer)
+
+    # ~~~~~~~~ controle dos tokens ~~~~~~~~
+    def avanca(self):
+        tok = self.token_atual
+        if self.seguinte is not None:
+            self.token_atual = self.seguinte
+            self.seguinte = None
+        else:
+            self.token_atual = self.lexer.token()
+        self.tipo = self.token_atual.type if self.token_atual else '$end'
+        return tok
+
+    def olhaSeguinte(self):
+        if self.seguinte is None:
+            self.seguinte = self.lexer.token()
+        return self.seguinte.type if self.seguinte else '$end'
+
+    def espera(self, tipo):
+        if self.tipo != tipo:
+            raise ErroDescendente(self.token_atual)
+        return self.avanca()
+
+    # ~~~~~~~~ declarações ~~~~~~~~
+    def programa(self):
+        lista = Tree('lista_declaracoes', [self.declaracao()])
+        while self.tipo != '$end':
+            lista.children.append(self.declaracao())
+        return Tree('programa', [lista])
+
+    # nó que só embrulha um filho (declaracao, acao, expressao, fator...): some na árvore reduzida
+    def envolve(self, nome, no):
+        return no if self.reduzida else Tree(nome, [no])
+
+    def declaracao(self):
+        if self.tipo == 'TIPO_INTEIRO' or self.tipo == 'TIPO_FLUTUANTE':
+            if self.olhaSeguinte() == 'DOIS_PONTOS':
+                return self.envolve('declaracao', self.declaracaoVariaveis())
+            tipo = self.tipoVar()
+            cabecalho = self.cabecalho()
+            return self.envolve('declaracao', Tree('declaracao_funcao', [tipo, cabecalho],
+                                                   linhaCodigo=cabecalho.linhaCodigo))
+        if self.tipo == 'IDENTIFICADOR':
+            if self.olhaSeguinte() == 'ABRE_PARENTESES':
+                cabecalho = self.cabecalho()
+                return self.envolve('declaracao', Tree('declaracao_funcao', [cabecalho],
+                                                       linhaCodigo=cabecalho.linhaCodigo))
+            var = self.var()
+            return self.envolve('declaracao', self.envolve('inicializacao_variaveis', self.atribuicao(var)))
+        raise ErroDescendente(self.token_atual)
+
+    def tipoVar(self):
+        return Tree('tipo', [], self.avanca().value)
+
+    def declaracaoVariaveis(self):
+        tipo = self.tipoVar()
+        linha = self.espera('DOIS_PONTOS').lineno
+        lista = Tree('lista_variaveis', [self.var()])
+        while self.tipo == 'VIRGULA':
+            self.avanca()
+            lista.children.append(self.var())
+        return Tree('declaracao_variaveis', [tipo, lista], linhaCodigo=linha)
+
+    def var(self):
+        tok = self.espera('IDENTIFICADOR')
+        nome = tok.value
+        if self.reduzida:
+            indices = []
+            while self.tipo == 'ABRE_COLCHETES':
+                self.avanca()
+                indices.append(self.expressao())
+                self.espera('FECHA_COLCHETES')
+            return Tree(nome, indices, linhaCodigo=tok.lineno)
+        if self.tipo != 'ABRE_COLCHETES':
+            return Tree('var', [], nome, tok.lineno)
+        indice = None
+        while self.tipo == 'ABRE_COLCHETES':
+            self.avanca()
+            expressao = self.expressao()
+            self.espera('FECHA_COLCHETES')
+            indice = Tree('indice', [expressao]) if indice is None else Tree('indice', [indice, expressao])
+        return Tree('var', [indice], nome, tok.lineno)
+
+    def cabecalho(self):
+        tok = self.espera('IDENTIFICADOR')
+        self.espera('ABRE_PARENTESES')
+        if self.tipo == 'FECHA_PARENTESES':
+            parametros = Tree('lista_parametros', self.vazio())
+        else:
+            parametros = Tree('lista_parametros', [self.parametro()])
+            while self.tipo == 'VIRGULA':
+                self.avanca()
+                parametros.children.append(self.parametro())
+        self.espera('FECHA_PARENTESES')
+        corpo = self.corpo()
+        self.espera('FIM')
+        return Tree('cabecalho', [parametros, corpo], tok.value, tok.lineno)
+
+    def parametro(self):
+        if self.tipo != 'TIPO_INTEIRO' and self.tipo != 'TIPO_FLUTUANTE':
+            raise ErroDescendente(self.token_atual)
+        tipo = self.tipoVar()
+        self.espera('DOIS_PONTOS')
+        tok = self.espera('IDENTIFICADOR')
+        parametro = Tree('parametro', [tipo], tok.value, tok.lineno)
+        while self.tipo == 'ABRE_COLCHETES':
+            self.avanca()
+            self.espera('FECHA_COLCHETES')
+            parametro = Tree('parametro', [parametro], linhaCodigo=tok.lineno)
+        return parametro
+
+    # filhos de uma lista que começa pela regra vazio
+    def vazio(self):
+        return [] if self.reduzida else [Tree('vazio')]
+
+    # ~~~~~~~~ comandos ~~~~~~~~
+    def corpo(self):
+        corpo = Tree('corpo', self.vazio())
+        while self.tipo in INICIO_ACAO:
+            corpo.children.append(self.envolve('acao', self.acao()))
+        return corpo
+
+    # condição do se/repita: na árvore reduzida continua dentro de um nó 'expressao'
+    def condicao(self):
+        condicao = self.expressao()
+        return Tree('expressao', [condicao]) if self.reduzida else condicao
+
+    def acao(self):
+        tipo = self.tipo
+        if tipo == 'SE':
+            self.avanca()
+            condicao = self.condicao()
+            self.espera('ENTAO')
+            entao = self.corpo()
+            if self.tipo == 'SENAO':
+                self.avanca()
+                senao = self.corpo()
+                self.espera('FIM')
+                return Tree('se', [condicao, entao, senao])
+            self.espera('FIM')
+            return Tree('se', [condicao, entao])
+        if tipo == 'REPITA':
+            self.avanca()
+            corpo = self.corpo()
+            self.espera('ATE')
+            return Tree('repita', [corpo, self.condicao()])
+        if tipo == 'TIPO_INTEIRO' or tipo == 'TIPO_FLUTUANTE':
+            return self.declaracaoVariaveis()
+        if tipo == 'LEIA':
+            self.avanca()
+            self.espera('ABRE_PARENTESES')
+            var = self.var()
+            self.espera('FECHA_PARENTESES')
+            return Tree('leia', [var])
+        if tipo == 'ESCREVA' or tipo == 'RETORNA':
+            linha = self.avanca().lineno
+            self.espera('ABRE_PARENTESES')
+            expressao = self.expressao()
+            self.espera('FECHA_PARENTESES')
+            if tipo == 'ESCREVA':
+                return Tree('escreva', [expressao])
+            return Tree('retorna', [expressao], linhaCodigo=linha)
+        return self.expressao()
+
+    def atribuicao(self, var):
+        self.espera('ATRIBUIR')
+        return Tree('atribuicao', [var, self.expressao()])
+
+    # ~~~~~~~~ expressões ~~~~~~~~
+    def expressao(self):
+        # 'var := expressao' também é expressão; lê a var e decide pelo token seguinte
+        if self.tipo == 'IDENTIFICADOR' and self.olhaSeguinte() != 'ABRE_PARENTESES':
+            var = self.var()
+            if self.tipo == 'ATRIBUIR':
+                return self.envolve('expressao', self.atribuicao(var))
+            self.pendente = var
+        return self.envolve('expressao', self.binaria(0))
+
+    # precedence climbing: cada nível chama o próximo para os operandos e fica em laço
+    # enquanto aparecer um operador do próprio nível (associatividade à esquerda)
+    def binaria(self, nivel):
+        if nivel == len(NIVEIS_EXPRESSAO):
+            return self.unaria()
+        nome, nome_operador, operadores = NIVEIS_EXPRESSAO[nivel]
+        if self.reduzida:
+            esquerda = self.binaria(nivel + 1)
+            while self.tipo in operadores:
+                operador = self.avanca().value
+                esquerda = Tree(operador, [esquerda, self.binaria(nivel + 1)])
+            return esquerda
+        esquerda = Tree(nome, [self.binaria(nivel + 1)])
+        while self.tipo in operadores:
+            operador = Tree(nome_operador, [], self.avanca().value)
+            esquerda = Tree(nome, [esquerda, operador, self.binaria(nivel + 1)])
+        return esquerda
+
+    def unaria(self):
+        if self.pendente is None and (self.tipo == 'MAIS' or self.tipo == 'MENOS'):
+            operador = self.avanca().value
+            if self.reduzida:
+                return Tree(operador, [self.fator()])
+            return Tree('expressao_unaria', [Tree('operador_soma', [], operador), self.fator()])
+        return self.envolve('expressao_unaria', self.fator())
+
+    def fator(self):
+        if self.pendente is not None:
+            var = self.pendente
+            self.pendente = None
+            return self.envolve('fator', var)
+        tipo = self.tipo
+        if tipo == 'IDENTIFICADOR':
+            if self.olhaSeguinte() == 'ABRE_PARENTESES':
+                return self.envolve('fator', self.chamadaFuncao())
+            return self.envolve('fator', self.var())
+        if tipo == 'INTEIRO' or tipo == 'FLUTUANTE':
+            valor = self.avanca().value
+            return Tree(valor) if self.reduzida else Tree('fator', [Tree('numero', [], valor)])
+        if tipo == 'ABRE_PARENTESES':
+            self.avanca()
+            expressao = self.expressao()
+            self.espera('FECHA_PARENTESES')
+            return self.envolve('fator', expressao)
+        raise ErroDescendente(self.token_atual)
+
+    def chamadaFuncao(self):
+        tok = self.avanca()
+        self.espera('ABRE_PARENTESES')
+        if self.tipo == 'FECHA_PARENTESES':
+            argumentos = Tree('lista_argumentos', self.vazio())
+        else:
+            argumentos = Tree('lista_argumentos', [self.expressao()])
+            while self.tipo == 'VIRGULA':
+                self.avanca()
+                argumentos.children.append(self.expressao())
+        self.espera('FECHA_PARENTESES')
+        return Tree('chamada_funcao', [argumentos], tok.value, tok.lineno)
+
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~ CACHE DAS TABELAS LÉXICAS E SINTÁTICAS ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+# diretório onde ficam as tabelas geradas pelo ply (pode ser trocado com --cache-dir ou TPP_CACHE_DIR)
+DIRETORIO_CACHE_PADRAO = os.environ.get('TPP_CACHE_DIR',
+                                        os.path.join(os.path.expanduser('~'), '.cache', 'compilador-tpp'))
+
+
+# gera a chave do cache a partir das regras do léxico (t_*) e da gramática (p_*), tokens e precedência
+# qualquer mudança nas expressões regulares ou nas produções gera uma chave nova
+def assinaturaGramatica():
+    modulo = globals()
+    h = hashlib.sha256()
+    h.update(repr((lex.__version__, yacc.__tabversion__, tokens, precedence, states,
+                   sorted(palavras_reservadas.items()), t_ignore, t_COMENTARIO_ignore)).encode('utf-8'))
+
+    # a ordem das regras em função importa para o ply (ordem de definição), então entra no hash
+    funcoes = [(nome, f) for nome, f in modulo.items()
+               if (nome.startswith('t_') or nome.startswith('p_')) and callable(f)]
+    funcoes.sort(key=lambda item: item[1].__code__.co_firstlineno)
+    for nome, f in funcoes:
+        h.update(('%s:%s\n' % (nome, f.__doc__)).encode('utf-8'))
+
+    # regras definidas por string
+    for nome in sorted(modulo):
+        if nome.startswith('t_') and isinstance(modulo[nome], str):
+            h.update(('%s=%s\n' % (nome, modulo[nome])).encode('utf-8'))
+    return h.hexdigest()[:20]
+
+
+# carrega um arquivo de tabela do cache como módulo, sem depender do sys.path
+def carregaTabela(caminho, nome):
+    spec = importlib.util.spec_from_file_location(nome, caminho)
+    modulo = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(modulo)
+    return modulo
+
+
+# constroi o analisador léxico e o sintático usando as tabelas do cache
+# se as tabelas ainda não existem para essa gramática, gera (com parser.out) e grava no cache
+def constroiAnalisadores(diretorio_cache=None):
+    if diretorio_cache is None:
+        diretorio_cache = DIRETORIO_CACHE_PADRAO
+    chave = assinaturaGramatica()
+    nome_lextab = 'lextab_' + chave
+    caminho_lextab = os.path.join(diretorio_cache, nome_lextab + '.py')
+    # as tabelas LALR vão em pickle, que carrega bem mais rápido que compilar o parsetab.py
+    nome_parsetab = 'parsetab_%s.pickle' % chave
+    caminho_parsetab = os.path.join(diretorio_cache, nome_parsetab)
+
+    # cache quente: não valida a gramática, não gera tabelas e não escreve o parser.out
+    if os.path.exists(caminho_lextab) and os.path.exists(caminho_parsetab):
+        try:
+            lexer = lex.lex(optimize=1, lextab=carregaTabela(caminho_lextab, nome_lextab))
+            parser = yacc.yacc(debug=False, optimize=True, picklefile=caminho_parsetab)
+            return lexer, parser
+        except Exception:
+            pass  # tabela corrompida ou de outra versão do ply, gera de novo
+
+    # cache frio: gera as tabelas em um diretório temporário e move pro cache no final,
+    # assim dois compiladores rodando juntos nunca leem um arquivo pela metade
+    os.makedirs(diretorio_cache, exist_ok=True)
+    temporario = tempfile.mkdtemp(prefix='tmp_', dir=diretorio_cache)
+    try:
+        lexer = lex.lex()
+        lexer.writetab(nome_lextab, temporario)
+        parser = yacc.yacc(debug=True, outputdir=temporario, debugfile='parser_%s.out' % chave,
+                           picklefile=os.path.join(temporario, nome_parsetab))
+        for arquivo in os.listdir(temporario):
+            if os.path.isfile(os.path.join(temporario, arquivo)):
+                os.replace(os.path.join(temporario, arquivo), os.path.join(diretorio_cache, arquivo))
+    finally:
+        shutil.rmtree(temporario, ignore_errors=True)
+    return lexer, parser
+
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~ PERCURSO ITERATIVO DA ÁRVORE ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+# percurso em profundidade com pilha explícita, usado pelos passes sobre a árvore (tabelas,
+# semântica, anytree/graphviz e geração de código). Sem recursão, programas com dezenas de milhares
+# de se/repita aninhados ou expressões muito longas não estouram o limite de recursão do Python.
+#   pre(no, contexto): ao entrar no nó; devolve o contexto dos filhos, ou PULA_FILHOS para não
+#                      descer (aí o pos desse nó também não é chamado)
+#   pos(no, contexto): depois de todos os filhos, com o mesmo contexto que o pre recebeu
+#   filhos(no, contexto_filhos): pares (filho, contexto) que serão visitados, em ordem. Sem ele são
+#                      todos os filhos, com o contexto devolvido pelo pre
+# nós None (sobras da recuperação de erro do parser) são pulados
+
+PULA_FILHOS = object()
+
+
+def percorreArvore(raiz, pre=None, pos=None, contexto=None, filhos=None):
+    pares = filhos is not None
+    # cada quadro da pilha: (iterador dos filhos que faltam visitar, contexto deles, nó, contexto do nó);
+    # com o filhos o iterador já devolve os pares (filho, contexto)
+    pilha = [(iter(((raiz, contexto),) if pares else (raiz,)), contexto, None, None)]
+    empilha = pilha.append
+    while pilha:
+        iterador, contexto_filhos, no_pai, contexto_pai = pilha[-1]
+        for no in iterador:
+            if pares:
+                no, contexto = no
+            else:
+                contexto = contexto_filhos
+            if no is None:
+                continue
+            contexto_no = contexto if pre is None else pre(no, contexto)
+            if contexto_no is PULA_FILHOS:
+                continue
+            if pares:
+                proximos = filhos(no, contexto_no)
+            else:
+                proximos = no.children
+            if proximos:
+                empilha((iter(proximos), contexto_no, no, contexto))
+                break
+            if pos is not None:
+                pos(no, contexto)
+        else:
+            pilha.pop()
+            if pos is not None and no_pai is not None:
+                pos(no_pai, contexto_pai)
+
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~ ÍNDICE DA ÁRVORE ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+# montado numa passada só logo depois do parse e consultado pelos passes que antes percorriam a
+# árvore (ou a função inteira) atrás de um tipo de nó:
+#   porTipo: type -> nós em pré-ordem (na árvore reduzida vars e números entram pelo nome/valor)
+#   pais: id(nó) -> nó pai (None na raiz)
+#   funcoes: declaracao_funcao do programa, em ordem
+#   declaracoes: declaracao_variaveis globais e declaracao_funcao, na ordem do programa
+#   parametros, retornas: id(declaracao_funcao) -> nós parametro da lista de parâmetros e nós retorna
+#                         da função, em largura (na ordem em que as buscas em largura os achavam)
+#   chamadas: id(declaracao_funcao) -> chamadas de função dentro dela (None para as globais)
+#   tabelas: tabela global com que os nomes da árvore foram resolvidos (resolveNomes)
+#   atributos: nome do atributo -> {nó: valor} (atributoMemorizado)
+# indiceDe(raiz) devolve o índice da árvore, montando só quando a árvore muda
+
+DONOS_DECLARACAO = ('lista_declaracoes', 'declaracao')
+
+
+class IndiceArvore():
+    __slots__ = ('raiz', 'porTipo', 'pais', 'funcoes', 'declaracoes', 'parametros', 'retornas', 'chamadas',
+                 'tabelas', 'atributos')
+
+    def __init__(self, raiz):
+        self.raiz = raiz
+        self.porTipo = {}
+        self.pais = {}
+        self.funcoes = []
+        self.declaracoes = []
+        self.parametros = {}
+        self.retornas = {}
+        self.chamadas = {None: []}
+        self.tabelas = None
+        self.atributos = {}
+        percorreArvore(raiz, self.indexa, contexto=(None, 0, None, False))
+        # a passada é em pré-ordem; ordenar pela profundidade (sort estável) dá a ordem em largura
+        for listas in (self.parametros, self.retornas):
+            for chave, lista in listas.items():
+                lista.sort(key=lambda item: item[0])
+                listas[chave] = [no for _, no in lista]
+
+    # contexto: (nó pai, profundidade, declaracao_funcao atual, dentro da lista de parâmetros)
+    def indexa(self, no, contexto):
+        pai, profundidade, funcao, em_parametros = contexto
+        tipo = no.type
+        porTipo = self.porTipo.get(tipo)
+        if porTipo is None:
+            self.porTipo[tipo] = [no]
+        else:
+            porTipo.append(no)
+        self.pais[id(no)] = pai
+
+        if tipo == "declaracao_funcao" and pai is not None and pai.type in DONOS_DECLARACAO:
+            funcao = no
+            self.funcoes.append(no)
+            self.declaracoes.append(no)
+            self.parametros[id(no)] = []
+            self.retornas[id(no)] = []
+            self.chamadas[id(no)] = []
+        elif tipo == "declaracao_variaveis" and pai is not None and pai.type in DONOS_DECLARACAO:
+            self.declaracoes.append(no)
+        elif funcao is not None:
+            if tipo == "lista_parametros":
+                em_parametros = True
+            elif tipo == "parametro" and em_parametros:
+                self.parametros[id(funcao)].append((profundidade, no))
+            elif tipo == "retorna":
+                self.retornas[id(funcao)].append((profundidade, no))
+        if tipo == "chamada_funcao" and no.leaf is not None:
+            self.chamadas[id(funcao) if funcao is not None else None].append(no)
+        return (no, profundidade + 1, funcao, em_parametros)
+
+    def pai(self, no):
+        return self.pais.get(id(no))
+
+
+indice_arvore = None
+
+
+def indiceDe(raiz):
+    global indice_arvore
+    if indice_arvore is None or indice_arvore.raiz is not raiz:
+        indice_arvore = IndiceArvore(raiz)
+    return indice_arvore
+
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~ ATRIBUTOS MEMORIZADOS ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+# atributos sintetizados que as verificações pedem várias vezes para o mesmo nó (lado direito e
+# lado esquerdo de uma atribuição, tipo do retorno de uma função...) são calculados uma vez por nó
+# e guardados no índice da árvore, com o próprio nó como chave. Os que dependem só da árvore valem
+# enquanto o índice valer (uma árvore nova tem um índice novo); os que leem as ligações dos nomes
+# (dependeDosNomes) são descartados quando o resolveNomes liga a árvore de novo
+
+ATRIBUTOS_DOS_NOMES = set()
+
+
+def atributoMemorizado(dependeDosNomes=False):
+    def decora(calcula):
+        nome = calcula.__name__
+        if dependeDosNomes:
+            ATRIBUTOS_DOS_NOMES.add(nome)
+
+        def memorizado(no):
+            if indice_arvore is None:
+                return calcula(no)
+            valores = indice_arvore.atributos.get(nome)
+            if valores is None:
+                valores = indice_arvore.atributos[nome] = {}
+            elif no in valores:
+                return valores[no]
+            valor = valores[no] = calcula(no)
+            return valor
+
+        memorizado.__name__ = nome
+        memorizado.__doc__ = calcula.__doc__
+        return memorizado
+    return decora
+
+
+# percorre a árvore gerada e coloca no padrão aceito pela biblioteca anytree
+def inorderTraversal2(root, pai=None):
+    raiz = []
+
+    def entra(no, pai):
+        temp = Node(no.type, parent=pai)
+        if (no.leaf):
+            Node(no.leaf, parent=temp)
+        if not raiz:
+            raiz.append(temp)
         return temp
 
+    percorreArvore(root, entra, contexto=pai)
+    if raiz:
+        return raiz[0]
 
-# função recursiva para percorrer a árvore gerada e colocar no padrão aceito pela biblioteca graphviz
-count = 0  # contador para modificar o id e gerar nós com mesmo nome sem bugar a árvore
 
-# variavel para controle sem execução
-semantic_error = False
+# percorre a árvore gerada e coloca no padrão aceito pela biblioteca graphviz
+count = 0  # contador para modificar o id e gerar nós com mesmo nome sem bugar a árvore
 
 def inorderTraversal3(root, pai=None):
-    global dot, count
-    if root:
+    def entra(no, pai):
+        global dot, count
         count += 1
-        id = str(root.type) + str(count)
+        id = str(no.type) + str(count)
 
-        dot.node(id, str(root.type))
+        dot.node(id, str(no.type))
         if pai:
             dot.edge(pai, id)
-        if (root.leaf):
+        if (no.leaf):
             count += 1
-            id_leaf = str(root.leaf) + str(count)
-            dot.node(id_leaf, str(root.leaf))
+            id_leaf = str(no.leaf) + str(count)
+            dot.node(id_leaf, str(no.leaf))
             dot.edge(id, id_leaf)
+        return id
 
-        for filho in root.children:
-            inorderTraversal3(filho, id)
-
+    if root:
+        percorreArvore(root, entra, contexto=pai)
         return 0
 
 
 # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~ analisador semântico ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+# cada tabela guarda as linhas na ordem de declaração (para exibir e serializar) e um dicionário
+# nome -> primeira linha com o nome na tabela; as linhas repetidas de um nome ficam encadeadas por
+# mesmoNome. Nas tabelas aninhadas fundo (a partir de PROFUNDIDADE_MEMORIA) as linhas de um nome
+# vistas da tabela (as dela e as dos escopos de fora, da mais interna para a mais externa) ficam
+# memorizadas na tabela (memoria) com a versão do nome; incluir uma linha com o nome em qualquer
+# tabela da árvore muda a versão (versoes, compartilhado pelas tabelas da mesma raiz) e as memórias
+# antigas do nome deixam de valer. Assim uma consulta sobe só até a primeira tabela com a memória
+# em dia, em vez de subir a cadeia de escopos inteira; nas tabelas rasas subir a cadeia é mais
+# barato que manter a memória
+PROFUNDIDADE_MEMORIA = 8
+
+
 class Linha():
+    __slots__ = ('nome', 'tipo', 'foiusada', 'tamanho1d', 'tamanho2d', 'linhaCodigo', 'qtdParam', 'ehFunc',
+                 'foiInic', 'valor', 'mesmoNome')
+
     def __init__(self, nome, tipo, foiusada=False, tamanho1d=None, tamanho2d=None, linhaCodigo=None, qtdParam=None,
                  ehFunc=None, foiInic=None, valor=None):
         self.nome = nome
@@ -592,11 +2017,18 @@ class Linha():
         self.ehFunc = ehFunc
         self.foiInic = foiInic
         self.valor = valor
+        self.mesmoNome = None  # próxima linha da mesma tabela com o mesmo nome
 
 
 class Table():
+    __slots__ = ('linhas', 'porNome', 'nome', 'pai', 'filhos', 'memoria', 'versoes', 'profundidade')
+
     def __init__(self, pai=None, filhos=None, nome=None):
         self.linhas = []
+        self.porNome = {}
+        self.memoria = {}
+        self.versoes = pai.versoes if pai else {}
+        self.profundidade = pai.profundidade + 1 if pai else 0
         if nome:
             self.nome = nome
         else:
@@ -613,133 +2045,147 @@ class Table():
 
     def addLinha(self, nome, tipo, foiusada=None, tamanho1d=None, tamanho2d=None, linhaCodigo=None, qtdParam=None,
                  ehFunc=None, foiInic=None, valor=None):
-        self.linhas.append(
-            Linha(nome, tipo, foiusada, tamanho1d, tamanho2d, linhaCodigo, qtdParam, ehFunc, foiInic, valor))
+        linha = Linha(nome, tipo, foiusada, tamanho1d, tamanho2d, linhaCodigo, qtdParam, ehFunc, foiInic, valor)
+        self.linhas.append(linha)
+        self.versoes[nome] = self.versoes.get(nome, 0) + 1
+        anterior = self.porNome.get(nome)
+        if anterior is None:
+            self.porNome[nome] = linha
+        else:
+            while anterior.mesmoNome is not None:
+                anterior = anterior.mesmoNome
+            anterior.mesmoNome = linha
 
     def deletLinhaByNome(self, nome):
-        for i, row in enumerate(self.linhas):
-            if nome == row.nome:
-                del self.linhas[i]
+        if self.porNome.pop(nome, None) is not None:
+            self.linhas = [row for row in self.linhas if row.nome != nome]
+            self.versoes[nome] = self.versoes.get(nome, 0) + 1
+
+    # desfaz o último addLinha
+    def retiraUltimaLinha(self):
+        linha = self.linhas.pop()
+        anterior = self.porNome[linha.nome]
+        if anterior is linha:
+            del self.porNome[linha.nome]
+        else:
+            while anterior.mesmoNome is not linha:
+                anterior = anterior.mesmoNome
+            anterior.mesmoNome = None
+        self.versoes[linha.nome] = self.versoes.get(linha.nome, 0) + 1
+        return linha
 
     def addFilho(self, crianca):
         self.filhos.append(crianca)
 
+    # linhas com o nome vistas desta tabela: as dela e as dos escopos de fora, da mais interna para a
+    # mais externa (na ordem de declaração dentro de cada tabela)
+    def linhasVisiveis(self, nome):
+        if self.profundidade < PROFUNDIDADE_MEMORIA:
+            return self.linhasVisiveisSemMemoria(nome)
+        versao = self.versoes.get(nome, 0)
+        memorizada = self.memoria.get(nome)
+        if memorizada is not None and memorizada[0] == versao:
+            return memorizada[1]
+        caminho = [self]
+        tabela = self.pai
+        while True:
+            if tabela.profundidade < PROFUNDIDADE_MEMORIA:
+                visiveis = tabela.linhasVisiveisSemMemoria(nome)
+                break
+            memorizada = tabela.memoria.get(nome)
+            if memorizada is not None and memorizada[0] == versao:
+                visiveis = memorizada[1]
+                break
+            caminho.append(tabela)
+            tabela = tabela.pai
+        for tabela in reversed(caminho):
+            row = tabela.porNome.get(nome)
+            if row is not None:
+                proprias = []
+                while row is not None:
+                    proprias.append(row)
+                    row = row.mesmoNome
+                visiveis = tuple(proprias) + visiveis
+            tabela.memoria[nome] = (versao, visiveis)
+        return visiveis
+
+    def linhasVisiveisSemMemoria(self, nome):
+        visiveis = []
+        tabela = self
+        while tabela is not None:
+            row = tabela.porNome.get(nome)
+            while row is not None:
+                visiveis.append(row)
+                row = row.mesmoNome
+            tabela = tabela.pai
+        return tuple(visiveis)
+
+    # os métodos abaixo olham a cadeia de escopos de self ou de paiArg
+
+    # linha do nome no escopo mais interno que o declara
+    def procura(self, nome):
+        if self.profundidade < PROFUNDIDADE_MEMORIA:
+            tabela = self
+            while tabela is not None:
+                row = tabela.porNome.get(nome)
+                if row is not None:
+                    return row
+                tabela = tabela.pai
+            return None
+        visiveis = self.linhasVisiveis(nome)
+        if visiveis:
+            return visiveis[0]
+
     def foiDeclaradoEmEscopoValido(self, nome, paiArg=None):
-        if paiArg:
-            for row in paiArg.linhas:
-                if row.nome == nome:
-                    return True
-            if paiArg.pai:
-                return self.foiDeclaradoEmEscopoValido(nome, paiArg.pai)
-        else:
-            for row in self.linhas:
-                if row.nome == nome:
-                    return True
-            if self.pai:
-                return self.foiDeclaradoEmEscopoValido(nome, self.pai)
+        tabela = paiArg if paiArg else self
+        if tabela.linhasVisiveis(nome):
+            return True
 
     def atualizafoiusada(self, nome, paiArg=None):
-        if paiArg:
-            for row in paiArg.linhas:
-                if row.nome == nome:
-                    row.foiusada = True
-            if paiArg.pai:
-                return self.atualizafoiusada(nome, paiArg.pai)
-        else:
-            for row in self.linhas:
-                if row.nome == nome:
-                    row.foiusada = True
-            if self.pai:
-                return self.atualizafoiusada(nome, self.pai)
-
-    def atualizafoiinic(self, nome, paiArg=None):
-        if paiArg:
-            for row in paiArg.linhas:
-                if row.nome == nome:
-                    row.foiInic = True
-            if paiArg.pai:
-                return self.atualizafoiinic(nome, paiArg.pai)
-        else:
-            for row in self.linhas:
-                if row.nome == nome:
-                    row.foiInic = True
-            if self.pai:
-                return self.atualizafoiinic(nome, self.pai)
+        tabela = paiArg if paiArg else self
+        for row in tabela.linhasVisiveis(nome):
+            row.foiusada = True
 
     def exibe(self):
         for row in self.linhas:
             print("Nome: ", row.nome, "|   Tipo: ", row.tipo, "|    FoiUsada: ", row.foiusada, "|    EhFunc: ",
                   row.ehFunc, "|    FoiInic: ", row.foiInic)
 
+    # pré-ordem das tabelas (node ou self primeiro, depois os filhos)
     def printaArvore(self, node=None):
-        print("\n----------------------")
-        if node == None:
-            print("Nome Tabela: ", self.nome)
-            self.exibe()
-            print("----------------------\n")
-            for son in self.filhos:
-                self.printaArvore(son)
-        if node:
-            print("Nome Tabela: ", node.nome)
-            node.exibe()
-            print("----------------------")
-            for son in node.filhos:
-                self.printaArvore(son)
-
-    def verificaVariaveisNaoUtilizadas(self, root=None):
-        if root == None:
-            for r in self.linhas:
-                if ((r.foiusada == None) & (r.ehFunc == None)):
-                    print("[AVISO]: Variavel '", r.nome, "' declarada mas não utilizada.")
-                elif ((r.foiusada == None) & (r.ehFunc == True)):
-                    print("[AVISO]: Função '", r.nome, "' declarada mas não utilizada.")
-            for filho in self.filhos:
-                filho.verificaVariaveisNaoUtilizadas(filho)
-        if root:
-            for r in root.linhas:
-                if ((r.foiusada == None) & (r.ehFunc == None)):
-                    print("[AVISO]: Variavel '", r.nome, "' declarada mas não utilizada.")
+        pilha = [(node if node else self, node == None)]
+        while pilha:
+            tabela, eh_raiz = pilha.pop()
+            print("\n----------------------")
+            print("Nome Tabela: ", tabela.nome)
+            tabela.exibe()
+            print("----------------------\n" if eh_raiz else "----------------------")
+            pilha.extend((son, False) for son in reversed(tabela.filhos))
+
+    # variaveis: linhas das variáveis e parâmetros (as outras linhas com ehFunc são funções); usadas: as
+    # que são lidas em algum ponto alcançável (verificaFluxoDeDados). Sem elas só as funções são vistas
+    def verificaVariaveisNaoUtilizadas(self, root=None, variaveis=(), usadas=()):
+        pilha = [root if root else self]
+        while pilha:
+            tabela = pilha.pop()
+            for r in tabela.linhas:
+                if r in variaveis:
+                    if r not in usadas:
+                        diagnosticos.emite('variavel-nao-utilizada',
+                                           "Variavel '", r.nome, "' declarada mas não utilizada.", linha=r.linhaCodigo)
                 elif ((r.foiusada == None) & (r.ehFunc == True)):
-                    print("[AVISO]: Função '", r.nome, "' declarada mas não utilizada.")
-            for filho in root.filhos:
-                filho.verificaVariaveisNaoUtilizadas(filho)
-
-    def verificaVariaveisNaoInicializadas(self, leaf=None, paiArg=None):
-        if paiArg:
-            for row in paiArg.linhas:
-                if row.nome == leaf:
-                    if not row.foiInic and (not row.ehFunc or row.ehFunc == ''):
-                        print("[AVISO]: Variavel '", row.nome, "' declarada mas não inicializada.")
-                    return row
-            if paiArg.pai:
-                return self.verificaVariaveisNaoInicializadas(leaf, paiArg.pai)
-        else:
-            for row in self.linhas:
-                if row.nome == leaf:
-                    if not row.foiInic and (not row.ehFunc or row.ehFunc == ''):
-                        print("[AVISO]: Variavel '", row.nome, "' declarada mas não inicializada.")
-                    return row
-            if self.pai:
-                return self.verificaVariaveisNaoInicializadas(leaf, self.pai)
+                    diagnosticos.emite('funcao-nao-utilizada', "Função '", r.nome, "' declarada mas não utilizada.",
+                                       linha=r.linhaCodigo)
+            pilha.extend(reversed(tabela.filhos))
 
     def procuraVarDeclaradaEMudaTipo(self, nome, tipo, paiArg=None):
-        if paiArg:
-            for row in paiArg.linhas:
-                if row.nome == nome:
-                    row.tipo = tipo
-            if paiArg.pai:
-                return self.procuraVarDeclaradaEMudaTipo(nome, tipo, paiArg.pai)
-        else:
-            for row in self.linhas:
-                if row.nome == nome:
-                    row.tipo = tipo
-            if self.pai:
-                return self.procuraVarDeclaradaEMudaTipo(nome, tipo, self.pai)
+        tabela = paiArg if paiArg else self
+        for row in tabela.linhasVisiveis(nome):
+            row.tipo = tipo
 
     def procuraPelaMain(self):
-        if 'principal' not in [i.nome for i in self.linhas]:
-            print("[ERRO]: Função principal não foi declarada")
-            semantic_error = True
+        if 'principal' not in self.porNome:
+            diagnosticos.emite('principal-nao-declarada', "Função principal não foi declarada")
 
 
 tabela_raiz = Table(nome="global")
@@ -747,8 +2193,8 @@ guardaTipo = ""
 
 
 def insereVariavelNaTabela(root, tabela_imutavel):
-    global guardaTipo
-    if root:
+    def entra(root, _):
+        global guardaTipo
         if guardaTipo == None:
             guardaTipo = ""
         if root.leaf:
@@ -758,44 +2204,62 @@ def insereVariavelNaTabela(root, tabela_imutavel):
                 if len(root.children) >= 1:
                     numb = pegaFolhaComPaiNumero(root)
                     if isinstance(numb, float):
-                        print("[ERRO]: Indice de array '", root.leaf, "' não inteiro")
-                        semantic_error = True
-                        tabela_imutavel.addLinha(root.leaf, "inteiro", '', numb)
+                        diagnosticos.emite('indice-nao-inteiro', "Indice de array '", root.leaf, "' não inteiro",
+                                           linha=root.linhaCodigo)
+                        tabela_imutavel.addLinha(root.leaf, "inteiro", '', numb, linhaCodigo=root.linhaCodigo)
                     else:
-                        tabela_imutavel.addLinha(root.leaf, "inteiro", '', numb)
+                        tabela_imutavel.addLinha(root.leaf, "inteiro", '', numb, linhaCodigo=root.linhaCodigo)
                 elif tabela_imutavel.foiDeclaradoEmEscopoValido(root.leaf):
-                    print("[AVISO]: Variavel '", root.leaf, "' já declarada anteriormente")
+                    diagnosticos.emite('variavel-redeclarada', "Variavel '", root.leaf, "' já declarada anteriormente",
+                                       linha=root.linhaCodigo)
                     tabela_imutavel.procuraVarDeclaradaEMudaTipo(root.leaf, guardaTipo)
 
                 else:
-                    tabela_imutavel.addLinha(root.leaf, guardaTipo)
-        for fi in root.children:
-            insereVariavelNaTabela(fi, tabela_imutavel)
+                    tabela_imutavel.addLinha(root.leaf, guardaTipo, linhaCodigo=root.linhaCodigo)
+
+    if root:
+        percorreArvore(root, entra)
 
 
 # para fazer verificação de atribuição de tipos distintos
 # retorna o nome do lado esquerdo da atribuiçao ex: a:=10 (retorna a)
+# desce sempre pelo primeiro filho
 def pegaFolhaComPaiVar(root):
-    if root:
+    var = pegaNoFolhaComPaiVar(root)
+    if var is not None:
+        return var.leaf
+
+
+# o mesmo, mas devolve o nó da var
+@atributoMemorizado()
+def pegaNoFolhaComPaiVar(root):
+    while root:
         if root.leaf:
             if root.type == "var":
-                return root.leaf
-        for fi in root.children:
-            return pegaFolhaComPaiVar(fi)
+                return root
+        if not root.children:
+            return None
+        root = root.children[0]
 
 
 def pegaFolhaComPaiNumero(root):
-    if root:
+    while root:
         if root.leaf != None:
-            # print(root.__dict__)
             if root.type == "numero":
                 return root.leaf
-        for fi in root.children:
-            return pegaFolhaComPaiNumero(fi)
+        if not root.children:
+            return None
+        root = root.children[0]
 
 
+# primeira var, chamada de função ou número da expressão, em pré-ordem
+@atributoMemorizado()
 def pegaLadoDireitoAtribuicao(root):
-    if root:
+    pilha = [root]
+    while pilha:
+        root = pilha.pop()
+        if not root:
+            continue
         if root.leaf != None:
             if root.type == "var":
                 return root.leaf
@@ -803,338 +2267,1581 @@ def pegaLadoDireitoAtribuicao(root):
                 return root.leaf
             if root.type == "numero":
                 return root.leaf
-        x = []
-        for filho in root.children:
-            x.append(pegaLadoDireitoAtribuicao(filho))
-        cv = list(filter(lambda n: n!=None, x))
-        # print(cv,x)
-        if len(cv) > 0:
-            # print(cv[0])
-            return cv[0]
-
-
-# pega o tipo da variavel na tabela ja montada
-def pegaTipoByNomeIterative(nome, pegaValor=None):
-    global tabela_raiz
-    vetor = []
-    atual = tabela_raiz
-    if pegaValor == None:
-        for r in atual.linhas:
-            if r.nome == nome:
-                return r.tipo
-        while (True):
-            for child in atual.filhos:
-                # child.exibe()
-                if child:
-                    for row in child.linhas:
-                        if row.nome == nome:
-                            return row.tipo
-                    vetor.append(child)
-            if len(vetor) == 0: break
-            atual = vetor.pop(0)
-
-    if pegaValor != None:
-        for r in atual.linhas:
-            if r.nome == nome:
-                return r.tipo
-        while (True):
-            for child in atual.filhos:
-                # child.exibe()
-                if child:
-                    for row in child.linhas:
-                        if row.nome == nome:
-                            return row.tipo
-                    vetor.append(child)
-            if len(vetor) == 0: break
-            atual = vetor.pop(0)
-
-
-# pega o tipo da variável/função pelo nome
-# função recursiva
-def pegaTipoVarNome(nome, root):
-    if root:
-        # root.exibe()
-        for r in root.linhas:
-            if r.nome == nome:
-                return r.tipo
-        x = []
-        for f in root.filhos:
-            x.append(pegaTipoVarNome(nome, f))
-        if 'inteiro' in x:
-            return 'inteiro'
-        elif 'flutuante' in x:
-            return 'flutuante'
-        else:
-            return 'vazio'
+        pilha.extend(reversed(root.children))
+
+
+# tipo do nome no escopo da tabela ('vazio' quando não foi declarado)
+def pegaTipoNoEscopo(nome, tabela):
+    row = tabela.procura(nome)
+    if row is not None:
+        return row.tipo
+    return 'vazio'
 
 
+# quantidade de parametros da função da linha (0 quando o nome não é de uma função)
+def pegaQtdParamDaLinha(row):
+    if row is not None and row.ehFunc:
+        return row.qtdParam
+    return 0
+
+
+# tipo do primeiro retorna da função (em largura) cuja expressão começa por uma var ou um número
+@atributoMemorizado(dependeDosNomes=True)
 def pegaTipoDoRetornaIterativo(root):
-    vetor = []
-    atual = root
-    if root.type == "retorna":
-        if pegaFolhaComPaiVar(child):
-            return pegaTipoByNomeIterative(pegaFolhaComPaiVar(child))
+    for child in indice_arvore.retornas[id(root)]:
+        var = pegaNoFolhaComPaiVar(child)
+        if var is not None:
+            return var.linha.tipo if var.linha is not None else None
         elif isinstance(pegaFolhaComPaiNumero(child), (int, float, complex)):
             if isinstance(pegaFolhaComPaiNumero(child), int):
                 return "inteiro"
             if isinstance(pegaFolhaComPaiNumero(child), float):
                 return "flutuante"
-    while (True):
-        for child in atual.children:
-            if child.type == "retorna":
-                # print(root.children[0].__dict__)
-                if pegaFolhaComPaiVar(child):
-                    return pegaTipoByNomeIterative(pegaFolhaComPaiVar(child))
-                elif isinstance(pegaFolhaComPaiNumero(child), (int, float, complex)):
-                    # print(pegaFolhaComPaiNumero(child))
-                    if isinstance(pegaFolhaComPaiNumero(child), int):
-                        return "inteiro"
-                    if isinstance(pegaFolhaComPaiNumero(child), float):
-                        return "flutuante"
-
-            vetor.append(child)
-        if len(vetor) == 0: break
-        atual = vetor.pop(0)
-
-
-# passa o nome da func e retorna a qtdParam
-def pegaqtdParamNaTabelaByNome(nome):
-    global tabela_raiz
-    vetor = []
-    atual = tabela_raiz
-    for r in atual.linhas:
-        if r.nome == nome:
-            return r.qtdParam
-    while (True):
-        for child in atual.filhos:
-            if child:
-                for row in child.linhas:
-                    if row.nome == nome:
-                        # print("entrei aqui")
-                        return row.qtdParam
-                vetor.append(child)
-        if len(vetor) == 0: break
-        atual = vetor.pop(0)
-    return 0
 
 
 # retorna a quantidade de parametros que estão definidos na declaracao de funcao
+# (um parametro vetor x[] é um parametro dentro de outro no índice e conta uma vez só)
 def pegaQuantidadeParametrosFuncao(root):
-    vetor = []
-    atual = root
-    cont = 0
-    while (True):
-        for child in atual.children:
-            if child.type == "parametro":
-                cont = cont + 1
-
-            vetor.append(child)
-        if len(vetor) == 0: break
-        atual = vetor.pop(0)
-    return cont
+    return sum(1 for parametro in indice_arvore.parametros[id(root)]
+               if indice_arvore.pai(parametro).type != 'parametro')
 
 
 # retorna a quantidade de parametros que foram passados em uma chamada de funcao
+# (os argumentos são os filhos da lista_argumentos; sem argumentos a lista tem só o 'vazio')
 def pegaQuantidadeParametrosChamadaFuncao(root):
-    vetor = []
-    atual = root
-    cont = 0
-    while (True):
-        for child in atual.children:
-            if len(child.children) > 0:
-                if child.type == "fator":
-                    cont = cont + 1
-                    continue
-                vetor.append(child)
-        if len(vetor) == 0: break
-        atual = vetor.pop(0)
-    return cont
+    return sum(1 for argumento in root.children[0].children if argumento.type != 'vazio')
 
 
 # função chamada após a geração das tabelas para verificar se o tipo do retorna está certo
 def verificaTipoRetorna(root, tabela=None):
-    global tabela_raiz
     if root:
-        for f in root.children:
-            if f.type == "declaracao_funcao":
-                if f.children[0].type == "tipo":
-                    if f.children[0].leaf != pegaTipoDoRetornaIterativo(f):
-                        if pegaTipoDoRetornaIterativo(f) == None:
-                            print("[ERRO]: Função '", f.children[1].leaf, "' deveria retornar ",
-                                  f.children[0].leaf, ", mas retorna vazio")
-                            semantic_error = True
-                        else:
-                            print("[ERRO]: Função '", f.children[1].leaf, "' deveria retornar ",
-                                  f.children[0].leaf, ", mas retorna ", pegaTipoDoRetornaIterativo(f))
-                            semantic_error = True
-
-                elif pegaTipoDoRetornaIterativo(f) != None:
-                    print("[ERRO]: Função '", f.children[0].leaf, "' deveria retornar vazio, mas retorna",
-                          pegaTipoDoRetornaIterativo(f))
-                    semantic_error = True
-
-            verificaTipoRetorna(f)
+        for f in nomesResolvidos(root, False).funcoes:
+            if f.children[0].type == "tipo":
+                if f.children[0].leaf != pegaTipoDoRetornaIterativo(f):
+                    if pegaTipoDoRetornaIterativo(f) == None:
+                        diagnosticos.emite('tipo-retorno', "Função '", f.children[1].leaf, "' deveria retornar ",
+                                           f.children[0].leaf, ", mas retorna vazio", linha=f.linhaCodigo)
+                    else:
+                        diagnosticos.emite('tipo-retorno', "Função '", f.children[1].leaf, "' deveria retornar ",
+                                           f.children[0].leaf, ", mas retorna ", pegaTipoDoRetornaIterativo(f),
+                                           linha=f.linhaCodigo)
+
+            elif pegaTipoDoRetornaIterativo(f) != None:
+                diagnosticos.emite('tipo-retorno',
+                                   "Função '", f.children[0].leaf, "' deveria retornar vazio, mas retorna",
+                                   pegaTipoDoRetornaIterativo(f), linha=f.linhaCodigo)
 
 
 def percorreDeclaracaoFuncaoEAdicionaParametroNaTabela(root, tabela):
-    vetor = []
-    atual = root
-    while (True):
-        for child in atual.children:
-            if child.type == "parametro":
-                nome = child.leaf
-                tipo = child.children[0].leaf
-                tabela.addLinha(nome, tipo, None, '', '', '', '', True, foiInic=True)
-
-            vetor.append(child)
-        if len(vetor) == 0: break
-        atual = vetor.pop(0)
-
-
-def recomeco(root, tabela=None, pai=None):
-    global tabela_raiz, semantic_error
-    if root:
-        temp = False
-        f = root
-        if f.type == "var" and not pai:
-            if tabela != None:
-                tabela.atualizafoiusada(f.leaf)
+    for child in indice_arvore.parametros[id(root)]:
+        nome = child.leaf
+        tipo = child.children[0].leaf
+        tabela.addLinha(nome, tipo, None, '', '', child.linhaCodigo, '', True, foiInic=True)
+
+
+# verificações que o recomeco faz ao entrar em cada nó, escolhidas pelo tipo do nó (TRATADORES_RECOMECO).
+# Recebem o nó, a tabela e o pai do nó pai (root) e devolvem a tabela e o pai do nó e dos filhos dele
+
+def recomecoLeia(f, tabela, pai, root):
+    return tabela, pai
+
+
+def recomecoDeclaracaoFuncao(f, tabela, pai, root):
+    if len(f.children) > 1:
+        new_table = Table(tabela_raiz, nome=f.children[1].leaf)
+        tabela_raiz.addFilho(new_table)
+    else:
+        new_table = Table(tabela_raiz, nome=f.children[0].leaf)
+        tabela_raiz.addFilho(new_table)
+
+    qtdParam = pegaQuantidadeParametrosFuncao(f)
+    # significa que tem argumentos pra por na tabela
+    if qtdParam > 0:
+        percorreDeclaracaoFuncaoEAdicionaParametroNaTabela(f, new_table)
+
+    # se for menor que 1 significa que nao tem tipo a funcao então manda vazio
+    if len(f.children) > 1:
+        if f.children[1].leaf == "principal":
+            tabela_raiz.addLinha(f.children[1].leaf, f.children[0].leaf, '', '', '', f.linhaCodigo, qtdParam, True)
+        else:
+            tabela_raiz.addLinha(f.children[1].leaf, f.children[0].leaf, None, '', '', f.linhaCodigo, qtdParam, True)
+    else:
+        if f.children[0].leaf == "principal":
+            tabela_raiz.addLinha(f.children[0].leaf, "vazio", '', '', '', f.linhaCodigo, qtdParam, True),
+        else:
+            tabela_raiz.addLinha(f.children[0].leaf, "vazio", None, '', '', f.linhaCodigo, qtdParam, True),
+
+    return new_table, pai
+
+
+def recomecoSe(f, tabela, pai, root):
+    new_table = Table(tabela, nome="se")
+    tabela.addFilho(new_table)
+    return new_table, pai
+
+
+def recomecoRepita(f, tabela, pai, root):
+    new_table = Table(tabela, nome="repita")
+    tabela.addFilho(new_table)
+    return new_table, pai
+
+
+def recomecoRetorna(f, tabela, pai, root):
+    nome = pegaFolhaComPaiVar(f)
+    if nome:
+        if not tabela.foiDeclaradoEmEscopoValido(nome):
+            diagnosticos.emite('variavel-nao-declarada', "Variavel '", nome, "' nao foi declarada",
+                               linha=f.linhaCodigo)
+    return tabela, pai
+
+
+def recomecoChamadaFuncao(f, tabela, pai, root):
+    if tabela != None:
+        if f.leaf == "principal":
+            diagnosticos.emite('chamada-recursiva-principal', "Chamada recursiva para a função 'principal'",
+                               linha=f.linhaCodigo)
+        if not tabela.foiDeclaradoEmEscopoValido(f.leaf):
+            diagnosticos.emite('funcao-nao-declarada', "Chamada a função '", f.leaf, "' que não foi declarada",
+                               linha=f.linhaCodigo)
+
+        if pegaQuantidadeParametrosChamadaFuncao(f) < pegaQtdParamDaLinha(tabela.procura(f.leaf)):
+            diagnosticos.emite('parametros-a-menos',
+                               "Chamada a função '", f.leaf, "' com número de parâmetros menor que o declarado",
+                               linha=f.linhaCodigo)
+        # print(pegaQuantidadeParametrosChamadaFuncao(f))
+        # print(pegaqtdParamNaTabelaByNome(f))
+        # if pegaQuantidadeParametrosChamadaFuncao(f) > pegaqtdParamNaTabelaByNome(f.leaf):
+            # print("[ERRO]: Chamada a função '", f.leaf, "' com número de parâmetros maior que o declarado")
+            # semantic_error = True
+
+        tabela.atualizafoiusada(f.leaf)
+    return tabela, pai
+
+
+def recomecoDeclaracaoVariaveis(f, tabela, pai, root):
+    pai = True
+    if root.type == "acao":
+        insereVariavelNaTabela(f, tabela)
+    else:
+        insereVariavelNaTabela(f, tabela_raiz)
+    return tabela, pai
+
+
+def recomecoAtribuicao(f, tabela, pai, root):
+    if tabela != None:
+        pai = True
+        # descomente esta linha para atribuiçao começar a contar como variavel utilizada
+        # tabela.atualizafoiusada(f.children[0].leaf)
+
+        # se for igual numero
+        y = pegaLadoDireitoAtribuicao(f.children[1])
+        # só funciona para alguns casos específicos (arrumar depois)
+        # print(pegaLadoDireitoAtribuicao(f.children[1]))
+        # if isinstance(y, str):
+            # if f.children[0].leaf == y:
+                # print("[AVISO]: Variavel '", y, "' declarada mas não inicializada.")
+            # else:
+                # x = tabela_raiz.verificaVariaveisNaoInicializadas(leaf=y)
+        # print(x.__dict__)
+        # lado esquerdo e lado direito vêm dos atributos memorizados do nó
+        esquerda = pegaFolhaComPaiVar(f)
+        if isinstance(y, (int, float)):
+            tipo_esquerda = pegaTipoNoEscopo(esquerda, tabela)
+            if isinstance(y, int):
+                if tipo_esquerda != "inteiro":
+                    diagnosticos.emite('atribuicao-tipos-distintos',
+                                       "Atribuição de tipos distintos '", esquerda, "' ", tipo_esquerda, "'", y,
+                                       "' inteiro", linha=f.children[0].linhaCodigo)
+            elif tipo_esquerda != "flutuante":
+                diagnosticos.emite('atribuicao-tipos-distintos',
+                                   "Atribuição de tipos distintos '", esquerda, "' ", tipo_esquerda, "'", y,
+                                   "' flutuante", linha=f.children[0].linhaCodigo)
+
+        # senao se for igual variavel/func
+        elif tabela.foiDeclaradoEmEscopoValido(y):
+            tipo_esquerda = pegaTipoNoEscopo(esquerda, tabela)
+            tipo_direita = pegaTipoNoEscopo(y, tabela)
+            if tipo_esquerda != tipo_direita:
+                diagnosticos.emite('atribuicao-tipos-distintos',
+                                   "Atribuição de tipos distintos '", esquerda, "' ", tipo_esquerda, " e '", y,
+                                   "' ", tipo_direita, linha=f.children[0].linhaCodigo)
             else:
-                tabela_raiz.atualizafoiusada(f.leaf)
+                tabela.atualizafoiusada(y)
+
+        elif not isinstance(y, (int, float, complex)):
+            diagnosticos.emite('variavel-nao-declarada', "Variavel '", y, "' não declarada",
+                               linha=f.children[0].linhaCodigo)
+        if tabela.foiDeclaradoEmEscopoValido(f.children[0].leaf) != True:
+            diagnosticos.emite('variavel-nao-declarada', "Variavel", f.children[0].leaf, "nao foi declarada",
+                               linha=f.children[0].linhaCodigo)
+    else:
+        diagnosticos.emite('variavel-nao-declarada', "Variavel", f.children[0].leaf, "nao foi declarada",
+                           linha=f.children[0].linhaCodigo)
+    return tabela, pai
+
+
+TRATADORES_RECOMECO = {
+    "leia": recomecoLeia,
+    "declaracao_funcao": recomecoDeclaracaoFuncao,
+    "se": recomecoSe,
+    "repita": recomecoRepita,
+    "retorna": recomecoRetorna,
+    "chamada_funcao": recomecoChamadaFuncao,
+    "declaracao_variaveis": recomecoDeclaracaoVariaveis,
+    "atribuicao": recomecoAtribuicao,
+}
+
+
+def recomeco(root, tabela=None, pai=None, tratadores=TRATADORES_RECOMECO):
+    # percorre a árvore concreta montando as tabelas e fazendo as verificações semânticas
+    # o contexto de cada nó é (tabela, pai, nó pai): as verificações de um filho f são feitas ao entrar
+    # nele, com a tabela e o pai do nó pai (root), e definem a tabela e o pai de f e dos filhos de f
+    indiceDe(root)
+    if tratadores is TRATADORES_RECOMECO:
+        entra = entraRecomeco
+    else:
+        def entra(f, contexto):
+            return entraRecomeco(f, contexto, tratadores)
+    percorreArvore(root, entra, contexto=(tabela, pai, None))
+
+
+# tratadores: outra tabela de tratadores (a análise paralela troca o da declaracao_funcao); um
+# tratador que devolve PULA_FILHOS como tabela já cuidou do nó e dos filhos dele
+def entraRecomeco(f, contexto, tratadores=TRATADORES_RECOMECO):
+    tabela, pai, root = contexto
+    if root is not None:
+        tratador = tratadores.get(f.type)
+        if tratador is not None:
+            tabela, pai = tratador(f, tabela, pai, root)
+            if tabela is PULA_FILHOS:
+                return PULA_FILHOS
+    return tabela, pai, f
+
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~ análise semântica na árvore reduzida ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+# mesmas verificações do recomeco/verificaTipoRetorna, na mesma ordem e com as mesmas mensagens,
+# mas feitas sobre a árvore reduzida (modo --reducao-direta), que não tem os nós declaracao, acao,
+# expressao, fator, etc. Na árvore reduzida uma var é o nó cujo type é o nome, um número é o nó
+# cujo type é o valor e uma operação é o nó cujo type é o operador. Como o type da var é o nome
+# (e um nome pode ser 'tipo' ou 'corpo'), a var é reconhecida pela posição: tudo que está em posição
+# de expressão passa por recomecoExpressaoReduzida.
+
+OPERADORES_REDUZIDOS = frozenset(('+', '-', '*', '/', '&&', '||', '<', '>', '=', '<>', '<=', '>='))
+COMANDOS_REDUZIDOS = frozenset(('declaracao_variaveis', 'atribuicao', 'se', 'repita', 'leia', 'escreva', 'retorna'))
+
+
+def ehOperadorReduzido(no):
+    return isinstance(no.type, str) and no.type in OPERADORES_REDUZIDOS and 0 < len(no.children) <= 2
+
+
+# equivalente ao pegaFolhaComPaiVar: segue o primeiro filho até achar uma var (a operação unária
+# para a busca, como o operador_soma com folha na árvore concreta)
+def pegaFolhaComPaiVarReduzida(root):
+    var = pegaNoFolhaComPaiVarReduzida(root)
+    if var is not None:
+        return var.type
+
+
+@atributoMemorizado()
+def pegaNoFolhaComPaiVarReduzida(root):
+    while root is not None:
+        if not isinstance(root.type, str):
+            return None
+        if root.type == 'chamada_funcao':
+            root = root.children[0].children[0] if root.children[0].children else None
+        elif root.type == 'atribuicao' or (ehOperadorReduzido(root) and len(root.children) == 2):
+            root = root.children[0]
+        elif ehOperadorReduzido(root):
+            return None
+        else:
+            return root
+    return None
+
+
+# equivalente ao pegaFolhaComPaiNumero: segue o primeiro filho até achar um número, passando
+# inclusive pelo índice das vars
+def pegaFolhaComPaiNumeroReduzida(root):
+    while root is not None:
+        if not isinstance(root.type, str):
+            return root.type
+        if root.type == 'chamada_funcao':
+            root = root.children[0].children[0] if root.children[0].children else None
+        elif ehOperadorReduzido(root) and len(root.children) == 1:
+            return None
+        else:
+            root = root.children[0] if root.children else None
+    return None
+
+
+# equivalente ao pegaLadoDireitoAtribuicao: primeira var, chamada ou número da expressão (em pré-ordem)
+@atributoMemorizado()
+def pegaLadoDireitoAtribuicaoReduzida(root):
+    pilha = [root]
+    while pilha:
+        no = pilha.pop()
+        if no is None:
+            continue
+        if not isinstance(no.type, str):
+            return no.type
+        if no.type == 'chamada_funcao':
+            return no.leaf
+        if no.type == 'atribuicao' or ehOperadorReduzido(no):
+            pilha.extend(reversed(no.children))
+        else:
+            return no.type
+
+
+def insereVariavelNaTabelaReduzida(root, tabela_imutavel):
+    global guardaTipo
+    guardaTipo = root.children[0].leaf
+    for var in root.children[1].children:
+        insereVarReduzida(var, tabela_imutavel)
+
+
+def insereVarReduzida(var, tabela_imutavel):
+    if var is None:
+        return
+    if len(var.children) >= 1:
+        numb = pegaFolhaComPaiNumeroReduzida(var)
+        if isinstance(numb, float):
+            diagnosticos.emite('indice-nao-inteiro', "Indice de array '", var.type, "' não inteiro",
+                               linha=var.linhaCodigo)
+        tabela_imutavel.addLinha(var.type, "inteiro", '', numb, linhaCodigo=var.linhaCodigo)
+    elif tabela_imutavel.foiDeclaradoEmEscopoValido(var.type):
+        diagnosticos.emite('variavel-redeclarada', "Variavel '", var.type, "' já declarada anteriormente",
+                           linha=var.linhaCodigo)
+        tabela_imutavel.procuraVarDeclaradaEMudaTipo(var.type, guardaTipo)
+    else:
+        tabela_imutavel.addLinha(var.type, guardaTipo, linhaCodigo=var.linhaCodigo)
+    # como na árvore concreta, as vars usadas dentro dos índices também passam pela declaração
+    for indice in var.children:
+        for no in varsDaExpressaoReduzida(indice):
+            insereVarReduzida(no, tabela_imutavel)
+
+
+# vars que aparecem direto numa expressão (as de dentro dos índices ficam com a própria var)
+def varsDaExpressaoReduzida(root):
+    pilha = [root]
+    while pilha:
+        no = pilha.pop()
+        if no is None or not isinstance(no.type, str):
+            continue
+        if no.type == 'chamada_funcao':
+            pilha.extend(reversed(no.children[0].children))
+        elif no.type == 'atribuicao' or ehOperadorReduzido(no):
+            pilha.extend(reversed(no.children))
+        else:
+            yield no
+
+
+def recomecoReduzida(root, tabela=None, pai=None, no_pai=None, tratadores=None):
+    indiceDe(root)
+    if tratadores is None:
+        entra = entraReduzida
+    else:
+        def entra(no, contexto):
+            return entraReduzida(no, contexto, tratadores)
+    percorreArvore(root, entra, contexto=(tabela, pai, no_pai, False), filhos=filhosEscolhidos)
+
+
+def recomecoExpressaoReduzida(root, tabela=None, pai=None):
+    percorreArvore(root, entraReduzida, contexto=(tabela, pai, None, True), filhos=filhosEscolhidos)
+
+
+# para o percorreArvore quando o pre já devolve os pares (filho, contexto) que serão visitados
+def filhosEscolhidos(no, pares):
+    return pares
+
 
-            if tabela:
-                # print("oi")
-                tabela.verificaVariaveisNaoInicializadas(leaf=f.leaf)
+# tratadores do recomecoReduzida para os nós em posição de comando, escolhidos pelo tipo do nó
+# (TRATADORES_REDUZIDOS). Recebem o nó, a tabela, o pai e o nó pai e devolvem os pares
+# (filho, contexto) que serão visitados em seguida
+
+def reduzidaListaDeclaracoes(root, tabela, pai, no_pai):
+    comando = (tabela, pai, root, False)
+    return [(f, comando) for f in root.children]
+
+
+def reduzidaDeclaracaoFuncao(root, tabela, pai, no_pai):
+    nome = root.children[-1].leaf
+    new_table = Table(tabela_raiz, nome=nome)
+    tabela_raiz.addFilho(new_table)
+
+    qtdParam = pegaQuantidadeParametrosFuncao(root)
+    if qtdParam > 0:
+        percorreDeclaracaoFuncaoEAdicionaParametroNaTabela(root, new_table)
+
+    tipo_funcao = root.children[0].leaf if len(root.children) > 1 else "vazio"
+    if nome == "principal":
+        tabela_raiz.addLinha(nome, tipo_funcao, '', '', '', root.linhaCodigo, qtdParam, True)
+    else:
+        tabela_raiz.addLinha(nome, tipo_funcao, None, '', '', root.linhaCodigo, qtdParam, True)
+    return [(root.children[-1].children[1], (new_table, pai, root, False))]
+
+
+def reduzidaCorpo(root, tabela, pai, no_pai):
+    comando = (tabela, pai, root, False)
+    return [(f, comando if f is not None and f.type in COMANDOS_REDUZIDOS else (tabela, pai, None, True))
+            for f in root.children]
+
+
+def reduzidaSe(root, tabela, pai, no_pai):
+    new_table = Table(tabela, nome="se")
+    tabela.addFilho(new_table)
+    return [(root.children[0].children[0], (new_table, pai, None, True))] + \
+           [(corpo, (new_table, pai, root, False)) for corpo in root.children[1:]]
+
+
+def reduzidaRepita(root, tabela, pai, no_pai):
+    new_table = Table(tabela, nome="repita")
+    tabela.addFilho(new_table)
+    return [(root.children[0], (new_table, pai, root, False)),
+            (root.children[1].children[0], (new_table, pai, None, True))]
+
+
+def reduzidaLeia(root, tabela, pai, no_pai):
+    return [(root.children[0], (tabela, pai, None, True))]
+
+
+def reduzidaEscreva(root, tabela, pai, no_pai):
+    return [(root.children[0], (tabela, pai, None, True))]
+
+
+def reduzidaRetorna(root, tabela, pai, no_pai):
+    nome = pegaFolhaComPaiVarReduzida(root.children[0])
+    if nome and not tabela.foiDeclaradoEmEscopoValido(nome):
+        diagnosticos.emite('variavel-nao-declarada', "Variavel '", nome, "' nao foi declarada",
+                           linha=root.linhaCodigo)
+    return [(root.children[0], (tabela, pai, None, True))]
+
+
+def reduzidaDeclaracaoVariaveis(root, tabela, pai, no_pai):
+    if no_pai is not None and no_pai.type == "corpo":
+        insereVariavelNaTabelaReduzida(root, tabela)
+    else:
+        insereVariavelNaTabelaReduzida(root, tabela_raiz)
+    return [(indice, (tabela, True, None, True))
+            for var in root.children[1].children if var is not None for indice in var.children]
+
+
+def reduzidaAtribuicao(root, tabela, pai, no_pai):
+    esquerda = root.children[0].type
+    if tabela != None:
+        pai = True
+        y = pegaLadoDireitoAtribuicaoReduzida(root.children[1])
+        if isinstance(y, (int, float)):
+            tipo_esquerda = pegaTipoNoEscopo(esquerda, tabela)
+            if isinstance(y, int):
+                if tipo_esquerda != "inteiro":
+                    diagnosticos.emite('atribuicao-tipos-distintos',
+                                       "Atribuição de tipos distintos '", esquerda, "' ", tipo_esquerda, "'", y,
+                                       "' inteiro", linha=root.children[0].linhaCodigo)
+            elif tipo_esquerda != "flutuante":
+                diagnosticos.emite('atribuicao-tipos-distintos',
+                                   "Atribuição de tipos distintos '", esquerda, "' ", tipo_esquerda, "'", y,
+                                   "' flutuante", linha=root.children[0].linhaCodigo)
+
+        elif tabela.foiDeclaradoEmEscopoValido(y):
+            tipo_esquerda = pegaTipoNoEscopo(esquerda, tabela)
+            tipo_direita = pegaTipoNoEscopo(y, tabela)
+            if tipo_esquerda != tipo_direita:
+                diagnosticos.emite('atribuicao-tipos-distintos',
+                                   "Atribuição de tipos distintos '", esquerda, "' ", tipo_esquerda, " e '", y,
+                                   "' ", tipo_direita, linha=root.children[0].linhaCodigo)
             else:
-                tabela_raiz.verificaVariaveisNaoInicializadas(leaf=f.leaf)
+                tabela.atualizafoiusada(y)
+
+        elif not isinstance(y, (int, float, complex)):
+            diagnosticos.emite('variavel-nao-declarada', "Variavel '", y, "' não declarada",
+                               linha=root.children[0].linhaCodigo)
+        if tabela.foiDeclaradoEmEscopoValido(esquerda) != True:
+            diagnosticos.emite('variavel-nao-declarada', "Variavel", esquerda, "nao foi declarada",
+                               linha=root.children[0].linhaCodigo)
+    else:
+        diagnosticos.emite('variavel-nao-declarada', "Variavel", esquerda, "nao foi declarada",
+                           linha=root.children[0].linhaCodigo)
+
+    return [(f, (tabela, pai, None, True)) for f in root.children]
+
+
+TRATADORES_REDUZIDOS = {
+    "programa": reduzidaListaDeclaracoes,
+    "lista_declaracoes": reduzidaListaDeclaracoes,
+    "declaracao_funcao": reduzidaDeclaracaoFuncao,
+    "corpo": reduzidaCorpo,
+    "se": reduzidaSe,
+    "repita": reduzidaRepita,
+    "leia": reduzidaLeia,
+    "escreva": reduzidaEscreva,
+    "retorna": reduzidaRetorna,
+    "declaracao_variaveis": reduzidaDeclaracaoVariaveis,
+    "atribuicao": reduzidaAtribuicao,
+}
 
-        for f in root.children:
-            if f.type == "leia":
-                tabela.atualizafoiinic(f.children[0].leaf)
 
-            if f.type == "declaracao_funcao":
-                if len(f.children) > 1:
-                    new_table = Table(tabela_raiz, nome=f.children[1].leaf)
-                    tabela_raiz.addFilho(new_table)
-                else:
-                    new_table = Table(tabela_raiz, nome=f.children[0].leaf)
-                    tabela_raiz.addFilho(new_table)
-
-                qtdParam = pegaQuantidadeParametrosFuncao(f)
-                # significa que tem argumentos pra por na tabela
-                if qtdParam > 0:
-                    percorreDeclaracaoFuncaoEAdicionaParametroNaTabela(f, new_table)
-
-                # se for menor que 1 significa que nao tem tipo a funcao então manda vazio
-                if len(f.children) > 1:
-                    if f.children[1].leaf == "principal":
-                        tabela_raiz.addLinha(f.children[1].leaf, f.children[0].leaf, '', '', '', '', qtdParam, True)
-                    else:
-                        tabela_raiz.addLinha(f.children[1].leaf, f.children[0].leaf, None, '', '', '', qtdParam, True)
-                else:
-                    if f.children[0].leaf == "principal":
-                        tabela_raiz.addLinha(f.children[0].leaf, "vazio", '', '', '', '', qtdParam, True),
-                    else:
-                        tabela_raiz.addLinha(f.children[0].leaf, "vazio", None, '', '', '', qtdParam, True),
-
-                temp = True
-            if f.type == "se":
-                new_table = Table(tabela, nome="se")
-                tabela.addFilho(new_table)
-                temp = True
-            if f.type == "repita":
-                new_table = Table(tabela, nome="repita")
-                tabela.addFilho(new_table)
-                temp = True
-
-            if f.type == "retorna":
-                if pegaFolhaComPaiVar(f):
-                    if not tabela.foiDeclaradoEmEscopoValido(pegaFolhaComPaiVar(f)):
-                        print("[ERRO]: Variavel '", pegaFolhaComPaiVar(f), "' nao foi declarada")
-                        semantic_error = True
-
-            if f.type == "chamada_funcao":
-                if tabela != None:
-                    if f.leaf == "principal":
-                        print("[AVISO]: Chamada recursiva para a função 'principal'")
-                    if not tabela.foiDeclaradoEmEscopoValido(f.leaf):
-                        print("[ERRO]: Chamada a função '", f.leaf, "' que não foi declarada")
-                        semantic_error = True
-
-                    if pegaQuantidadeParametrosChamadaFuncao(f) < pegaqtdParamNaTabelaByNome(f.leaf):
-                        print("[ERRO]: Chamada a função '", f.leaf, "' com número de parâmetros menor que o declarado")
-                        semantic_error = True
-                    # print(pegaQuantidadeParametrosChamadaFuncao(f))
-                    # print(pegaqtdParamNaTabelaByNome(f))
-                    # if pegaQuantidadeParametrosChamadaFuncao(f) > pegaqtdParamNaTabelaByNome(f.leaf):
-                        # print("[ERRO]: Chamada a função '", f.leaf, "' com número de parâmetros maior que o declarado")
-                        # semantic_error = True
-
-                    tabela.atualizafoiusada(f.leaf)
-
-            if f.type == "declaracao_variaveis":
-                pai = True
-                if root.type == "acao":
-                    insereVariavelNaTabela(f, tabela)
+# contexto: (tabela, pai, nó pai, em posição de expressão); tratadores como no entraRecomeco
+def entraReduzida(root, contexto, tratadores=TRATADORES_REDUZIDOS):
+    tabela, pai, no_pai, expressao = contexto
+    if expressao and root.type != "atribuicao":
+        return entraExpressaoReduzida(root, tabela, pai)
+    tratador = tratadores.get(root.type)
+    if tratador is None:
+        return []
+    return tratador(root, tabela, pai, no_pai)
+
+
+def entraExpressaoReduzida(root, tabela, pai):
+    global tabela_raiz
+    expressao = (tabela, pai, None, True)
+    if not isinstance(root.type, str):
+        return []
+    if root.type == "chamada_funcao":
+        if tabela != None:
+            if root.leaf == "principal":
+                diagnosticos.emite('chamada-recursiva-principal', "Chamada recursiva para a função 'principal'",
+                                   linha=root.linhaCodigo)
+            if not tabela.foiDeclaradoEmEscopoValido(root.leaf):
+                diagnosticos.emite('funcao-nao-declarada',
+                                   "Chamada a função '", root.leaf, "' que não foi declarada",
+                                   linha=root.linhaCodigo)
+
+            if pegaQuantidadeParametrosChamadaFuncao(root) < pegaQtdParamDaLinha(tabela.procura(root.leaf)):
+                diagnosticos.emite('parametros-a-menos',
+                                   "Chamada a função '", root.leaf, "' com número de parâmetros menor que o declarado",
+                                   linha=root.linhaCodigo)
+
+            tabela.atualizafoiusada(root.leaf)
+        return [(f, expressao) for f in root.children[0].children]
+    elif ehOperadorReduzido(root):
+        return [(f, expressao) for f in root.children]
+    else:
+        # var: leitura e inicialização ficam com o verificaFluxoDeDados
+        return [(f, expressao) for f in root.children]
+
+
+# equivalente ao pegaTipoDoRetornaIterativo: o primeiro retorna da função em largura (os de menor
+# aninhamento primeiro)
+@atributoMemorizado(dependeDosNomes=True)
+def pegaTipoDoRetornaReduzida(root):
+    for f in indice_arvore.retornas[id(root)]:
+        var = pegaNoFolhaComPaiVarReduzida(f.children[0])
+        if var is not None and var.type:
+            return var.linha.tipo if var.linha is not None else None
+        numero = pegaFolhaComPaiNumeroReduzida(f.children[0])
+        if isinstance(numero, int):
+            return "inteiro"
+        if isinstance(numero, float):
+            return "flutuante"
+
+
+def verificaTipoRetornaReduzida(root):
+    for f in nomesResolvidos(root, True).funcoes:
+        retorno = pegaTipoDoRetornaReduzida(f)
+        if len(f.children) > 1:
+            if f.children[0].leaf != retorno:
+                if retorno == None:
+                    diagnosticos.emite('tipo-retorno', "Função '", f.children[1].leaf, "' deveria retornar ",
+                                       f.children[0].leaf, ", mas retorna vazio", linha=f.linhaCodigo)
                 else:
-                    insereVariavelNaTabela(f, tabela_raiz)
-            pai2 = False
-
-            if f.type == "atribuicao":
-                if tabela != None:
-                    pai = True
-                    tabela.atualizafoiinic(f.children[0].leaf)
-                    # descomente esta linha para atribuiçao começar a contar como variavel utilizada
-                    # tabela.atualizafoiusada(f.children[0].leaf)
-
-                    # se for igual numero
-                    y = pegaLadoDireitoAtribuicao(f.children[1])
-                    # só funciona para alguns casos específicos (arrumar depois)
-                    # print(pegaLadoDireitoAtribuicao(f.children[1]))
-                    # if isinstance(y, str):
-                        # if f.children[0].leaf == y:
-                            # print("[AVISO]: Variavel '", y, "' declarada mas não inicializada.")
-                        # else:
-                            # x = tabela_raiz.verificaVariaveisNaoInicializadas(leaf=y)
-                    # print(x.__dict__)
-                    if (isinstance(pegaLadoDireitoAtribuicao(f.children[1]), (int, float))):
-                        if isinstance(pegaLadoDireitoAtribuicao(f.children[1]), int):
-                            if pegaTipoVarNome(pegaFolhaComPaiVar(f), tabela_raiz) != "inteiro":
-                                print("[AVISO]: Atribuição de tipos distintos '", pegaFolhaComPaiVar(f), "' ",
-                                      pegaTipoVarNome(pegaFolhaComPaiVar(f), tabela_raiz), "'",
-                                      pegaLadoDireitoAtribuicao(f.children[1]), "' inteiro")
-                        elif isinstance(pegaLadoDireitoAtribuicao(f.children[1]), float):
-                            if pegaTipoVarNome(pegaFolhaComPaiVar(f), tabela_raiz) != "flutuante":
-                                print("[AVISO]: Atribuição de tipos distintos '", pegaFolhaComPaiVar(f), "' ",
-                                      pegaTipoVarNome(pegaFolhaComPaiVar(f), tabela_raiz), "'",
-                                      pegaLadoDireitoAtribuicao(f.children[1]), "' flutuante")
-
-                    # senao se for igual variavel/func
-                    elif tabela.foiDeclaradoEmEscopoValido(pegaLadoDireitoAtribuicao(f.children[1])):
-                        if pegaTipoVarNome(pegaFolhaComPaiVar(f), tabela_raiz) != pegaTipoVarNome(
-                                pegaLadoDireitoAtribuicao(f.children[1]), tabela_raiz):
-                            print("[AVISO]: Atribuição de tipos distintos '",
-                                  pegaFolhaComPaiVar(f), "' ",
-                                  pegaTipoVarNome(pegaFolhaComPaiVar(f), tabela_raiz),
-                                  " e '", pegaLadoDireitoAtribuicao(f.children[1]),
-                                  "' ", pegaTipoVarNome(pegaLadoDireitoAtribuicao(f.children[1]), tabela_raiz))
-                        else:
-                            tabela.atualizafoiusada(pegaLadoDireitoAtribuicao(f.children[1]))
-
-                    elif not isinstance(pegaLadoDireitoAtribuicao(f.children[1]), (int, float, complex)):
-                        print("[ERRO]: Variavel '", pegaLadoDireitoAtribuicao(f.children[1]), "' não declarada")
-                        semantic_error = True
-                    if tabela.foiDeclaradoEmEscopoValido(f.children[0].leaf) != True:
-                        print("[ERRO]: Variavel", f.children[0].leaf, "nao foi declarada")
-                        semantic_error = True
+                    diagnosticos.emite('tipo-retorno', "Função '", f.children[1].leaf, "' deveria retornar ",
+                                       f.children[0].leaf, ", mas retorna ", retorno, linha=f.linhaCodigo)
+
+        elif retorno != None:
+            diagnosticos.emite('tipo-retorno',
+                               "Função '", f.children[0].leaf, "' deveria retornar vazio, mas retorna", retorno,
+                               linha=f.linhaCodigo)
+
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~ RESOLUÇÃO DE NOMES ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+# com as tabelas completas, liga cada var, chamada_funcao e parametro da árvore (no.linha) à Linha
+# do escopo mais interno que declara o nome (None quando o nome não foi declarado); as verificações
+# que rodam depois da análise e o KodoGen leem a ligação em vez de procurar o nome nas tabelas.
+# Os escopos são refeitos na ordem em que o recomeco/recomecoReduzida criaram as tabelas (cada
+# declaracao_funcao pega a próxima filha da tabela global, cada se/repita a próxima filha da tabela
+# atual), então a mesma passada serve para a árvore do arv_reduzida e para a que vem do cache
+
+def resolveNomes(raiz, reduzida, tabelas=None):
+    tabelas = tabelas if tabelas is not None else tabela_raiz
+    indice = indiceDe(raiz)
+    filhas = {}
+
+    def proximaTabela(tabela):
+        restantes = filhas.get(id(tabela))
+        if restantes is None:
+            restantes = filhas[id(tabela)] = iter(tabela.filhos)
+        return next(restantes, tabela)
+
+    # árvore concreta: o contexto é a tabela do escopo
+    def entraConcreta(no, tabela):
+        tipo = no.type
+        if tipo == "declaracao_funcao":
+            return proximaTabela(tabelas)
+        if tipo == "se" or tipo == "repita":
+            return proximaTabela(tabela)
+        if tipo == "var" or tipo == "chamada_funcao" or tipo == "parametro":
+            no.linha = tabela.procura(no.leaf) if no.leaf is not None else None
+        return tabela
+
+    # árvore reduzida: o contexto é (tabela, em posição de expressão), como no recomecoReduzida
+    def entraReduzida(no, contexto):
+        tabela, expressao = contexto
+        tipo = no.type
+        if expressao and tipo != "atribuicao":
+            if not isinstance(tipo, str):
+                return []
+            if tipo == "chamada_funcao":
+                no.linha = tabela.procura(no.leaf)
+                return [(f, contexto) for f in no.children[0].children]
+            if not ehOperadorReduzido(no):
+                no.linha = tabela.procura(tipo)  # var
+            return [(f, contexto) for f in no.children]
+        if tipo == "programa" or tipo == "lista_declaracoes":
+            return [(f, contexto) for f in no.children]
+        if tipo == "declaracao_funcao":
+            escopo = proximaTabela(tabelas)
+            for parametro in indice.parametros[id(no)]:
+                parametro.linha = escopo.procura(parametro.leaf) if parametro.leaf is not None else None
+            return [(no.children[-1].children[1], (escopo, False))]
+        if tipo == "corpo":
+            return [(f, (tabela, f is not None and f.type not in COMANDOS_REDUZIDOS)) for f in no.children]
+        if tipo == "se":
+            escopo = proximaTabela(tabela)
+            return [(no.children[0].children[0], (escopo, True))] + [(corpo, (escopo, False))
+                                                                      for corpo in no.children[1:]]
+        if tipo == "repita":
+            escopo = proximaTabela(tabela)
+            return [(no.children[0], (escopo, False)), (no.children[1].children[0], (escopo, True))]
+        if tipo == "declaracao_variaveis":
+            pares = []
+            for var in no.children[1].children:
+                if var is not None:
+                    var.linha = tabela.procura(var.type)
+                    pares.extend((indice_var, (tabela, True)) for indice_var in var.children)
+            return pares
+        if tipo in COMANDOS_REDUZIDOS:  # atribuicao, leia, escreva, retorna
+            return [(f, (tabela, True)) for f in no.children]
+        return []
+
+    if reduzida:
+        percorreArvore(raiz, entraReduzida, contexto=(tabelas, False), filhos=filhosEscolhidos)
+    else:
+        percorreArvore(raiz, entraConcreta, contexto=tabelas)
+    indice.tabelas = tabelas
+    for nome in ATRIBUTOS_DOS_NOMES:
+        indice.atributos.pop(nome, None)
+    return indice
+
+
+# índice da árvore com os nomes já resolvidos com a tabela global atual
+def nomesResolvidos(raiz, reduzida):
+    indice = indiceDe(raiz)
+    if indice.tabelas is not tabela_raiz:
+        indice = resolveNomes(raiz, reduzida)
+    return indice
+
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~ TIPAGEM DAS EXPRESSÕES ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+# na árvore reduzida com os nomes resolvidos, dá um tipo da linguagem a cada nó de expressão, de
+# baixo para cima: 'inteiro', 'flutuante', 'logico' (resultado das comparações, i1 no LLVM) ou um
+# vetor 'inteiro[10]' / 'flutuante[10]' (var sem índice); None quando não há tipo (função vazia,
+# nome sem declaração). Também marca os nós cujo valor precisa de conversão, com a instrução e o
+# tipo de destino, do jeito que o KodoGen sempre converteu: o operando inteiro de uma operação com
+# um flutuante, o argumento que não bate com o parâmetro e o lado direito da atribuição que não
+# bate com a variável. O KodoGen emite direto a partir daqui, sem comparar tipos do LLVM.
+# A var tem o tipo da declaração que o KodoGen já gerou (percorrendo na ordem do programa): a da
+# Linha ligada pelo resolveNomes e, antes dela, a global e depois a local com o mesmo nome
+
+ATRIBUTOS_DOS_NOMES.update(('tipoExpressao', 'conversaoExpressao'))
+
+
+def tipoBase(tipo):
+    return tipo.partition('[')[0] if tipo else tipo
+
+
+def tipoVetor(tipo, var):
+    tamanho = var.children[0].type
+    if isinstance(tamanho, (int, float)):
+        return '%s[%d]' % (tipo, int(tamanho))
+    return tipo + '[]'
+
+
+def anotaTipos(raiz):
+    indice = nomesResolvidos(raiz, True)
+    if 'tipoExpressao' in indice.atributos:
+        return indice
+    tipos = indice.atributos['tipoExpressao'] = {}
+    conversoes = indice.atributos['conversaoExpressao'] = {}
+    declarados = {}  # Linha -> tipo
+    globais = {}  # nome -> tipo, como o global_var e o local_var do KodoGen
+    locais = {}
+    funcoes = {}  # nome -> declaracao_funcao mais recente
+
+    def declara(var, nome, tipo, porNome):
+        porNome[nome] = tipo
+        if var.linha is not None:
+            declarados[var.linha] = tipo
+
+    # na mesma ordem em que o trataVarGlob e o declaracaoVar criam os endereços
+    def declaraVariaveis(no, escopo_global):
+        tipo = no.children[0].leaf
+        if tipo != "inteiro" and tipo != "flutuante":
+            return
+        variaveis = [var for var in no.children[1].children if var is not None]
+        vetores = [var for var in variaveis if var.children]
+        if escopo_global:
+            # o trataVarGlob só cria as escalares quando a última variável da lista é escalar
+            if variaveis and not variaveis[-1].children:
+                for var in variaveis:
+                    declara(var, var.type, tipo, globais)
+            for var in vetores:
+                declara(var, var.type, tipoVetor(tipo, var), globais)
+        else:
+            for var in vetores:
+                declara(var, var.type, tipoVetor(tipo, var), locais)
+            for var in variaveis:
+                if not var.children:
+                    declara(var, var.type, tipo, locais)
+
+    def tipoDaVar(var):
+        tipo = declarados.get(var.linha) if var.linha is not None else None
+        if tipo is None:
+            tipo = globais.get(var.type, locais.get(var.type))
+        return tipo
+
+    def tipoDaExpressao(no):
+        tipo = no.type
+        if tipo == "chamada_funcao":
+            declaracao = funcoes.get(no.leaf)
+            if declaracao is None:
+                return None
+            for argumento, parametro in zip(no.children[0].children, indice.parametros[id(declaracao)]):
+                tipo_parametro = parametro.children[0].leaf
+                if tipos.get(argumento) != tipo_parametro:
+                    conversoes[argumento] = (('uitofp', 'flutuante') if tipo_parametro == "flutuante"
+                                             else ('fptoui', 'inteiro'))
+            return declaracao.children[0].leaf if len(declaracao.children) == 2 else None
+        if isinstance(tipo, int):
+            return "inteiro"
+        if isinstance(tipo, float):
+            return "flutuante"
+        if ehOperadorReduzido(no):
+            if len(no.children) == 1:
+                return tipos.get(no.children[0])
+            esquerda, direita = no.children
+            tipo_esquerda, tipo_direita = tipos.get(esquerda), tipos.get(direita)
+            comum = tipo_esquerda
+            if tipo_esquerda != tipo_direita:
+                if tipo_esquerda == "flutuante":
+                    conversoes[direita] = ('uitofp', tipo_esquerda)
                 else:
-                    print("[ERRO]: Variavel", f.children[0].leaf, "nao foi declarada")
-                    semantic_error = True
-
-            if temp:
-                recomeco(f, new_table, pai=pai)
-            else:
-                recomeco(f, tabela, pai=pai)
+                    conversoes[esquerda] = ('uitofp', tipo_direita)
+                    comum = tipo_direita
+            return "logico" if tipo in COMPARACOES_LLVM else comum
+        # var: com índice é um elemento do vetor
+        tipo = tipoDaVar(no)
+        return tipoBase(tipo) if no.children else tipo
+
+    # contexto: (em posição de expressão, no escopo global), como no resolveNomes
+    def entra(no, contexto):
+        expressao, escopo_global = contexto
+        tipo = no.type
+        if expressao and tipo != "atribuicao":
+            if not isinstance(tipo, str):
+                return []
+            if tipo == "chamada_funcao":
+                return [(f, contexto) for f in no.children[0].children]
+            return [(f, contexto) for f in no.children]
+        if tipo == "programa" or tipo == "lista_declaracoes":
+            return [(f, (False, True)) for f in no.children]
+        if tipo == "declaracao_funcao":
+            funcoes[no.children[-1].leaf] = no
+            for parametro in indice.parametros[id(no)]:
+                declara(parametro, parametro.leaf, parametro.children[0].leaf, locais)
+            return [(no.children[-1].children[1], (False, False))]
+        if tipo == "corpo":
+            return [(f, (f is not None and f.type not in COMANDOS_REDUZIDOS, False)) for f in no.children]
+        if tipo == "se":
+            return [(no.children[0].children[0], (True, False))] + [(corpo, (False, False))
+                                                                    for corpo in no.children[1:]]
+        if tipo == "repita":
+            return [(no.children[0], (False, False)), (no.children[1].children[0], (True, False))]
+        if tipo == "declaracao_variaveis":
+            declaraVariaveis(no, escopo_global)
+            return [(indice_var, (True, escopo_global))
+                    for var in no.children[1].children if var is not None for indice_var in var.children]
+        if tipo in COMANDOS_REDUZIDOS:  # atribuicao, leia, escreva, retorna
+            return [(f, (True, escopo_global)) for f in no.children]
+        return []
+
+    def sai(no, contexto):
+        if no.type == "atribuicao":
+            # o endereço é o da var (o vetor inteiro quando ela tem índice)
+            alvo = tipoDaVar(no.children[0])
+            valor = tipos.get(no.children[1])
+            if alvo is not None and valor != alvo and valor != tipoBase(alvo):
+                conversoes[no.children[1]] = ('fptoui', 'inteiro') if alvo == "inteiro" else ('uitofp', 'flutuante')
+        elif contexto[0]:
+            tipos[no] = tipoDaExpressao(no)
+
+    percorreArvore(raiz, entra, sai, contexto=(False, True), filhos=filhosEscolhidos)
+    return indice
+
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~ FLUXO DE DADOS ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+# grafo de fluxo de controle do corpo de cada função (árvore reduzida com os nomes resolvidos) e um
+# resolvedor de fluxo de dados sobre conjuntos de bits (um int do Python: união é |, retirar é & ~),
+# com duas análises em cima dele: definições que chegam (aviso de variável não inicializada) e
+# variáveis vivas (aviso de variável não utilizada).
+# Cada bloco tem os passos em ordem; um passo é um comando (ou a condição de um se/repita) com as
+# vars que ele lê (usos) e as que ele escreve (definicoes: pares (var, parcial), parcial quando só
+# um elemento do vetor é escrito). O se fecha o bloco da condição, abre um bloco para o então e
+# outro para o senão e junta os dois num bloco novo; o repita abre o bloco do corpo e o bloco onde
+# o corpo termina recebe a condição, volta para o começo do corpo e segue para um bloco novo; o
+# retorna liga o bloco à saída e o que vem depois dele cai num bloco sem predecessores.
+# As variáveis (linhas das declarações e dos parâmetros, variaveisDoPrograma) ganham um bit por
+# função, na ordem em que aparecem nela. O grafo fica memorizado no índice (grafoDaFuncao) para os
+# passes que vierem depois usarem o mesmo grafo e as mesmas análises.
+
+class PassoFluxo():
+    __slots__ = ('no', 'usos', 'definicoes')
+
+    def __init__(self, no, usos, definicoes=()):
+        self.no = no
+        self.usos = usos
+        self.definicoes = definicoes
+
+
+class BlocoFluxo():
+    __slots__ = ('indice', 'passos', 'sucessores', 'predecessores')
+
+    def __init__(self, indice):
+        self.indice = indice
+        self.passos = []
+        self.sucessores = []
+        self.predecessores = []
+
+
+class GrafoFluxo():
+    __slots__ = ('funcao', 'blocos', 'entrada', 'saida', 'variaveis', 'bits', 'parametros')
+
+    def __init__(self, funcao):
+        self.funcao = funcao
+        self.blocos = []
+        self.variaveis = []  # Linha de cada bit
+        self.bits = {}  # Linha -> bit
+        self.parametros = []
+        self.entrada = self.novoBloco()
+        self.saida = None
+
+    def novoBloco(self):
+        bloco = BlocoFluxo(len(self.blocos))
+        self.blocos.append(bloco)
+        return bloco
+
+    def liga(self, origem, destino):
+        origem.sucessores.append(destino.indice)
+        destino.predecessores.append(origem.indice)
+
+    def bit(self, linha):
+        bit = self.bits.get(linha)
+        if bit is None:
+            bit = self.bits[linha] = len(self.variaveis)
+            self.variaveis.append(linha)
+        return bit
+
+    # conjunto com o bit de cada linha
+    def mascara(self, linhas):
+        mascara = 0
+        for linha in linhas:
+            bit = self.bits.get(linha)
+            if bit is not None:
+                mascara |= 1 << bit
+        return mascara
+
+    def linhas(self, mascara):
+        return [linha for bit, linha in enumerate(self.variaveis) if mascara >> bit & 1]
+
+    # blocos alcançáveis a partir da entrada, na ordem em que foram criados (a do fonte)
+    def alcancaveis(self):
+        vistos = [False] * len(self.blocos)
+        vistos[self.entrada.indice] = True
+        pilha = [self.entrada.indice]
+        while pilha:
+            for sucessor in self.blocos[pilha.pop()].sucessores:
+                if not vistos[sucessor]:
+                    vistos[sucessor] = True
+                    pilha.append(sucessor)
+        return [bloco for bloco in self.blocos if vistos[bloco.indice]]
+
+
+# linhas das variáveis declaradas e dos parâmetros do programa
+@atributoMemorizado(dependeDosNomes=True)
+def variaveisDoPrograma(raiz):
+    indice = nomesResolvidos(raiz, True)
+    variaveis = set()
+    for declaracao in indice.porTipo.get("declaracao_variaveis", ()):
+        for var in declaracao.children[1].children:
+            if var is not None and var.linha is not None:
+                variaveis.add(var.linha)
+    for parametros in indice.parametros.values():
+        variaveis.update(parametro.linha for parametro in parametros if parametro.linha is not None)
+    return variaveis
+
+
+# vars lidas pela expressão, em pré-ordem (inclusive as dos índices)
+def varsLidas(raiz, variaveis):
+    lidas = []
+    pilha = [raiz]
+    while pilha:
+        no = pilha.pop()
+        if no is None or not isinstance(no.type, str):
+            continue
+        if no.type == "chamada_funcao":
+            pilha.extend(reversed(no.children[0].children))
+            continue
+        if not ehOperadorReduzido(no) and no.linha in variaveis:
+            lidas.append(no)
+        pilha.extend(reversed(no.children))
+    return lidas
+
+
+@atributoMemorizado(dependeDosNomes=True)
+def grafoDaFuncao(funcao):
+    indice = nomesResolvidos(indice_arvore.raiz, True)
+    variaveis = variaveisDoPrograma(indice.raiz)
+    grafo = GrafoFluxo(funcao)
+    for parametro in indice.parametros[id(funcao)]:
+        if parametro.linha in variaveis:
+            grafo.parametros.append(parametro.linha)
+            grafo.bit(parametro.linha)
+    atual = grafo.entrada
+    retornos = []
+    abertos = {}  # id do se -> [bloco da condição, fim do então]; id do repita -> começo do corpo
+
+    def passo(no, usos, definicoes=()):
+        for var in usos:
+            grafo.bit(var.linha)
+        for var, _ in definicoes:
+            grafo.bit(var.linha)
+        atual.passos.append(PassoFluxo(no, usos, definicoes))
+
+    def escrita(var):
+        usos = []
+        for indice_var in var.children:
+            usos.extend(varsLidas(indice_var, variaveis))
+        definicoes = ((var, bool(var.children)),) if var.linha in variaveis else ()
+        return usos, definicoes
+
+    # contexto: o se, no corpo do senão; None nos outros
+    def entra(no, contexto):
+        nonlocal atual
+        tipo = no.type
+        if tipo == "corpo":
+            if contexto is not None:
+                aberto = abertos[id(contexto)]
+                aberto[1] = atual
+                atual = grafo.novoBloco()
+                grafo.liga(aberto[0], atual)
+            return [(f, None) for f in no.children]
+        if tipo == "se":
+            passo(no, varsLidas(no.children[0].children[0], variaveis))
+            abertos[id(no)] = [atual, None]
+            entao = grafo.novoBloco()
+            grafo.liga(atual, entao)
+            atual = entao
+            return [(no.children[1], None)] + [(corpo, no) for corpo in no.children[2:]]
+        if tipo == "repita":
+            corpo = grafo.novoBloco()
+            grafo.liga(atual, corpo)
+            atual = abertos[id(no)] = corpo
+            return [(no.children[0], None)]
+        if tipo == "declaracao_variaveis":
+            usos = []
+            for var in no.children[1].children:
+                if var is not None:
+                    if var.linha in variaveis:
+                        grafo.bit(var.linha)
+                    for indice_var in var.children:
+                        usos.extend(varsLidas(indice_var, variaveis))
+            if usos:
+                passo(no, usos)
+        elif tipo == "atribuicao":
+            usos, definicoes = escrita(no.children[0])
+            passo(no, varsLidas(no.children[1], variaveis) + usos, definicoes)
+        elif tipo == "leia":
+            passo(no, *escrita(no.children[0]))
+        elif tipo == "retorna":
+            passo(no, varsLidas(no.children[0], variaveis))
+            retornos.append(atual)
+            atual = grafo.novoBloco()
+        else:  # escreva e expressões soltas no corpo
+            passo(no, varsLidas(no.children[0] if tipo == "escreva" else no, variaveis))
+        return []
+
+    def sai(no, contexto):
+        nonlocal atual
+        if no.type == "se":
+            condicao, fim_entao = abertos.pop(id(no))
+            juncao = grafo.novoBloco()
+            grafo.liga(fim_entao if fim_entao is not None else condicao, juncao)
+            grafo.liga(atual, juncao)
+            atual = juncao
+        elif no.type == "repita":
+            corpo = abertos.pop(id(no))
+            passo(no, varsLidas(no.children[1].children[0], variaveis))
+            fim = grafo.novoBloco()
+            grafo.liga(atual, corpo)
+            grafo.liga(atual, fim)
+            atual = fim
+
+    percorreArvore(funcao.children[-1].children[1], entra, sai, filhos=filhosEscolhidos)
+    grafo.saida = grafo.novoBloco()
+    for bloco in retornos + [atual]:
+        grafo.liga(bloco, grafo.saida)
+    return grafo
+
+
+# resolve um problema de fluxo de dados de união (para a frente ou para trás) por lista de trabalho.
+# geram e matam: conjuntos de cada bloco; inicial: o que vale na entrada (ou, para trás, na saída).
+# Devolve os conjuntos no começo e no fim de cada bloco
+def resolveFluxo(grafo, geram, matam, paraTras=False, inicial=0):
+    blocos = grafo.blocos
+    antes = [0] * len(blocos)
+    depois = [0] * len(blocos)
+    if paraTras:
+        borda = grafo.saida.indice
+        pendentes = collections.deque(range(len(blocos) - 1, -1, -1))
+    else:
+        borda = grafo.entrada.indice
+        pendentes = collections.deque(range(len(blocos)))
+    na_fila = [True] * len(blocos)
+    while pendentes:
+        b = pendentes.popleft()
+        na_fila[b] = False
+        bloco = blocos[b]
+        chegam = inicial if b == borda else 0
+        if paraTras:
+            for s in bloco.sucessores:
+                chegam |= antes[s]
+            depois[b] = chegam
+            novo = geram[b] | (chegam & ~matam[b])
+            if novo == antes[b]:
+                continue
+            antes[b] = novo
+            proximos = bloco.predecessores
+        else:
+            for p in bloco.predecessores:
+                chegam |= depois[p]
+            antes[b] = chegam
+            novo = geram[b] | (chegam & ~matam[b])
+            if novo == depois[b]:
+                continue
+            depois[b] = novo
+            proximos = bloco.sucessores
+        for proximo in proximos:
+            if not na_fila[proximo]:
+                na_fila[proximo] = True
+                pendentes.append(proximo)
+    return antes, depois
+
+
+class DefinicoesQueChegam():
+    # cada escrita de um passo é uma definição (um bit), e cada variável fora de definidas (bits das
+    # variáveis que já têm valor na entrada da função) ganha uma definição 'indefinida' na entrada.
+    # A escrita inteira mata as outras definições da variável; a de um elemento do vetor só mata a
+    # indefinida (o vetor passa a ter valor, os outros elementos continuam com os de antes)
+    __slots__ = ('grafo', 'definicoes', 'escritas', 'daVariavel', 'indefinidas', 'antes', 'depois')
+
+    def __init__(self, grafo, definidas=0):
+        self.grafo = grafo
+        self.definicoes = []  # (passo, ou None na entrada, e bit da variável) de cada definição
+        self.escritas = {}  # id do passo -> [(definição, bit da variável, parcial)]
+        self.daVariavel = [0] * len(grafo.variaveis)
+        self.indefinidas = [0] * len(grafo.variaveis)
+        inicial = 0
+        for bit in range(len(grafo.variaveis)):
+            if not definidas >> bit & 1:
+                self.indefinidas[bit] = self.daVariavel[bit] = 1 << len(self.definicoes)
+                self.definicoes.append((None, bit))
+                inicial |= self.indefinidas[bit]
+        for bloco in grafo.blocos:
+            for passo in bloco.passos:
+                if passo.definicoes:
+                    escritas = self.escritas[id(passo)] = []
+                    for var, parcial in passo.definicoes:
+                        bit = grafo.bits[var.linha]
+                        definicao = 1 << len(self.definicoes)
+                        self.definicoes.append((passo, bit))
+                        self.daVariavel[bit] |= definicao
+                        escritas.append((definicao, bit, parcial))
+
+        geram = []
+        matam = []
+        for bloco in grafo.blocos:
+            gera = mata = 0
+            for passo in bloco.passos:
+                for definicao, bit, parcial in self.escritas.get(id(passo), ()):
+                    morrem = self.indefinidas[bit] if parcial else self.daVariavel[bit]
+                    gera = definicao | (gera & ~morrem)
+                    mata |= morrem
+            geram.append(gera)
+            matam.append(mata)
+        self.antes, self.depois = resolveFluxo(grafo, geram, matam, inicial=inicial)
+
+    # definições que chegam depois do passo, dadas as que chegam antes dele
+    def aplica(self, passo, chegam):
+        for definicao, bit, parcial in self.escritas.get(id(passo), ()):
+            chegam = definicao | (chegam & ~(self.indefinidas[bit] if parcial else self.daVariavel[bit]))
+        return chegam
+
+    # (passo, definições que chegam antes dele), na ordem do bloco
+    def percorre(self, bloco):
+        chegam = self.antes[bloco.indice]
+        for passo in bloco.passos:
+            yield passo, chegam
+            chegam = self.aplica(passo, chegam)
+
+    # a variável pode estar sem valor quando chegam essas definições
+    def podeEstarIndefinida(self, chegam, linha):
+        return bool(chegam & self.indefinidas[self.grafo.bits[linha]])
+
+
+class VariaveisVivas():
+    # variável viva num ponto: lida em algum caminho dali em diante antes de ser escrita inteira (a
+    # escrita de um elemento do vetor não mata). vivasNaSaida: as que continuam vivas depois da função
+    # (as globais, para quem olha o programa todo; nenhuma, para quem só quer as leituras da função)
+    __slots__ = ('grafo', 'usos', 'mortes', 'antes', 'depois')
+
+    def __init__(self, grafo, vivasNaSaida=0):
+        self.grafo = grafo
+        bits = grafo.bits
+        self.usos = {}  # id do passo -> bits lidos
+        self.mortes = {}  # id do passo -> bits escritos inteiros
+        geram = []
+        matam = []
+        for bloco in grafo.blocos:
+            for passo in bloco.passos:
+                usos = mortes = 0
+                for var in passo.usos:
+                    usos |= 1 << bits[var.linha]
+                for var, parcial in passo.definicoes:
+                    if not parcial:
+                        mortes |= 1 << bits[var.linha]
+                self.usos[id(passo)] = usos
+                self.mortes[id(passo)] = mortes
+            gera = mata = 0
+            for passo in reversed(bloco.passos):
+                gera = self.usos[id(passo)] | (gera & ~self.mortes[id(passo)])
+                mata |= self.mortes[id(passo)]
+            geram.append(gera)
+            matam.append(mata)
+        self.antes, self.depois = resolveFluxo(grafo, geram, matam, paraTras=True, inicial=vivasNaSaida)
+
+    # vivas antes do passo, dadas as vivas depois dele
+    def aplica(self, passo, vivas):
+        return self.usos[id(passo)] | (vivas & ~self.mortes[id(passo)])
+
+    # (passo, vivas depois dele), do último passo do bloco para o primeiro
+    def percorre(self, bloco):
+        vivas = self.depois[bloco.indice]
+        for passo in reversed(bloco.passos):
+            yield passo, vivas
+            vivas = self.aplica(passo, vivas)
+
+    # bits das variáveis vivas em algum ponto dos blocos
+    def vivasEm(self, blocos):
+        todas = 0
+        for bloco in blocos:
+            todas |= self.antes[bloco.indice]
+            for passo, vivas in self.percorre(bloco):
+                todas |= self.aplica(passo, vivas)
+        return todas
+
+
+# avisos de variável não inicializada e não utilizada, depois da análise semântica. Não inicializada:
+# a cada leitura alcançável de uma variável em que pode chegar a definição indefinida dela. Os
+# parâmetros têm valor na entrada da função; uma global tem valor na entrada de qualquer função se é
+# escrita em alguma função do programa (a análise não segue as chamadas). Não utilizada: variável que
+# não está viva em nenhum ponto alcançável de nenhuma função (nenhuma leitura). O foiInic e o foiusada
+# das linhas das variáveis ficam com o resultado, para a exibição das tabelas
+def verificaFluxoDeDados(raiz):
+    indice = nomesResolvidos(raiz, True)
+    variaveis = variaveisDoPrograma(raiz)
+    globais = indice.tabelas.linhas
+    grafos = [grafoDaFuncao(f) for f in indice.funcoes]
+    escritas = set()
+    for grafo in grafos:
+        escritas.update(grafo.parametros)
+        for bloco in grafo.blocos:
+            for passo in bloco.passos:
+                escritas.update(var.linha for var, _ in passo.definicoes)
+    iniciadas = [linha for linha in globais if linha in escritas]
+
+    usadas = set()
+    for grafo in grafos:
+        alcancaveis = grafo.alcancaveis()
+        chegam = DefinicoesQueChegam(grafo, grafo.mascara(grafo.parametros) | grafo.mascara(iniciadas))
+        for bloco in alcancaveis:
+            for passo, antes in chegam.percorre(bloco):
+                for var in passo.usos:
+                    if chegam.podeEstarIndefinida(antes, var.linha):
+                        diagnosticos.emite('variavel-nao-inicializada',
+                                           "Variavel '", var.linha.nome, "' declarada mas não inicializada.",
+                                           linha=getattr(var, 'linhaCodigo', None))
+        usadas.update(grafo.linhas(VariaveisVivas(grafo).vivasEm(alcancaveis)))
+
+    for linha in variaveis:
+        linha.foiInic = True if linha in escritas else None
+        linha.foiusada = True if linha in usadas else None
+    indice.tabelas.verificaVariaveisNaoUtilizadas(variaveis=variaveis, usadas=usadas)
+
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~ CACHE DA ÁRVORE E DAS TABELAS ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+# com --cache-ast o resultado da análise (árvore reduzida, tabelas a partir da tabela_raiz, diagnósticos
+# e erros léxicos) fica salvo em disco, com chave no hash do fonte e na versão do
+# compilador. Um arquivo que não mudou pula léxico, sintático e semântico.
+# Formato: MAGICA_CACHE_ARVORE, versão do formato ('<H') e um marshal comprimido com zlib com a árvore
+# e as tabelas achatadas em pré-ordem (listas de type, leaf e quantidade de filhos), o que carrega
+# sem recursão. A árvore se repete muito, então o zlib (nível 1) deixa a entrada umas 30x menor.
+# O diretório é um LRU: cada acerto atualiza o mtime do arquivo e, depois de gravar, os mais antigos
+# são apagados até o total ficar abaixo do limite.
+
+MAGICA_CACHE_ARVORE = b'TPPAST'
+FORMATO_CACHE_ARVORE = 2
+LIMITE_CACHE_ARVORE_PADRAO = 64  # MB
+
+
+# muda sempre que o compilador (ou o nani, que faz a redução) muda
+def versaoCompilador():
+    h = hashlib.sha256()
+    for modulo in (sys.modules[__name__], sys.modules[arv_reduzida.__module__]):
+        with open(modulo.__file__, 'rb') as arquivo:
+            h.update(arquivo.read())
+    return h.hexdigest()[:20]
+
+
+def chaveCacheArvore(fonte, reducao_direta):
+    h = hashlib.sha256()
+    h.update(('%s:%d:%s:%d\n' % (versaoCompilador(), FORMATO_CACHE_ARVORE, sys.version,
+                                  bool(reducao_direta))).encode('utf-8'))
+    h.update(fonte)
+    return h.hexdigest()[:32]
+
+
+def serializaArvore(raiz):
+    tipos, folhas, filhos = [], [], []
+    pilha = [raiz]
+    while pilha:
+        no = pilha.pop()
+        if no is None:
+            tipos.append(None)
+            folhas.append(None)
+            filhos.append(-1)
+            continue
+        tipos.append(no.type)
+        folhas.append(no.leaf)
+        filhos.append(len(no.children))
+        pilha.extend(reversed(no.children))
+    return tipos, folhas, filhos
+
+
+def desserializaArvore(tipos, folhas, filhos):
+    raiz = None
+    pendentes = []  # [nó, filhos que ainda faltam]
+    for tipo, folha, quantidade in zip(tipos, folhas, filhos):
+        no = None if quantidade < 0 else Tree(tipo, [], folha)
+        if pendentes:
+            topo = pendentes[-1]
+            topo[0].children.append(no)
+            topo[1] -= 1
+            if topo[1] == 0:
+                pendentes.pop()
+        else:
+            raiz = no
+        if quantidade > 0:
+            pendentes.append([no, quantidade])
+    return raiz
+
+
+CAMPOS_LINHA = ('nome', 'tipo', 'foiusada', 'tamanho1d', 'tamanho2d', 'linhaCodigo', 'qtdParam', 'ehFunc',
+                'foiInic', 'valor')
+
+
+def serializaTabelas(raiz):
+    tabelas = []
+    pilha = [raiz]
+    while pilha:
+        tabela = pilha.pop()
+        linhas = tuple(tuple(getattr(linha, campo) for campo in CAMPOS_LINHA) for linha in tabela.linhas)
+        tabelas.append((tabela.nome, len(tabela.filhos), linhas))
+        pilha.extend(reversed(tabela.filhos))
+    return tabelas
+
+
+# pai: tabela de fora da raiz (a raiz não é incluída nos filhos dela)
+def desserializaTabelas(tabelas, pai_raiz=None):
+    raiz = None
+    pendentes = []
+    for nome, quantidade, linhas in tabelas:
+        pai = pendentes[-1][0] if pendentes else pai_raiz
+        tabela = Table(pai, nome=nome)
+        for campos in linhas:
+            tabela.addLinha(*campos)
+        if pendentes:
+            pai.addFilho(tabela)
+            pendentes[-1][1] -= 1
+            if pendentes[-1][1] == 0:
+                pendentes.pop()
+        else:
+            raiz = tabela
+        if quantidade > 0:
+            pendentes.append([tabela, quantidade])
+    return raiz
+
+
+def carregaCacheArvore(diretorio, chave):
+    caminho = os.path.join(diretorio, chave + '.ast')
+    try:
+        with open(caminho, 'rb') as arquivo:
+            conteudo = arquivo.read()
+    except OSError:
+        return None
+    cabecalho = len(MAGICA_CACHE_ARVORE) + 2
+    if conteudo[:len(MAGICA_CACHE_ARVORE)] != MAGICA_CACHE_ARVORE or \
+            struct.unpack_from('<H', conteudo, len(MAGICA_CACHE_ARVORE))[0] != FORMATO_CACHE_ARVORE:
+        return None
+    try:
+        (tipos, folhas, filhos, tabelas, lista_diagnosticos, caracteres_invalidos, abre_chaves,
+         fecha_chaves) = marshal.loads(zlib.decompress(conteudo[cabecalho:]))
+    except (EOFError, ValueError, TypeError, zlib.error):
+        return None
+    os.utime(caminho)  # marca como usado agora (LRU)
+    # como no ParserDescendente: só cria objetos novos, o coletor cíclico só atrasaria a carga
+    coletor_ligado = gc.isenabled()
+    gc.disable()
+    try:
+        arvore = desserializaArvore(tipos, folhas, filhos)
+        tabela = desserializaTabelas(tabelas)
+    finally:
+        if coletor_ligado:
+            gc.enable()
+    return {
+        'arvore': arvore,
+        'tabelas': tabela,
+        'diagnosticos': lista_diagnosticos,
+        'caracteres_invalidos': list(caracteres_invalidos),
+        'abre_chaves_linha': list(abre_chaves),
+        'fecha_chaves_solo': list(fecha_chaves),
+    }
+
+
+def salvaCacheArvore(diretorio, chave, arvore, tabela, coletor, limite=LIMITE_CACHE_ARVORE_PADRAO):
+    os.makedirs(diretorio, exist_ok=True)
+    conteudo = marshal.dumps(serializaArvore(arvore) + (
+        serializaTabelas(tabela), coletor.serializa(), tuple(CARACTERES_INVALIDOS),
+        tuple(ABRE_CHAVES_LINHA), tuple(FECHA_CHAVES_SOLO)))
+    descritor, temporario = tempfile.mkstemp(dir=diretorio, suffix='.tmp')
+    with os.fdopen(descritor, 'wb') as arquivo:
+        arquivo.write(MAGICA_CACHE_ARVORE + struct.pack('<H', FORMATO_CACHE_ARVORE) + zlib.compress(conteudo, 1))
+    os.replace(temporario, os.path.join(diretorio, chave + '.ast'))
+    podaCacheArvores(diretorio, limite)
+
+
+# apaga as entradas usadas há mais tempo até o diretório caber no limite (em MB)
+def podaCacheArvores(diretorio, limite):
+    entradas = []
+    total = 0
+    for nome in os.listdir(diretorio):
+        if nome.endswith('.ast'):
+            caminho = os.path.join(diretorio, nome)
+            try:
+                info = os.stat(caminho)
+            except OSError:
+                continue
+            entradas.append((info.st_mtime, info.st_size, caminho))
+            total += info.st_size
+    entradas.sort()
+    limite_bytes = limite * 1024 * 1024
+    for _, tamanho, caminho in entradas:
+        if total <= limite_bytes:
+            break
+        try:
+            os.remove(caminho)
+        except OSError:
+            continue
+        total -= tamanho
+
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~ ANÁLISE SEMÂNTICA PARALELA ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+# com --semantico-paralelo os corpos das funções são verificados em processos separados, com o mesmo
+# resultado do recomeco/recomecoReduzida (mesmas tabelas e mesmos diagnósticos, na mesma ordem):
+#   1. o percurso roda num estado descartável pulando os corpos: monta as linhas da tabela global
+#      (variáveis globais e a linha de cada função) e guarda, para cada função, quantas linhas globais
+#      existiam quando ela começou e o contexto do percurso nela;
+#   2. os processos (fork: já têm a árvore e o índice) verificam fatias de funções consecutivas, cada
+#      função com uma tabela global só com as linhas que ela enxergava. Um corpo só lê e muda linhas
+#      globais com nomes que aparecem nele: o processo devolve o tipo que essas linhas tinham (o que
+#      ele supôs), os campos que o corpo mudou nelas, a tabela da função achatada (serializaTabelas)
+#      e os diagnósticos;
+#   3. o percurso roda de novo no estado de verdade. Em cada função, se as linhas globais lidas estão
+#      como o processo supôs, o resultado dele entra no lugar do corpo; senão (uma função anterior
+#      mudou o tipo de uma global que esta lê) o corpo é verificado ali, em série. Os avisos de
+#      variável não inicializada e não utilizada vêm depois, do verificaFluxoDeDados.
+# Sem fork (Windows, macOS) ou com menos de MINIMO_FUNCOES_PARALELO funções a análise é a serial.
+
+MINIMO_FUNCOES_PARALELO = 16
+FATIAS_POR_PROCESSO = 4
+
+# (reduzida, funções, contextos, linhas globais antes de cada função, linhas globais), herdado pelos
+# processos no fork
+TAREFA_SEMANTICA = None
+
+
+def recomecoDaArvore(raiz, reduzida, tratadores=None):
+    if reduzida:
+        recomecoReduzida(raiz, tratadores=tratadores)
+    else:
+        recomeco(raiz, tratadores=tratadores or TRATADORES_RECOMECO)
+
+
+# nomes que aparecem na subárvore (type e leaf), um superconjunto das vars e funções que ela usa
+def nomesDaSubarvore(raiz):
+    nomes = set()
+
+    def entra(no, _):
+        if isinstance(no.type, str):
+            nomes.add(no.type)
+        if isinstance(no.leaf, str):
+            nomes.add(no.leaf)
+
+    percorreArvore(raiz, entra)
+    return nomes
+
+
+# passo 1
+def funcoesDoPrograma(raiz, reduzida):
+    base = TRATADORES_REDUZIDOS if reduzida else TRATADORES_RECOMECO
+    declaraFuncao = base['declaracao_funcao']
+    funcoes, contextos, prefixos = [], [], []
+
+    def marcaFuncao(f, tabela, pai, no_pai):
+        funcoes.append(f)
+        contextos.append((tabela, pai, no_pai, False) if reduzida else (tabela, pai, no_pai))
+        prefixos.append(len(tabela_raiz.linhas))
+        declaraFuncao(f, tabela, pai, no_pai)
+        return [] if reduzida else (PULA_FILHOS, pai)
+
+    estado = estadoInicial()
+    estado['indice_arvore'] = indice_arvore
+    with estadoDaCompilacao(estado):
+        recomecoDaArvore(raiz, reduzida, dict(base, declaracao_funcao=marcaFuncao))
+    linhas = [tuple(getattr(linha, campo) for campo in CAMPOS_LINHA) for linha in estado['tabela_raiz'].linhas]
+    return funcoes, contextos, prefixos, linhas
+
+
+# passo 2, num processo do pool: funções inicio..fim-1 da TAREFA_SEMANTICA
+def verificaFatiaParalela(inicio, fim):
+    global tabela_raiz, diagnosticos
+    reduzida, funcoes, contextos, prefixos, linhas = TAREFA_SEMANTICA
+    tabela_raiz = None
+    resultados = []
+    for k in range(inicio, fim):
+        if tabela_raiz is None:
+            tabela_raiz = Table(nome="global")
+            posicoes = {}  # id da linha global -> posição dela
+        for campos in linhas[len(tabela_raiz.linhas):prefixos[k]]:
+            tabela_raiz.addLinha(*campos)
+            posicoes[id(tabela_raiz.linhas[-1])] = len(tabela_raiz.linhas) - 1
+        diagnosticos = Diagnosticos()
+        resultado = verificaCorpoIsolado(funcoes[k], contextos[k], reduzida, posicoes)
+        if resultado is None:
+            tabela_raiz = None  # a tabela global pode ter ficado diferente, monta de novo
+        resultados.append(resultado)
+    return resultados
+
+
+# None quando a função tem que ser verificada em série no passo 3
+def verificaCorpoIsolado(f, contexto, reduzida, posicoes):
+    if contexto[0] is not None:
+        return None  # função dentro de um escopo (não acontece na gramática atual)
+    globais = tabela_raiz
+    quantidade = len(globais.linhas)
+    lidas = []
+    for nome in nomesDaSubarvore(f):
+        linha = globais.porNome.get(nome)
+        while linha is not None:
+            lidas.append((linha, linha.tipo, linha.foiusada))
+            linha = linha.mesmoNome
+
+    if reduzida:
+        percorreArvore(f, entraReduzida, contexto=contexto, filhos=filhosEscolhidos)
+    else:
+        percorreArvore(f, entraRecomeco, contexto=contexto)
+    if len(globais.linhas) != quantidade + 1 or len(globais.filhos) != 1:
+        return None  # o corpo declarou alguma coisa na tabela global
+
+    funcao = globais.filhos.pop()
+    assinatura = globais.retiraUltimaLinha()
+    escritas = [(quantidade, campo, getattr(assinatura, campo)) for campo in ('tipo', 'foiusada')]
+    suposicoes = []
+    for linha, tipo, foiusada in lidas:
+        i = posicoes[id(linha)]
+        suposicoes.append((i, tipo))
+        for campo, antes in (('tipo', tipo), ('foiusada', foiusada)):
+            depois = getattr(linha, campo)
+            if depois != antes:
+                escritas.append((i, campo, depois))
+                setattr(linha, campo, antes)  # a próxima função da fatia vê a linha como era
+    return suposicoes, escritas, serializaTabelas(funcao), diagnosticos.serializa()
+
+
+def recomecoParalelo(raiz, reduzida, processos=0):
+    global TAREFA_SEMANTICA
+    if raiz is None or 'fork' not in multiprocessing.get_all_start_methods():
+        recomecoDaArvore(raiz, reduzida)
+        return
+    indiceDe(raiz)
+    funcoes, contextos, prefixos, linhas = funcoesDoPrograma(raiz, reduzida)
+    if len(funcoes) < MINIMO_FUNCOES_PARALELO:
+        recomecoDaArvore(raiz, reduzida)
+        return
+
+    processos = processos or os.cpu_count() or 1
+    quantidade_fatias = min(len(funcoes), processos * FATIAS_POR_PROCESSO)
+    limites = [len(funcoes) * i // quantidade_fatias for i in range(quantidade_fatias + 1)]
+    TAREFA_SEMANTICA = (reduzida, funcoes, contextos, prefixos, linhas)
+    try:
+        with concurrent.futures.ProcessPoolExecutor(processos,
+                                                    mp_context=multiprocessing.get_context('fork')) as executor:
+            fatias = list(executor.map(verificaFatiaParalela, limites[:-1], limites[1:]))
+    finally:
+        TAREFA_SEMANTICA = None
+    resultados = {}
+    for f, prefixo, resultado in zip(funcoes, prefixos, (r for fatia in fatias for r in fatia)):
+        if resultado is not None:
+            resultados[id(f)] = (prefixo, resultado)
+
+    # passo 3
+    base = TRATADORES_REDUZIDOS if reduzida else TRATADORES_RECOMECO
+    declaraFuncao = base['declaracao_funcao']
+
+    def aplicaFuncao(f, tabela, pai, no_pai):
+        proximos = declaraFuncao(f, tabela, pai, no_pai)
+        prefixo, resultado = resultados.get(id(f), (None, None))
+        globais = tabela_raiz.linhas
+        if resultado is None or len(globais) != prefixo + 1:
+            return proximos
+        suposicoes, escritas, tabelas, serializados = resultado
+        for i, tipo in suposicoes:
+            if globais[i].tipo != tipo:
+                return proximos
+        tabela_raiz.filhos[-1] = desserializaTabelas(tabelas, tabela_raiz)
+        for i, campo, valor in escritas:
+            setattr(globais[i], campo, valor)
+        diagnosticos.adicionaSerializados(serializados)
+        return [] if reduzida else (PULA_FILHOS, pai)
+
+    recomecoDaArvore(raiz, reduzida, dict(base, declaracao_funcao=aplicaFuncao))
 
 
 # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~  コード生成 ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
@@ -1146,24 +3853,94 @@ def recomeco(root, tabela=None, pai=None):
 
 # classe pra gerar codigo
 
+# comparações da linguagem -> predicado do icmp
+COMPARACOES_LLVM = {">": ">", "<": "<", ">=": ">=", "<=": "<=", "<>": "!=", "=": "=="}
+
+# tipos escalares do anotaTipos -> tipos do LLVM
+TIPOS_LLVM = {"inteiro": ir.IntType(32), "flutuante": ir.DoubleType(), "logico": ir.IntType(1)}
+
+# formato do printf/scanf pelo tipo (o do elemento, nos vetores)
+FORMATOS_ESCREVA = {"inteiro": "%d\n\0", "flutuante": "%lf\n\0"}
+FORMATOS_LEIA = {"inteiro": "%d\0", "flutuante": "%lf\0"}
+
+
 class KodoGen():
-    def __init__(self, arvorinha):
+    # despacho por tipo de nó: cada tabela liga o tipo ao nome do método, e o __init__ monta os
+    # dicionários com os métodos já ligados, então cada nó custa uma consulta no dicionário
+    #
+    # os escalares locais (parâmetros e variáveis que não são vetor nem são lidas pelo leia, que passa
+    # o endereço para o scanf) e o valor do retorna não vão para a memória: o gerador guarda o valor
+    # atual de cada um (valores) e o usa direto nas expressões. Como o corpo só tem se e repita, os
+    # phis saem da própria estrutura: na junção do se, um phi para cada escalar que chega com valores
+    # diferentes pelos caminhos; no começo do corpo do repita, um phi para cada escalar escrito no
+    # corpo (escritasDoRepita), completado com o valor do fim do corpo quando a condição é gerada.
+    # Escalar lido antes de ser escrito vale 0 (o verificaFluxoDeDados já avisa)
+
+    # nós do corpo da função que geram código; depois o percurso continua pelos filhos
+    COMANDOS = {
+        "declaracao_variaveis": "declaracaoVar",
+        "atribuicao": "atribuicao",
+        "chamada_funcao": "trataFuncCall",
+        "escreva": "trataEscreva",
+        "leia": "trataLeia",
+        "retorna": "montaRetorna",
+    }
+    # se/repita: (método que abre os blocos e devolve o contexto dos filhos, método que fecha na saída)
+    CONTROLES = {
+        "se": ("trataSe", "fechaSe"),
+        "repita": ("trataRepita", "fechaRepita"),
+    }
+    OPERACOES_BINARIAS = {
+        "+": "operacaoSoma",
+        "-": "operacaoSubtracao",
+        "*": "operacaoMultiplicacao",
+        "/": "operacaoDivisao",
+        "||": "operacaoOu",
+        "&&": "operacaoE",
+        ">": "operacaoComparacao",
+        "<": "operacaoComparacao",
+        ">=": "operacaoComparacao",
+        "<=": "operacaoComparacao",
+        "<>": "operacaoComparacao",
+        "=": "operacaoComparacao",
+    }
+    OPERACOES_UNARIAS = {
+        "+": "operacaoMaisUnario",
+        "-": "operacaoMenosUnario",
+    }
+
+    # arquivo_ll: onde o módulo é gravado (e exibido); None só monta o módulo (CompilerSession)
+    def __init__(self, arvorinha, arquivo_ll='meu_modulo.ll'):
+        self.comandos = {tipo: getattr(self, nome) for tipo, nome in self.COMANDOS.items()}
+        self.controles = {tipo: (getattr(self, abre), getattr(self, fecha))
+                          for tipo, (abre, fecha) in self.CONTROLES.items()}
+        self.operacoesBinarias = {op: getattr(self, nome) for op, nome in self.OPERACOES_BINARIAS.items()}
+        self.operacoesUnarias = {op: getattr(self, nome) for op, nome in self.OPERACOES_UNARIAS.items()}
         self.vars = []  # lista de variaveis
         self.funcoes = []  # lista de funcoes
         self.module = ir.Module('meu_modulo.bc')  # cria módulo
         self.fimbloco = ''
-        self.retornodafunc = ''
         self.global_var = {}
         self.local_var = {}
         self.dicionario_var = {}
         self.func_name = None
         self.count = 1
         self.retorna = False
+        self.blocos = []  # se/repita abertos durante o percurso do corpo da funcao
+        self.enderecos = {}  # Linha -> alloca/global da variável
+        self.escalares = {}  # Linha (ou 'retorna') -> tipo, dos escalares em SSA da função atual
+        self.valores = {}  # Linha (ou 'retorna') -> valor atual do escalar
+        self.escritasDoRepita = {}  # id do repita -> escalares escritos no corpo (com phi no começo)
+        self.valoresAbertos = []  # estado de cada se/repita aberto (valores de antes e saídas; phis)
+        self.indice = anotaTipos(arvorinha)
+        self.tipos = self.indice.atributos['tipoExpressao']
+        self.conversoes = self.indice.atributos['conversaoExpressao']
         self.traversalAST(arvorinha)
-        arquivo = open('meu_modulo.ll', 'w')
-        arquivo.write(str(self.module))
-        arquivo.close()
-        print(self.module)
+        if arquivo_ll is not None:
+            arquivo = open(arquivo_ll, 'w')
+            arquivo.write(str(self.module))
+            arquivo.close()
+            print(self.module)
 
     def trataVarGlob(self, root):
         # print(root.type)
@@ -1177,18 +3954,20 @@ class KodoGen():
 
         for f in root.children[1].children:
             if len(i.children) == 0:
-                array_nomes.append(f.type)
+                array_nomes.append(f)
 
         var_tipo = root.children[0].leaf
 
         # print(var_tipo)
         if var_tipo == "inteiro":
-            for nome in array_nomes:
+            for var in array_nomes:
+                nome = var.type
                 g = ir.GlobalVariable(self.module, ir.IntType(32), nome)  # Variável inteira global
                 g.initializer = ir.Constant(ir.IntType(32), 0)  # Inicializa a variavel g
                 g.linkage = "common"  # Linkage = common
                 g.align = 4  # Define o alinhamento em 4
                 self.global_var[nome] = g
+                self.guardaEndereco(var, g)
                 self.vars.append(nome)
 
             if len(array_nos_vetor) > 0:  # se for vetor de inteiro
@@ -1200,13 +3979,16 @@ class KodoGen():
                     tempRef.linkage = "common"
                     tempRef.align = 4
                     self.global_var[w.type] = tempRef
+                    self.guardaEndereco(w, tempRef)
         elif var_tipo == "flutuante":
-            for nome in array_nomes:
+            for var in array_nomes:
+                nome = var.type
                 h = ir.GlobalVariable(self.module, ir.DoubleType(), nome)  # Variável float global h
                 h.initializer = ir.Constant(ir.DoubleType(), 0.0)  # Inicializa a variavel h
                 h.linkage = "common"  # Linkage = common
                 h.align = 4  # Define o alinhamento em 4
                 self.global_var[nome] = h
+                self.guardaEndereco(var, h)
                 self.vars.append(nome)
 
             if len(array_nos_vetor) > 0:  # se for vetor de inteiro
@@ -1217,49 +3999,59 @@ class KodoGen():
                     tempRef.initializer = ir.Constant(ir.ArrayType(element=ir.DoubleType(), count=int(w.children[0].type)), None)
                     tempRef.linkage = "common"
                     self.global_var[w.type] = tempRef
+                    self.guardaEndereco(w, tempRef)
 
     # percorre corpo da funcao
+    # o contexto de cada nó é (builder, se/repita do qual o nó é filho direto, ou None). A condição do
+    # se/repita não é percorrida aqui, e cada corpo de um se com senão fica dentro do seu ramo do if_else
     def traversalFunc(self, root, builder):
-        if root:
+        percorreArvore(root, self.entraFunc, self.saiFunc, (builder, None))
+
+    def entraFunc(self, root, contexto):
+        builder, controle = contexto
+        if controle is not None:
+            if root is controle.children[1 if controle.type == "repita" else 0]:
+                return PULA_FILHOS
+            ramo = self.ramoDoSe(root, controle)
+            if ramo is not None:
+                ramo.__enter__()
             if self.retorna == True:
-                return
-
-            if root.type == "declaracao_variaveis":
-                self.declaracaoVar(root, builder)
-            if root.type == "atribuicao":
-                self.atribuicao(root, builder)
-            if root.type == "repita":
-                return self.trataRepita(root, builder)
-            if root.type == "chamada_funcao":
-                self.trataFuncCall(root, builder)
-            if root.type == "escreva":
-                self.trataEscreva(root, builder)
-            if root.type == "leia":
-                self.trataLeia(root,builder)
-            if root.type == "se":
-                return self.trataSe(root, builder)
-            if root.type == "retorna":
-                self.montaRetorna(root, builder)
-
-            for f in root.children:
-                self.traversalFunc(f, builder)
-
+                if ramo is not None:
+                    self.fechaRamo(ramo, builder)
+                return PULA_FILHOS
+            contexto = (builder, None)
+        if self.retorna == True:
+            return PULA_FILHOS
+
+        comando = self.comandos.get(root.type)
+        if comando is not None:
+            comando(root, builder)
+            return contexto
+        controle = self.controles.get(root.type)
+        if controle is not None:
+            return controle[0](root, builder)
+        return contexto
+
+    def saiFunc(self, root, contexto):
+        builder, controle = contexto
+        if controle is not None:
+            ramo = self.ramoDoSe(root, controle)
+            if ramo is not None:
+                self.fechaRamo(ramo, builder)
+        controle = self.controles.get(root.type)
+        if controle is not None:
+            controle[1](root, builder)
+
+    # then/otherwise do if_else aberto para o corpo do se (None se o se não tem senão)
+    def ramoDoSe(self, corpo, se):
+        if se.type != "se" or len(se.children) != 3:
+            return None
+        _, then, otherwise = self.blocos[-1]
+        return then if corpo is se.children[1] else otherwise
+
+    # (nome, tipo) dos parametros da declaracao de funcao, na ordem do índice
     def pegaParametro(self, no):
-        vetor = []
-        atual = no
-        lista = []
-        # print("wtf")
-        while (True):
-            for child in atual.children:
-                # print(child.type)
-                if child.type == "parametro":
-                    lista.append((child.leaf, child.children[0].leaf))
-
-                vetor.append(child)
-            if len(vetor) == 0: break
-            atual = vetor.pop(0)
-        # print(lista)
-        return lista
+        return [(child.leaf, child.children[0].leaf) for child in self.indice.parametros[id(no)]]
 
     def trataDeclaraFunc(self, root):
         parametro = []
@@ -1271,7 +4063,7 @@ class KodoGen():
             # se tiver parametros
             if len(root.children[1].children[1].children) > 0:  # parametros?
                 # print(root.children[1].children[0].type)
-                tupla_params = self.pegaParametro(root.children[1].children[0])
+                tupla_params = self.pegaParametro(root)
                 # print(tupla_params)
                 for i in tupla_params:
                     if i[1] == "inteiro":
@@ -1287,7 +4079,7 @@ class KodoGen():
 
         else:  # senao se funcao nao tem tipo
             if len(root.children[0].children[1].children) > 0:  # parametros?
-                tupla_params = self.pegaParametro(root.children[0].children[0])
+                tupla_params = self.pegaParametro(root)
                 for i in tupla_params:
                     if i[1] == "inteiro":
                         parametro.append(ir.IntType(32))
@@ -1301,8 +4093,10 @@ class KodoGen():
         func = ir.Function(self.module, tfunc, name=nome)
         entryBlock = func.append_basic_block('inicio' + nome)
         builder = ir.IRBuilder(entryBlock)
+        self.escalares, enderecadas, self.escritasDoRepita = self.escalaresDaFuncao(root)
+        self.valores = {}
         if tipo:
-            self.retornodafunc = builder.alloca(tipo, name='ret')
+            self.escalares['retorna'] = tipo
 
         for arg, name in zip(func.args, [i[0] for i in tupla_params]):
             arg.name = name
@@ -1311,10 +4105,15 @@ class KodoGen():
 
         self.func_name = func
 
-        for i in func.args:
+        for i, parametro in zip(func.args, self.indice.parametros[id(root)]):
+            if parametro.linha is not None and parametro.linha not in enderecadas:
+                self.escalares[parametro.linha] = i.type
+                self.valores[parametro.linha] = i
+                continue
             x = builder.alloca(i.type, name=i.name)
             x.align = 4
             self.local_var[i.name] = x
+            self.guardaEndereco(parametro, x)
             builder.store(i, x)
 
         endBasicBlock = func.append_basic_block('fim' + nome)
@@ -1329,24 +4128,76 @@ class KodoGen():
         if len(root.children) != 2:
             builder.ret_void()
         else:
-            x = builder.load(self.retornodafunc)
-
-            builder.ret(x)
-
-
-    # percorre arvore procurando por func e vars glob
-    def traversalAST(self, root, pai=None):
-        if root:
-            # se pai é lista_declaracoes então variável é global
-            if pai:
-                if pai.type == "lista_declaracoes":
-                    if root.type == "declaracao_variaveis":
-                        self.trataVarGlob(root)
-            if root.type == "declaracao_funcao":
-                self.trataDeclaraFunc(root)
-            # pass
-            for f in root.children:
-                self.traversalAST(f, root)
+            builder.ret(self.valorDe('retorna'))
+
+    # escalares locais que podem ficar em SSA (Linha -> tipo: as das variáveis declaradas no corpo que
+    # não são vetor), as linhas lidas pelo leia (ficam na memória, inclusive os parâmetros) e, para cada
+    # repita, os escalares escritos no corpo (atribuições e retorna), na ordem em que aparecem
+    def escalaresDaFuncao(self, root):
+        escalares = {}
+        enderecadas = set()
+        escritas = {}
+        abertos = []  # escritas de cada repita aberto
+
+        def entra(no, _):
+            tipo = no.type
+            if tipo == "declaracao_variaveis":
+                tipo_var = TIPOS_LLVM[no.children[0].leaf]
+                for var in no.children[1].children:
+                    if var is not None and not var.children and var.linha is not None:
+                        escalares[var.linha] = tipo_var
+                return PULA_FILHOS
+            if tipo == "leia":
+                enderecadas.add(no.children[0].linha)
+            elif tipo == "repita":
+                abertos.append({})
+            elif abertos:
+                if tipo == "atribuicao" and not no.children[0].children:
+                    abertos[-1][no.children[0].linha] = None
+                elif tipo == "retorna":
+                    abertos[-1]['retorna'] = None
+            return None
+
+        def sai(no, _):
+            if no.type == "repita":
+                escritas[id(no)] = chaves = abertos.pop()
+                if abertos:
+                    abertos[-1].update(chaves)
+
+        percorreArvore(root, entra, sai)
+        for linha in enderecadas:
+            escalares.pop(linha, None)
+        return escalares, enderecadas, escritas
+
+    # valor atual do escalar (0 se ainda não foi escrito)
+    def valorDe(self, chave):
+        valor = self.valores.get(chave)
+        return valor if valor is not None else ir.Constant(self.escalares[chave], 0)
+
+    # valores no começo do bloco atual, que é a junção dos caminhos em saidas [(bloco, valores)]: o
+    # escalar que chega com o mesmo valor por todos fica com ele, os outros ganham um phi
+    def juntaValores(self, saidas, builder):
+        juntos = {}
+        for chave in dict.fromkeys(chave for _, valores in saidas for chave in valores):
+            entradas = [(valores.get(chave), bloco) for bloco, valores in saidas]
+            primeiro = entradas[0][0]
+            if all(valor is primeiro for valor, _ in entradas):
+                juntos[chave] = primeiro
+                continue
+            phi = builder.phi(self.escalares[chave], name=getattr(chave, 'nome', chave))
+            for valor, bloco in entradas:
+                phi.add_incoming(valor if valor is not None else ir.Constant(self.escalares[chave], 0), bloco)
+            juntos[chave] = phi
+        return juntos
+
+
+    # gera as vars glob e as funcs na ordem do programa (declaracoes do índice)
+    def traversalAST(self, root):
+        for no in self.indice.declaracoes:
+            if no.type == "declaracao_variaveis":
+                self.trataVarGlob(no)
+            else:
+                self.trataDeclaraFunc(no)
 
     def declaracaoVar(self, no, builder):
 
@@ -1367,11 +4218,15 @@ class KodoGen():
                     x.align = 4
                     self.vars.append(x)
                     self.local_var[w.type] = x
+                    self.guardaEndereco(w, x)
             for i in list_nomes:
+                if i.linha in self.escalares:
+                    continue
                 x = builder.alloca(ir.IntType(32), name=i.type)
                 x.align = 4
                 self.vars.append(x)
                 self.local_var[i.type] = x
+                self.guardaEndereco(i, x)
         elif tipo_var == "flutuante":
             if len(array_nos_vetor) > 0:
                 for w in array_nos_vetor:
@@ -1379,28 +4234,70 @@ class KodoGen():
                     x.align = 4
                     self.vars.append(x)
                     self.local_var[w.type] = x
+                    self.guardaEndereco(w, x)
             for i in list_nomes:
+                if i.linha in self.escalares:
+                    continue
                 x = builder.alloca(ir.DoubleType(), name=i.type)
                 x.align = 4
                 self.vars.append(x)
                 self.local_var[i.type] = x
-
+                self.guardaEndereco(i, x)
+
+    def guardaEndereco(self, var, endereco):
+        if var.linha is not None:
+            self.enderecos[var.linha] = endereco
+
+    # endereço da var: o da declaração ligada pelo resolveNomes e, se ela ainda não foi gerada, o da
+    # global e depois o da local com o mesmo nome (o mesmo que o anotaTipos usa para o tipo). O menos
+    # unário também cai aqui (valorExpressao), por isso o getattr
+    def endereco(self, var):
+        linha = getattr(var, 'linha', None)
+        x = self.enderecos.get(linha) if linha is not None else None
+        if x is None:
+            x = self.global_var.get(var.type, self.local_var.get(var.type))
+        return x
+
+    # conversão marcada pelo anotaTipos no nó (uitofp/fptoui e o tipo de destino)
+    def converte(self, valor, conversao, builder):
+        instrucao, tipo = conversao
+        return getattr(builder, instrucao)(valor, TIPOS_LLVM[tipo])
+
+    # avalia a expressão em pós-ordem: cada nó empilha o seu valor e usa os valores dos filhos,
+    # que estão no topo da pilha (os argumentos, no caso de uma chamada de função)
     def expressao(self, no, builder, pegaPtr=None):
-        array = []
+        if not no.children and no.type != "chamada_funcao":
+            return self.valorExpressao(no, [], builder, pegaPtr)
+        valores = []
+
+        def entra(no, _):
+            if no.type == "chamada_funcao":
+                return [(f, None) for f in no.children[0].children]
+            return [(f, None) for f in no.children]
+
+        def sai(filho, _):
+            if filho.type == "chamada_funcao":
+                quantidade = len(filho.children[0].children)
+            else:
+                quantidade = len(filho.children)
+            array = valores[len(valores) - quantidade:]
+            del valores[len(valores) - quantidade:]
+            if filho.type == "chamada_funcao":
+                valores.append(self.trataFuncCall(filho, builder, array))
+            else:
+                valores.append(self.valorExpressao(filho, array, builder, pegaPtr if filho is no else None))
+
+        percorreArvore(no, entra, sai, filhos=filhosEscolhidos)
+        return valores[0]
+
+    def valorExpressao(self, no, array, builder, pegaPtr=None):
         nome = no.type
-        if nome == "chamada_funcao":
-            return self.trataFuncCall(no, builder)
-        for f in no.children:
-            array.append(self.expressao(f, builder))
-        # print(array)
         if len(array) == 0 or (len(array) == 1 and isinstance(nome, str)):
             if isinstance(nome, str):
+                if not no.children and pegaPtr is None and getattr(no, 'linha', None) in self.escalares:
+                    return self.valorDe(no.linha)
 
-                x = None
-                if nome in self.local_var.keys():
-                    x = self.local_var[nome]
-                if nome in self.global_var.keys():
-                    x = self.global_var[nome]
+                x = self.endereco(no)
 
                 # tratamento de vetor
                 if len(no.children) > 0:
@@ -1421,69 +4318,78 @@ class KodoGen():
                 elif isinstance(nome, float):
                     return ir.Constant(ir.DoubleType(), nome)
         elif len(array) == 2:  # se tem filhos
-            if array[0].type != array[1].type:
-                if str(array[0].type) == "double":
-                    array[1] = builder.uitofp(array[1], array[0].type)
-                    print(array[1])
-                else:
-                    array[0] = builder.uitofp(array[0], array[1].type)
-
-            if nome == "+":
-                print(array[0].type)
-                if str(array[0].type) == "double" or str(array[1].type) == "double":
-                    return builder.fadd(array[0], array[1], name="addFloat")
-                else:
-                    return builder.add(array[0], array[1], name="addInt")
-            if nome == "-":
-                return builder.sub(array[0], array[1], name="temp")
-            if nome == "*":
-                if str(array[0].type) == 'double':
-                    return builder.fmul(array[0], array[1], name="temp")
-                else:
-                    return builder.mul(array[0], array[1], name="temp")
-            if nome == "/":
-                if str(array[0].type) == 'double':
-                    return builder.fdiv(array[0], array[1], name="temp")
-                else:
-                    return builder.udiv(array[0], array[1], name="temp")
-            if nome == "||":
-                return builder.or_(array[0], array[1], name="temp")
-            if nome == "&&":
-                return builder.and_(array[0], array[1], name="temp")
-            if nome in [">", "<", ">=", "<="]:
-                return builder.icmp_signed(nome, array[0], array[1], name="temp")
-            if nome == "<>":
-                return builder.icmp_signed("!=", array[0], array[1], name="temp")
-            if nome == "=":
-                return builder.icmp_signed("==", array[0], array[1], name="temp")
+            tipo = self.tipos.get(no.children[0])
+            conversao = self.conversoes.get(no.children[1])
+            if conversao is not None:
+                array[1] = self.converte(array[1], conversao, builder)
+            else:
+                conversao = self.conversoes.get(no.children[0])
+                if conversao is not None:
+                    array[0] = self.converte(array[0], conversao, builder)
+                    tipo = conversao[1]
 
+            operacao = self.operacoesBinarias.get(nome)
+            if operacao is not None:
+                return operacao(nome, builder, array[0], array[1], tipo)
 
         elif len(array) == 1:  # se for expressao unaria
-            if nome == "+":
-                return builder.add(ir.Constant(ir.IntType(32), 0), array[0], name="temp")
-            if nome == "-":
-                return builder.sub(ir.Constant(ir.IntType(32), 0), array[0], name="temp")
+            operacao = self.operacoesUnarias.get(nome)
+            if operacao is not None:
+                return operacao(nome, builder, array[0], self.tipos.get(no))
         raise ArithmeticError("nao foi implementado ainda: ", nome)
 
+    # ~~~~~~~~ operadores (OPERACOES_BINARIAS e OPERACOES_UNARIAS) ~~~~~~~~
+    # tipo: o dos operandos depois da conversão, anotado pelo anotaTipos (nas aritméticas é também o
+    # do resultado)
+    def operacaoSoma(self, nome, builder, a, b, tipo):
+        if tipo == "flutuante":
+            return builder.fadd(a, b, name="addFloat")
+        else:
+            return builder.add(a, b, name="addInt")
+
+    def operacaoSubtracao(self, nome, builder, a, b, tipo):
+        if tipo == "flutuante":
+            return builder.fsub(a, b, name="temp")
+        else:
+            return builder.sub(a, b, name="temp")
+
+    def operacaoMultiplicacao(self, nome, builder, a, b, tipo):
+        if tipo == "flutuante":
+            return builder.fmul(a, b, name="temp")
+        else:
+            return builder.mul(a, b, name="temp")
+
+    def operacaoDivisao(self, nome, builder, a, b, tipo):
+        if tipo == "flutuante":
+            return builder.fdiv(a, b, name="temp")
+        else:
+            return builder.udiv(a, b, name="temp")
+
+    def operacaoOu(self, nome, builder, a, b, tipo):
+        return builder.or_(a, b, name="temp")
+
+    def operacaoE(self, nome, builder, a, b, tipo):
+        return builder.and_(a, b, name="temp")
+
+    def operacaoComparacao(self, nome, builder, a, b, tipo):
+        if tipo == "flutuante":
+            return builder.fcmp_ordered(COMPARACOES_LLVM[nome], a, b, name="temp")
+        return builder.icmp_signed(COMPARACOES_LLVM[nome], a, b, name="temp")
+
+    def operacaoMaisUnario(self, nome, builder, a, tipo):
+        return builder.add(ir.Constant(ir.IntType(32), 0), a, name="temp")
+
+    def operacaoMenosUnario(self, nome, builder, a, tipo):
+        return builder.sub(ir.Constant(ir.IntType(32), 0), a, name="temp")
+
     def atribuicao(self, no, builder):
-        nome_var = no.children[0].type
-        tipo_var = pegaTipoByNomeIterative(nome_var)  # tipo da variavel q será atribuida
-        x = None
-        if nome_var in self.local_var.keys():
-            x = self.local_var[nome_var]
-        if nome_var in self.global_var.keys():
-            x = self.global_var[nome_var]
+        x = self.endereco(no.children[0])
         resultado = self.expressao(no.children[1], builder)
         # print(no.children[1].type)
         # self.dicionario_var[no.children[0].type] = no.children[1].type
-        if len(no.children[0].children) > 0:
-            print(no.children[0].children[0].type)
-            # self.dicionario_var[no.children[0].children[0].type] = no.children[1].type
-        if str(resultado.type) not in str(x.type):
-            if str(x.type) == "i32*":
-                resultado = builder.fptoui(resultado, ir.IntType(32))
-            else:
-                resultado = builder.uitofp(resultado, ir.DoubleType())
+        conversao = self.conversoes.get(no.children[1])
+        if conversao is not None:
+            resultado = self.converte(resultado, conversao, builder)
 
         if len(no.children[0].children) > 0:  # significa q é vetor
             indicedovet = no.children[0].children[0]
@@ -1494,6 +4400,8 @@ class KodoGen():
             resultadofinal = builder.gep(vet_ptr, [teste], inbounds=True)
             # print(vet_ptr)
             builder.store(resultado, resultadofinal)
+        elif no.children[0].linha in self.escalares:
+            self.valores[no.children[0].linha] = resultado
         else:
             # print(no.children[1].type)
             # resultado = self.expressao(no.children[1], builder)
@@ -1503,7 +4411,7 @@ class KodoGen():
         self.retorna = True
         valor_retorna = self.expressao(no.children[0], builder)
 
-        builder.store(valor_retorna, self.retornodafunc)
+        self.valores['retorna'] = valor_retorna
         # builder.branch(self.fimbloco)
 
     # builder.position_at_end(self.fimbloco)
@@ -1513,6 +4421,7 @@ class KodoGen():
     # builder.ret(valor_retorna)
     # builder.position_at_start(novobloco_ret)
 
+    # abre o if_then/if_else do se; os corpos são percorridos pelo traversalFunc e o fechaSe fecha o bloco
     def trataSe(self, no, builder):
 
         # novobloco_se = self.func_name.append_basic_block('se')
@@ -1523,15 +4432,21 @@ class KodoGen():
         b_cmp = ir.Constant(ir.IntType(32), 0)
         cond = builder.icmp_signed("!=", a_cmp, b_cmp, name="comparacao")
 
+        # os corpos começam com os valores de antes do se; sem senão, o bloco da condição vai direto
+        # para a junção com eles
+        antes = self.valores
+        self.valores = dict(antes)
         if len(no.children) == 2:
-            with builder.if_then(cond):
-                self.traversalFunc(no.children[1], builder)
+            self.valoresAbertos.append((antes, [(builder.block, antes)]))
+            se = builder.if_then(cond)
+            se.__enter__()
+            self.blocos.append((se, None, None))
         else:
-            with builder.if_else(cond) as (then, otherwise):
-                with then:
-                    self.traversalFunc(no.children[1], builder)
-                with otherwise:
-                    self.traversalFunc(no.children[2], builder)
+            self.valoresAbertos.append((antes, []))
+            se = builder.if_else(cond)
+            then, otherwise = se.__enter__()
+            self.blocos.append((se, then, otherwise))
+        return (builder, no)
 
 
         # builder.cbranch(cond, novobloco_se, novobloco_senao)
@@ -1550,14 +4465,46 @@ class KodoGen():
 
         # builder.position_at_end(novobloco_fim)
 
+    def fechaSe(self, no, builder):
+        se, then, _ = self.blocos.pop()
+        _, saidas = self.valoresAbertos.pop()
+        if then is None:
+            saidas.append((builder.block, self.valores))
+        se.__exit__(None, None, None)
+        self.valores = self.juntaValores(saidas, builder)
+
+    # fecha o então/senão de um se com senão: guarda o bloco onde o ramo termina e os valores com que
+    # ele chega na junção; o próximo ramo começa de novo com os valores de antes do se
+    def fechaRamo(self, ramo, builder):
+        ramo.__exit__(None, None, None)
+        antes, saidas = self.valoresAbertos[-1]
+        saidas.append((builder.block, self.valores))
+        self.valores = dict(antes)
+
+    # entra no bloco do repita; o corpo é percorrido pelo traversalFunc e o fechaRepita monta a condição
     def trataRepita(self, no, builder):
         bloco_condicao = self.func_name.append_basic_block('condicao_repita')
         bloco_repita = self.func_name.append_basic_block('bloco_repita')
         bloco_fim_do_repita = self.func_name.append_basic_block('bloco_fim_do_repita')
         
+        entrada = builder.block
         x = builder.branch(bloco_repita)  # nao testa condicao por isso vai direto pro bloco do repita
         builder.position_at_end(bloco_repita)  # Position at the end of the basic block.
-        self.traversalFunc(no.children[0], builder)  # manda o no = 'então'
+        self.blocos.append((bloco_condicao, bloco_repita, bloco_fim_do_repita))
+        # phi no começo do corpo para os escalares escritos nele: o valor de antes do repita e, quando a
+        # condição for gerada, o do fim do corpo
+        phis = []
+        for chave in self.escritasDoRepita.get(id(no), ()):
+            if chave in self.escalares:
+                phi = builder.phi(self.escalares[chave], name=getattr(chave, 'nome', chave))
+                phi.add_incoming(self.valorDe(chave), entrada)
+                self.valores[chave] = phi
+                phis.append((chave, phi))
+        self.valoresAbertos.append(phis)
+        return (builder, no)  # o corpo é percorrido em seguida
+
+    def fechaRepita(self, no, builder):
+        bloco_condicao, bloco_repita, bloco_fim_do_repita = self.blocos.pop()
         # if self.retorna == False:
         builder.branch(bloco_condicao)  # bloco condicao
 
@@ -1568,42 +4515,34 @@ class KodoGen():
         b_cmp = ir.Constant(ir.IntType(32), 0)  # cria o 0 pra comparar
         cond = builder.icmp_signed("==", result, b_cmp,name="comparacao_repita")  # o self.expressao retorna o valor da comparacao
         builder.cbranch(cond, bloco_repita, bloco_fim_do_repita)  # salto de bloco condicional cbranch
+        for chave, phi in self.valoresAbertos.pop():
+            phi.add_incoming(self.valores[chave], bloco_condicao)
         builder.position_at_end(bloco_fim_do_repita)  # position at the end of the basic block
         # if self.retorna == True:
         # builder.branch(self.fimbloco)
 
-    def trataFuncCall(self, no, builder):
+    # lista: valores dos argumentos, quando já foram avaliados (chamada dentro de uma expressão)
+    def trataFuncCall(self, no, builder, lista=None):
         nome_func = no.leaf  # nome da func
-        lista = []
-        # print("qq isso")
-        # print(no.children[0].children[0].type)
-        for i in no.children[0].children:
+        if lista is None:
+            lista = []
+            for i in no.children[0].children:
 
-            lista.append(self.expressao(i, builder))
+                lista.append(self.expressao(i, builder))
         guardaFunc = None
         for x in self.funcoes:
             if nome_func == x.name:
                 guardaFunc = x
-        for i,(parametroW, parametroR) in enumerate(zip(lista, guardaFunc.args)):
-            if str(parametroW.type) not in str(parametroR.type):
-                if "double" in str(parametroR.type):
-                    x = builder.uitofp(parametroW, ir.DoubleType())
-                    lista[i] = x
-                elif "i32" in str(parametroR.type):
-                    x = builder.fptoui(parametroW, ir.IntType(32))
-                    lista[i] = x
+        for i, argumento in enumerate(no.children[0].children):
+            conversao = self.conversoes.get(argumento)
+            if conversao is not None:
+                lista[i] = self.converte(lista[i], conversao, builder)
         return builder.call(guardaFunc, lista)
 
     def trataEscreva(self, no, builder):
         retexpress = self.expressao(no.children[0], builder)
-        print("ASDKASKD")
         argumento_escreva = retexpress
-        print(argumento_escreva.type)
-        tmp = None
-        if 'i32' in str(argumento_escreva.type):
-            tmp = "%d\n\0"
-        elif 'double' in str(argumento_escreva.type):
-            tmp = "%lf\n\0"
+        tmp = FORMATOS_ESCREVA.get(tipoBase(self.tipos.get(no.children[0])))
 
         ptr = ir.ArrayType(ir.IntType(8), len(tmp))
         # ptr = ir.DoubleType()
@@ -1624,11 +4563,7 @@ class KodoGen():
         retexpress = self.expressao(no.children[0], builder, pegaPtr=True)
         argumento_leia = retexpress
 
-        tmp = None
-        if 'i32' in str(argumento_leia.type):
-            tmp = "%d\0"
-        elif 'double' in str(argumento_leia.type):
-            tmp = "%lf\0"
+        tmp = FORMATOS_LEIA.get(tipoBase(self.tipos.get(no.children[0])))
         ptr = ir.ArrayType(ir.IntType(8), len(tmp))
         self.count = self.count + 1
         varGlob = ir.GlobalVariable(self.module, ptr, "leia" + str(self.count))
@@ -1641,92 +4576,456 @@ class KodoGen():
         func = ir.FunctionType(ir.IntType(32), (), var_arg=True)
         func_llvm = self.module.declare_intrinsic("scanf", (), func)
         builder.call(func_llvm, lista_argumentos)
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~ EMISSÃO NATIVA ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+# o ir.Module do KodoGen vira código de máquina dentro do processo, pelo llvmlite.binding: o texto do
+# módulo é lido uma vez, verificado e passado para a máquina alvo, que grava o objeto (ou o bitcode)
+# direto, no lugar do llvm-as e do llc (um processo e uma nova leitura do módulo em cada passo). Só a
+# ligação do executável continua com o gcc. Cada máquina alvo (uma por nível de otimização do gerador
+# de código, 0 a 3 como o -O do llc, que usava 2) é criada uma vez por processo
+
+TRIPLO_ALVO = 'x86_64-pc-linux-gnu'  # o --mtriple que o llc recebia
+
+MAQUINAS_ALVO = {}
+
+
+def maquinaAlvo(nivel=2):
+    maquina = MAQUINAS_ALVO.get(nivel)
+    if maquina is None:
+        if not MAQUINAS_ALVO:
+            try:
+                llvm.initialize()  # llvmlite < 0.45; nas versões novas a inicialização é automática
+            except RuntimeError:
+                pass
+            llvm.initialize_all_targets()
+            llvm.initialize_all_asmprinters()
+        # código sem PIC, como o llc gerava para o gcc -no-pie
+        maquina = MAQUINAS_ALVO[nivel] = llvm.Target.from_triple(TRIPLO_ALVO).create_target_machine(
+            opt=nivel, reloc='static')
+    return maquina
+
+
+# módulo do llvmlite.binding a partir do ir.Module, verificado e com o alvo da máquina
+def moduloVerificado(modulo, maquina=None):
+    maquina = maquina or maquinaAlvo()
+    nativo = llvm.parse_assembly(str(modulo))
+    nativo.triple = maquina.triple
+    nativo.data_layout = str(maquina.target_data)
+    nativo.verify()
+    return nativo
+
+
+# -O do driver ('0' a '3' e 's'): o pipeline padrão de passes do LLVM (mem2reg/SROA, instcombine, GVN,
+# passes de laço, inlining...) roda no módulo antes da emissão. O nível de velocidade escolhe o pipeline
+# e o nível do gerador de código da máquina alvo. O llvmlite não expõe o nível de tamanho: o -Os é o
+# pipeline do -O2 sem desenrolar nem vetorizar laços e com o limiar de inlining do -Os do clang
+NIVEIS_OTIMIZACAO = {'0': 0, '1': 1, '2': 2, '3': 3, 's': 2}
+
+
+def otimizaModulo(nativo, maquina, otimizacao):
+    if otimizacao is None or otimizacao == '0':
+        return nativo
+    opcoes = llvm.PipelineTuningOptions(speed_level=NIVEIS_OTIMIZACAO[otimizacao])
+    if otimizacao == 's':
+        opcoes.loop_unrolling = False
+        opcoes.loop_vectorization = False
+        opcoes.slp_vectorization = False
+        opcoes.inlining_threshold = 75
+    construtor = llvm.create_pass_builder(maquina, opcoes)
+    construtor.getModulePassManager().run(nativo, construtor)
+    return nativo
+
+
+# grava o objeto (formato 'o') ou o bitcode ('bc') do módulo em caminho; sem otimizacao o módulo é
+# emitido como o KodoGen gerou e nivel é só o do gerador de código
+def emiteModulo(modulo, caminho, formato='o', nivel=2, otimizacao=None):
+    if otimizacao is not None:
+        nivel = NIVEIS_OTIMIZACAO[otimizacao]
+    nativo = otimizaModulo(moduloVerificado(modulo, maquinaAlvo(nivel)), maquinaAlvo(nivel), otimizacao)
+    conteudo = maquinaAlvo(nivel).emit_object(nativo) if formato == 'o' else nativo.as_bitcode()
+    with open(caminho, 'wb') as arquivo:
+        arquivo.write(conteudo)
+
+
+# liga o objeto com a libc (printf/scanf); devolve o código de saída do gcc. O módulo não tem main:
+# o ponto de entrada é a principal, com o main apontando para ela na ligação
+def ligaExecutavel(objeto, executavel='exec'):
+    return call(['gcc', objeto, '-o', executavel, '-no-pie', '-Wl,--defsym=main=principal'])
+
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~ EXECUÇÃO NO PROCESSO (JIT) ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+# com --jit o módulo do KodoGen é compilado pelo MCJIT do llvmlite para a máquina em que o compilador
+# está rodando e a principal é chamada direto, sem objeto, ligação nem processo novo. O printf e o
+# scanf do módulo são ligados aos da libc já carregada no processo. O programa escreve pelo stdout do
+# C, que é esvaziado no fim da execução (o do Python antes dela, para a saída não sair fora de ordem)
+
+JIT_INICIALIZADO = False
+
+
+# a máquina do JIT é nova a cada chamada: o motor do MCJIT fica dono dela e a libera junto com ele
+def maquinaJIT(nivel=2):
+    global JIT_INICIALIZADO
+    if not JIT_INICIALIZADO:
+        maquinaAlvo()  # inicializa os alvos
+        llvm.initialize_native_target()
+        llvm.initialize_native_asmprinter()
+        libc = ctypes.CDLL(None)
+        for nome in ('printf', 'scanf'):
+            llvm.add_symbol(nome, ctypes.cast(getattr(libc, nome), ctypes.c_void_p).value)
+        JIT_INICIALIZADO = True
+    return llvm.Target.from_default_triple().create_target_machine(opt=nivel, jit=True)
+
+
+class ResultadoJIT():
+    # status: o que a principal devolveu (0 quando ela é vazia); tempos em segundos
+    __slots__ = ('status', 'tempoCompilacao', 'tempoExecucao')
+
+    def __init__(self, status, tempoCompilacao, tempoExecucao):
+        self.status = status
+        self.tempoCompilacao = tempoCompilacao
+        self.tempoExecucao = tempoExecucao
+
+
+def executaJIT(modulo, otimizacao=None):
+    inicio = time.perf_counter()
+    maquina = maquinaJIT(NIVEIS_OTIMIZACAO.get(otimizacao, 2))
+    nativo = otimizaModulo(moduloVerificado(modulo, maquina), maquina, otimizacao)
+    motor = llvm.create_mcjit_compiler(nativo, maquina)
+    motor.finalize_object()
+    motor.run_static_constructors()
+    principal = modulo.get_global('principal')
+    tipo_retorno = ctypes.c_int32 if principal.return_value.type == ir.IntType(32) else None
+    funcao = ctypes.CFUNCTYPE(tipo_retorno)(motor.get_function_address('principal'))
+    compilado = time.perf_counter()
+
+    sys.stdout.flush()
+    status = funcao()
+    ctypes.CDLL(None).fflush(None)
+    fim = time.perf_counter()
+    return ResultadoJIT(status or 0, compilado - inicio, fim - compilado)
+
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~ SESSÃO DE COMPILAÇÃO ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+# as fases guardam o estado de uma compilação em globais do módulo (listas dos erros léxicos,
+# ERRO_SINTATICO, ARVORE_REDUZIDA, o coletor de diagnósticos, o índice da árvore, a tabela_raiz e o
+# guardaTipo). O CompilerSession compila vários fontes no mesmo processo: cada compile() começa com
+# um estado novo, coloca ele nas globais enquanto roda e devolve as globais como estavam, então
+# sessões diferentes (e o driver) não enxergam o estado umas das outras. As tabelas do lex/yacc são
+# carregadas uma vez por sessão. As compilações de todas as sessões passam por TRAVA_COMPILACAO
+# (uma de cada vez, mesmo com threads). O count e o dot do pdf da árvore continuam com o driver
+
+ESTADO_COMPILACAO = ('FECHA_CHAVES_SOLO', 'ABRE_CHAVES_LINHA', 'CARACTERES_INVALIDOS', 'ERRO_SINTATICO',
+                     'ARVORE_REDUZIDA', 'diagnosticos', 'indice_arvore', 'tabela_raiz', 'guardaTipo')
+
+TRAVA_COMPILACAO = threading.RLock()
+
+
+def estadoInicial():
+    return {'FECHA_CHAVES_SOLO': [], 'ABRE_CHAVES_LINHA': [], 'CARACTERES_INVALIDOS': [], 'ERRO_SINTATICO': False,
+            'ARVORE_REDUZIDA': False, 'diagnosticos': Diagnosticos(), 'indice_arvore': None,
+            'tabela_raiz': Table(nome="global"), 'guardaTipo': ""}
+
+
+# coloca o estado nas globais do módulo; na saída o estado fica com os valores finais das globais
+# (as fases trocam algumas delas de objeto) e as globais voltam ao que eram
+@contextlib.contextmanager
+def estadoDaCompilacao(estado):
+    modulo = globals()
+    with TRAVA_COMPILACAO:
+        anterior = {nome: modulo[nome] for nome in ESTADO_COMPILACAO}
+        modulo.update(estado)
+        try:
+            yield estado
+        finally:
+            estado.update((nome, modulo[nome]) for nome in ESTADO_COMPILACAO)
+            modulo.update(anterior)
+
+
+# léxico, sintático e semântico de um fonte, com o estado que estiver nas globais. Devolve a árvore
+# reduzida e o fluxo de tokens (que ainda pode ter tokens depois de um erro de sintaxe).
+# reducao_direta=False: monta a árvore concreta e reduz com o arv_reduzida do nani, que é recursivo
+# (um aninhamento profundo passa do limite de recursão do Python)
+# processos: verifica os corpos das funções em paralelo (recomecoParalelo; 0 usa todos os núcleos)
+def analisaFonte(data, lexer, parser, descendente=False, reducao_direta=True, processos=None):
+    global ARVORE_REDUZIDA
+    # o parser, os relatórios e a listagem de tokens usam o mesmo fluxo, o arquivo é lido uma vez
+    fluxo = FluxoTokens(lexer)
+    fluxo.input(data)
+
+    ARVORE_REDUZIDA = reducao_direta
+    result = parseia(fluxo, parser, descendente)
+    # funções, parametros, retornas e chamadas indexados uma vez para os passes seguintes
+    indiceDe(result)
+
+    if processos is not None:
+        recomecoParalelo(result, ARVORE_REDUZIDA, processos)
+    if ARVORE_REDUZIDA:
+        # a árvore do parser já é a reduzida: a análise semântica roda nela e não há cópia
+        if processos is None:
+            recomecoReduzida(result)
+        if result:
+            verificaTipoRetornaReduzida(result)
+    else:
+        if processos is None:
+            recomeco(result)
+        verificaTipoRetorna(result)  # só consigo fazer a verificação após ter a tabela de simbolo completa
+    tabela_raiz.procuraPelaMain()
+    # reduçao da arvore
+    reduzida = result if ARVORE_REDUZIDA else arv_reduzida(result)
+    # os avisos de variável não inicializada e não utilizada saem do fluxo de dados, que roda na
+    # árvore reduzida (a árvore de um programa com erro de sintaxe pode estar incompleta). Ele depende
+    # da forma da árvore que as ações do parser montam: com a árvore concreta os tokens passam de novo
+    # pelo parser com a redução direta, e a árvore do nani fica só para a geração de código
+    if reduzida is not None and not ERRO_SINTATICO:
+        if not ARVORE_REDUZIDA:
+            fluxo.reinicia()
+            ARVORE_REDUZIDA = True
+            try:
+                arvore_fluxo = parseia(fluxo, parser, descendente)
+            finally:
+                ARVORE_REDUZIDA = False
+            verificaFluxoDeDados(arvore_fluxo)
+        else:
+            verificaFluxoDeDados(reduzida)
+    else:
+        tabela_raiz.verificaVariaveisNaoUtilizadas()
+    return reduzida, fluxo
+
+
+def parseia(fluxo, parser, descendente):
+    if descendente:
+        return ParserDescendente(parser).parse(fluxo)
+    return parser.parse(lexer=fluxo)
+
+
+# erros gerados pelo analisador léxico, a partir das listas; devolve se houve algum
+def emiteErrosLexicos():
+    if FECHA_CHAVES_SOLO or ABRE_CHAVES_LINHA:
+        while FECHA_CHAVES_SOLO:
+            linha = FECHA_CHAVES_SOLO.pop()
+            diagnosticos.emite('chave-fechada-sem-abrir', 'Foi fechado \'}\', mas nao foi aberto! Linha:', linha,
+                               linha=linha)
+        while ABRE_CHAVES_LINHA:
+            linha = ABRE_CHAVES_LINHA.pop()
+            diagnosticos.emite('chave-aberta-sem-fechar', 'Foi aberto \'{\', mas nao foi fechado! Linha:', linha,
+                               linha=linha)
+        return True
+    if CARACTERES_INVALIDOS:
+        for caractere, linha in CARACTERES_INVALIDOS:
+            diagnosticos.emite('caractere-invalido', "Caractere Invalido: '%s', Linha: %s" % (caractere, linha),
+                               linha=linha)
+        return True
+    return False
+
+
+class ResultadoCompilacao():
+    # arvore: árvore reduzida; tabelas: a tabela global; diagnosticos: o coletor da compilação (nada
+    # foi escrito ainda); modulo: o ir.Module, None se não houve geração de código; tokens: BufferTokens
+    __slots__ = ('arvore', 'tabelas', 'diagnosticos', 'modulo', 'tokens', 'erroLexico', 'erroSintatico')
+
+    def __init__(self, arvore, tabelas, diagnosticos, modulo, tokens, erroLexico, erroSintatico):
+        self.arvore = arvore
+        self.tabelas = tabelas
+        self.diagnosticos = diagnosticos
+        self.modulo = modulo
+        self.tokens = tokens
+        self.erroLexico = erroLexico
+        self.erroSintatico = erroSintatico
+
+    # texto do LLVM IR (o mesmo que o -g grava no meu_modulo.ll)
+    @property
+    def ir(self):
+        return str(self.modulo) if self.modulo is not None else None
+
+    @property
+    def sucesso(self):
+        return not (self.erroLexico or self.erroSintatico or self.diagnosticos.erroSemantico)
+
+
+class CompilerSession():
+    # mesmas opções do driver (--lexer, --parser, --reducao-direta, --cache-dir, --semantico-paralelo);
+    # geraCodigo=False para ficar só na análise. Como no -g, o código só é gerado sem erro sintático nem
+    # semântico
+    def __init__(self, diretorio_cache=None, lexer='ply', parser='lalr', reducao_direta=True, geraCodigo=True,
+                 processos=None):
+        self.lexerPly, self.parser = constroiAnalisadores(diretorio_cache)
+        self.processos = processos
+        self.analisadorRapido = AnalisadorRapido() if lexer == 'rapido' else None
+        self.descendente = parser == 'descendente'
+        self.reducaoDireta = reducao_direta
+        self.geraCodigo = geraCodigo
+
+    def novoLexer(self):
+        if self.analisadorRapido is not None:
+            return self.analisadorRapido  # o input() volta a linha e o estado ao começo
+        # o input() do lexer do ply não volta a linha nem sai de um comentário aberto: cada fonte
+        # usa uma cópia do lexer como saiu do constroiAnalisadores
+        return self.lexerPly.clone()
+
+    def compile(self, fonte):
+        estado = estadoInicial()
+        with estadoDaCompilacao(estado):
+            arvore, fluxo = analisaFonte(fonte, self.novoLexer(), self.parser, self.descendente, self.reducaoDireta,
+                                         self.processos)
+            fluxo.esgota()  # lê o resto do fonte (erros léxicos depois de um erro de sintaxe)
+            erro_lexico = emiteErrosLexicos()
+            modulo = None
+            if self.geraCodigo and not ERRO_SINTATICO and not diagnosticos.erroSemantico:
+                modulo = KodoGen(arvore, arquivo_ll=None).module
+        return ResultadoCompilacao(arvore, estado['tabela_raiz'], estado['diagnosticos'], modulo, fluxo.tokens,
+                                   erro_lexico, estado['ERRO_SINTATICO'])
+
+
 # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~  メインコード ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
 
 
-# abre o arquivo e armazena o contéudo na variável data
-f = open(sys.argv[1], "r", encoding="utf-8")
-data = f.read()
-
-# analisador léxico
-lex.lex()
-lex.input(data)
-# log = logging.getLogger('ply')
-
-# analisador sintático
-parser = yacc.yacc(debug=True)
-
-# cria a árvore do graphviz para gerar o pdf
-dot = Digraph(comment='Arvore Sintatica')
-
-# faz o parser do sysArg
-parser_Args = argparse.ArgumentParser()
-parser_Args.add_argument("file")
-parser_Args.add_argument("-a", "--ast", help="Exibe a árvore sintática no terminal", action="store_true", default=False)
-parser_Args.add_argument("-p", "--pdf", help="Gera um pdf da árvore sintática", action="store_true", default=False)
-parser_Args.add_argument("-t", "--ts", help="Gera um pdf da árvore sintática", action="store_true", default=False)
-parser_Args.add_argument("-g", "--gc", help="Geração de código", action="store_true", default=False)
-parser_Args.add_argument("-r", "--run", help="Geração de código", action="store_true", default=False)
-
-args = vars(parser_Args.parse_args())
-
-result = parser.parse(data)
-recomeco(result)
-
-verificaTipoRetorna(result)  # só consigo fazer a verificação após ter a tabela de simbolo completa
-tabela_raiz.procuraPelaMain()
-tabela_raiz.verificaVariaveisNaoUtilizadas()
-# x = result
-# reduçao da arvore
-x = arv_reduzida(result)
-
-# percorre pra geracao de codigo
-
-
-# código para printar arvore sintática, caso seja digitado o comando Tree
-if (not ERRO_SINTATICO):
-    # print("Análise sintática realizada com sucesso")
-    if (args['ast']):
-        # a = inorderTraversal2(result)
-        a = inorderTraversal2(x)
-        DotExporter(a).to_dotfile("arvore.dot")  # picture gera img
-        for pre, _, node in RenderTree(a, style=DoubleStyle()):
-            print("%s%s" % (pre, node.name))
-    if (args['pdf']):
-        inorderTraversal3(x)  # mudar pra result para nao podar
-        dot.render('test-output/arvore', view=True)
-    if (args['ts']):
-        tabela_raiz.printaArvore()
-    if (args['gc']):
-        # print(semantic_error)
-        if semantic_error: 
-            exit(1)    
-        oi = KodoGen(x)
-
-    if (args['run']):
-        call(['llvm-as', 'meu_modulo.ll', '-o', 'meu_modulo.bc'])
-        call(['llc', 'meu_modulo.bc', '-o', 'meu_modulo.s', '--mtriple',
-              'x86_64-pc-linux-gnu'])
-        call(['gcc', 'meu_modulo.s', '-o', 'exec', '-no-pie'])
-        call(['./exec'])
-# exibição dos erros gerados pelo analisador léxico
-lista = []
-while True:
-    tok = lex.token()
-    if not tok: break
-    lista.append((tok.type, str(tok.value)))
-# parser.parse(tok)
-if FECHA_CHAVES_SOLO or ABRE_CHAVES_LINHA:
-    while FECHA_CHAVES_SOLO:
-        print('Foi fechado \'}\', mas nao foi aberto! Linha:', FECHA_CHAVES_SOLO.pop())
-    while ABRE_CHAVES_LINHA:
-        print('Foi aberto \'{\', mas nao foi fechado! Linha:', ABRE_CHAVES_LINHA.pop())
-
-elif CARACTERES_INVALIDOS:
-    for i in range(len(CARACTERES_INVALIDOS)):
-        print("Caractere Invalido: '%s', Linha: %s" % CARACTERES_INVALIDOS[i])
-
-# exibe a lista de tokens gerada pelo analisador léxico, necessário comentar o yacc para ver a lista
-else:
-    for i in range(len(lista)):
-        print(lista[i])
+if __name__ == '__main__':
+    # faz o parser do sysArg
+    parser_Args = argparse.ArgumentParser()
+    parser_Args.add_argument("file")
+    parser_Args.add_argument("-a", "--ast", help="Exibe a árvore sintática no terminal", action="store_true", default=False)
+    parser_Args.add_argument("-p", "--pdf", help="Gera um pdf da árvore sintática", action="store_true", default=False)
+    parser_Args.add_argument("-t", "--ts", help="Gera um pdf da árvore sintática", action="store_true", default=False)
+    parser_Args.add_argument("-g", "--gc", help="Geração de código", action="store_true", default=False)
+    parser_Args.add_argument("-r", "--run", help="Geração de código", action="store_true", default=False)
+    parser_Args.add_argument("--cache-dir", help="Diretório do cache das tabelas do lex/yacc", default=None)
+    parser_Args.add_argument("--sem-tokens", help="Não exibe a lista de tokens", action="store_true", default=False)
+    parser_Args.add_argument("--mmap", help="Mapeia o arquivo em memória (fontes muito grandes)",
+                             action="store_true", default=False)
+    parser_Args.add_argument("--parser", help="Analisador sintático usado (lalr ou descendente)",
+                             choices=["lalr", "descendente"], default="lalr")
+    parser_Args.add_argument("--reducao-direta", help="O parser já monta a árvore reduzida, sem a árvore concreta "
+                             "(padrão); --no-reducao-direta monta a concreta e reduz com o nani",
+                             action=argparse.BooleanOptionalAction, default=True)
+    parser_Args.add_argument("--cache-ast", help="Reaproveita a árvore e as tabelas se o arquivo não mudou",
+                             action="store_true", default=False)
+    parser_Args.add_argument("--cache-ast-limite", help="Tamanho máximo do cache de árvores em MB",
+                             type=float, default=LIMITE_CACHE_ARVORE_PADRAO)
+    parser_Args.add_argument("--lexer", help="Analisador léxico usado (ply ou rapido)", choices=["ply", "rapido"],
+                             default="ply")
+    parser_Args.add_argument("--diagnosticos", help="Formato dos erros e avisos (texto ou json, um por linha)",
+                             choices=["texto", "json"], default="texto")
+    parser_Args.add_argument("--limite-erros", help="Mostra no máximo N erros (0 é sem limite)", type=int, default=0)
+    parser_Args.add_argument("--suprime", help="Não mostra os diagnósticos com este código (pode repetir)",
+                             action="append", default=[], metavar="CODIGO")
+    parser_Args.add_argument("--sem-repeticao", help="Mostra uma vez só os diagnósticos repetidos",
+                             action="store_true", default=False)
+    parser_Args.add_argument("-O", help="Otimiza o módulo antes de emitir (-O0 a -O3, -Os); sem -O ele é emitido "
+                             "como foi gerado", dest="otimizacao", choices=["0", "1", "2", "3", "s"], default=None)
+    parser_Args.add_argument("--jit", help="Compila e executa o programa no próprio processo (sai com o status "
+                             "da principal)", action="store_true", default=False)
+    parser_Args.add_argument("--emite", help="Grava o módulo direto em meu_modulo.o ou meu_modulo.bc",
+                             choices=["o", "bc"], default=None)
+    parser_Args.add_argument("--semantico-paralelo", help="Verifica os corpos das funções em N processos "
+                             "(0 usa todos os núcleos)", type=int, default=None, metavar="N")
+
+    args = vars(parser_Args.parse_args())
+
+    # com --cache-ast um arquivo já compilado (mesmo conteúdo e mesma versão do compilador) não passa
+    # de novo pelo léxico, sintático e semântico
+    usa_cache_ast = args['cache_ast']
+    entrada_cache = None
+    if usa_cache_ast:
+        diretorio_arvores = os.path.join(args['cache_dir'] or DIRETORIO_CACHE_PADRAO, 'arvores')
+        if args['mmap']:
+            fonte = abreMapeado(args['file'])
+        else:
+            with open(args['file'], 'rb') as f:
+                fonte = f.read()
+        chave_arvore = chaveCacheArvore(fonte, args['reducao_direta'])
+        entrada_cache = carregaCacheArvore(diretorio_arvores, chave_arvore)
+
+    # cria a árvore do graphviz para gerar o pdf
+    dot = Digraph(comment='Arvore Sintatica')
+
+    opcoes_diagnosticos = {'formato': args['diagnosticos'], 'suprimidos': args['suprime'],
+                           'limiteErros': args['limite_erros'], 'semRepeticao': args['sem_repeticao']}
+    try:
+        if entrada_cache:
+            x = entrada_cache['arvore']
+            tabela_raiz = entrada_cache['tabelas']
+            diagnosticos.adicionaSerializados(entrada_cache['diagnosticos'])
+            CARACTERES_INVALIDOS.extend(entrada_cache['caracteres_invalidos'])
+            ABRE_CHAVES_LINHA.extend(entrada_cache['abre_chaves_linha'])
+            FECHA_CHAVES_SOLO.extend(entrada_cache['fecha_chaves_solo'])
+            fluxo = None
+        else:
+            # analisador léxico e sintático (tabelas vêm do cache quando a gramática não mudou)
+            lexer, parser = constroiAnalisadores(args['cache_dir'])
+            if args['mmap']:
+                # o texto não é lido para a memória, o lexer roda sobre o mapeamento do arquivo
+                data = abreMapeado(args['file'])
+                lexer = AnalisadorMapeado()
+            else:
+                # abre o arquivo e armazena o contéudo na variável data
+                f = open(args['file'], "r", encoding="utf-8")
+                data = f.read()
+                if args['lexer'] == 'rapido':
+                    lexer = AnalisadorRapido()
+            # log = logging.getLogger('ply')
+            x, fluxo = analisaFonte(data, lexer, parser, args['parser'] == 'descendente', args['reducao_direta'],
+                                    args['semantico_paralelo'])
+
+            # lê o resto do arquivo (erros léxicos depois de um erro de sintaxe também são mostrados)
+            fluxo.esgota()
+            # os diagnósticos da análise vão para o cache junto com a árvore (os léxicos saem das listas)
+            if usa_cache_ast and not ERRO_SINTATICO:
+                salvaCacheArvore(diretorio_arvores, chave_arvore, x, tabela_raiz, diagnosticos,
+                                 args['cache_ast_limite'])
+    except BaseException:
+        # a análise parou no meio: o que já foi encontrado sai antes do traceback
+        diagnosticos.escreve(**opcoes_diagnosticos)
+        raise
+
+    # erros gerados pelo analisador léxico
+    erro_lexico = emiteErrosLexicos()
+
+    # todos os erros e avisos numa escrita só
+    diagnosticos.escreve(**opcoes_diagnosticos)
+
+    # percorre pra geracao de codigo
+
+
+    # código para printar arvore sintática, caso seja digitado o comando Tree
+    if (not ERRO_SINTATICO):
+        # print("Análise sintática realizada com sucesso")
+        if (args['ast']):
+            # a = inorderTraversal2(result)
+            a = inorderTraversal2(x)
+            DotExporter(a).to_dotfile("arvore.dot")  # picture gera img
+            for pre, _, node in RenderTree(a, style=DoubleStyle()):
+                print("%s%s" % (pre, node.name))
+        if (args['pdf']):
+            inorderTraversal3(x)  # mudar pra result para nao podar
+            dot.render('test-output/arvore', view=True)
+        if (args['ts']):
+            tabela_raiz.printaArvore()
+        if (args['gc'] or args['emite'] or args['run'] or args['jit']):
+            if diagnosticos.erroSemantico:
+                exit(1)
+            # só o -g grava e exibe o meu_modulo.ll
+            oi = KodoGen(x) if args['gc'] else KodoGen(x, arquivo_ll=None)
+
+        if (args['emite']):
+            emiteModulo(oi.module, 'meu_modulo.' + args['emite'], args['emite'], otimizacao=args['otimizacao'])
+
+        if (args['run']):
+            # objeto gerado no processo, o gcc só liga
+            if args['emite'] != 'o':
+                emiteModulo(oi.module, 'meu_modulo.o', otimizacao=args['otimizacao'])
+            if ligaExecutavel('meu_modulo.o') == 0:
+                call(['./exec'])
+
+        if (args['jit']):
+            execucao = executaJIT(oi.module, args['otimizacao'])
+            print("[JIT] compilação: %.1f ms, execução: %.1f ms, status: %d" % (
+                execucao.tempoCompilacao * 1000, execucao.tempoExecucao * 1000, execucao.status), file=sys.stderr)
+            sys.exit(execucao.status)
+    # exibe a lista de tokens gerada pelo analisador léxico (os mesmos que o parser consumiu)
+    if not args['sem_tokens'] and not erro_lexico:
+        if fluxo is None:
+            # a árvore veio do cache: só o léxico roda de novo, para a listagem (o fonte não tem erro léxico,
+            # então as listas de erros não mudam)
+            fluxo = FluxoTokens(AnalisadorMapeado() if args['mmap'] else AnalisadorRapido())
+            fluxo.input(fonte if args['mmap'] else fonte.decode('utf-8'))
+        for tok in fluxo:
+            print((tok.type, str(tok.value)))
@@ -0,0 +1,7 @@
+# -*- coding: utf-8 -*-
+# os testes usam os mesmos auxiliares dos benchmarks (comum, gera_programa); o comum põe a raiz do
+# repositório no sys.path para o import do compilador
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'benchmarks'))
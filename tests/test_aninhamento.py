@@ -0,0 +1,29 @@
+# -*- coding: utf-8 -*-
+# um programa com aninhamento bem mais fundo que o limite de recursão do Python tem que compilar pelo
+# caminho padrão (sem opções), na sessão e no driver
+import os
+import subprocess
+import sys
+
+import comum
+import compilador
+from gera_programa import geraProgramaAninhado
+
+PROFUNDIDADE = 5 * sys.getrecursionlimit()
+
+
+def test_sessao_padrao():
+    resultado = compilador.CompilerSession().compile(geraProgramaAninhado(PROFUNDIDADE, 100))
+    assert resultado.sucesso, resultado.diagnosticos.formata()
+    assert resultado.modulo is not None
+
+
+def test_driver_padrao(tmp_path):
+    caminho = tmp_path / 'aninhado.tpp'
+    caminho.write_text(geraProgramaAninhado(PROFUNDIDADE, 100), encoding='utf-8')
+    # -g grava meu_modulo.ll no diretório atual
+    saida = subprocess.run([sys.executable, os.path.join(comum.DIRETORIO, 'compilador.py'), '-g', str(caminho)],
+                           cwd=tmp_path, stdout=subprocess.PIPE, stderr=subprocess.PIPE, universal_newlines=True)
+    assert saida.returncode == 0, saida.stderr
+    assert 'Error' not in saida.stderr
+    assert (tmp_path / 'meu_modulo.ll').exists()
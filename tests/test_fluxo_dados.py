@@ -0,0 +1,48 @@
+# -*- coding: utf-8 -*-
+# avisos de variável não inicializada e não utilizada (verificaFluxoDeDados) pelo caminho padrão, e o
+# caminho com a árvore concreta (reducao_direta=False) dando os mesmos avisos
+import comum  # noqa: F401 (põe a raiz do repositório no sys.path)
+import compilador
+
+# 'a' só é escrita dentro do se (sem senão), 'c' é lida no repita antes da primeira escrita, a global
+# 'g' nunca é escrita e 'y' nunca é lida
+FONTE = '''inteiro: g
+inteiro f(inteiro: p)
+  inteiro: a, b, c
+  se p > 0 então
+    a := 1
+  fim
+  repita
+    b := a
+    c := c + 1
+  até c > 10
+  retorna(b)
+fim
+
+inteiro principal()
+  inteiro: x, y
+  x := f(g)
+  retorna(x)
+fim
+'''
+
+ESPERADOS = [
+    ('variavel-nao-inicializada', 8),
+    ('variavel-nao-inicializada', 9),
+    ('variavel-nao-inicializada', 16),
+    ('variavel-nao-utilizada', 15),
+]
+
+
+def avisos(reducao_direta):
+    resultado = compilador.CompilerSession(reducao_direta=reducao_direta, geraCodigo=False).compile(FONTE)
+    return [(d.codigo, d.linha) for d in resultado.diagnosticos.lista]
+
+
+def test_caminho_padrao():
+    assert avisos(True) == ESPERADOS
+    assert compilador.CompilerSession().reducaoDireta
+
+
+def test_arvore_concreta():
+    assert avisos(False) == ESPERADOS
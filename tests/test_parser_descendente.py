@@ -0,0 +1,84 @@
+# -*- coding: utf-8 -*-
+# o ParserDescendente tem que montar exatamente a árvore do yacc, com as mesmas mensagens, na árvore
+# concreta e na reduzida. As entradas com erro de sintaxe e as fundas demais para a recursão do
+# descendente passam pelo fallback para o yacc
+import gc
+import sys
+
+import pytest
+
+from comum import fluxoDe, mesmaArvore
+from gera_programa import geraPrograma, geraProgramaAninhado
+import compilador
+
+# trechos que passam pelos casos menos comuns da gramática
+CASOS_VALIDOS = [
+    'inteiro: a, b[10], c[2][3]\nflutuante: f\n',
+    'a := 1\nb[2] := a + 3 * -4\n',
+    'inteiro f(inteiro: x[], flutuante: y[][], inteiro: z)\n  retorna(x[1] + z)\nfim\n',
+    'g()\n  h(1, 2 + 3, (4))\n  x := y := 2\nfim\n',
+    'inteiro principal()\n  se a > 1 && b <= 2 entao\n    se c = 3 entao\n      escreva(c)\n    fim\n'
+    '  senão\n    leia(d[1])\n  fim\n  repita\n    a := a - 1\n    - 2\n  até a <> 0\n  retorna(0)\nfim\n',
+    'inteiro principal()\n  a := (1 + 2) * (3 / (4 - -5))\n  f(a) g(b) + 1\n  x\n  2.5\nfim\n',
+    'flutuante h(inteiro: v)\n  inteiro: i\n  repita i := i + 1 até i >= v * 2 || i = 0\nfim\n',
+    geraPrograma(20),
+]
+
+# entradas com erro de sintaxe: o descendente devolve para o yacc, então as mensagens têm que bater
+CASOS_INVALIDOS = [
+    '',
+    'inteiro: \n',
+    'inteiro principal()\n  a := \nfim\n',
+    'inteiro principal()\n  se a entao\n    b := 1\n',
+    'inteiro principal()\n  retorna()\n  escreva()\nfim\n',
+    'f(, inteiro: x)\nfim\n',
+    'a + b := 3\n',
+]
+
+# válidas, mas fundas demais para o descendente (RecursionError): também voltam para o yacc
+CASOS_FUNDOS = [
+    geraProgramaAninhado(2 * sys.getrecursionlimit(), 10),
+    'inteiro principal()\n  a := %s1%s\nfim\n' % ('(' * sys.getrecursionlimit(), ')' * sys.getrecursionlimit()),
+]
+
+CASOS = [pytest.param(caso, id='%s%d' % (nome, i))
+         for nome, casos in (('valido', CASOS_VALIDOS), ('invalido', CASOS_INVALIDOS), ('fundo', CASOS_FUNDOS))
+         for i, caso in enumerate(casos)]
+
+_, PARSER_YACC = compilador.constroiAnalisadores()
+
+
+def analisa(parser, fluxo, reduzida):
+    fluxo.reinicia()
+    with compilador.estadoDaCompilacao(compilador.estadoInicial()) as estado:
+        compilador.ARVORE_REDUZIDA = reduzida
+        if parser is PARSER_YACC:
+            arvore = parser.parse(lexer=fluxo)
+        else:
+            arvore = parser.parse(fluxo)
+    return arvore, estado['diagnosticos'].formata(), estado['ERRO_SINTATICO']
+
+
+@pytest.mark.parametrize('reduzida', [False, True], ids=['concreta', 'reduzida'])
+@pytest.mark.parametrize('caso', CASOS)
+def test_mesma_arvore_do_yacc(caso, reduzida):
+    fluxo = fluxoDe(compilador, caso)
+    arvore, saida, erro = analisa(PARSER_YACC, fluxo, reduzida)
+    arvore_rd, saida_rd, erro_rd = analisa(compilador.ParserDescendente(PARSER_YACC), fluxo, reduzida)
+    assert mesmaArvore(arvore, arvore_rd)
+    assert saida == saida_rd
+    assert erro == erro_rd
+
+
+# sem o yacc para voltar, o descendente não dá conta das entradas fundas
+@pytest.mark.parametrize('caso', CASOS_FUNDOS, ids=['aninhado', 'parenteses'])
+def test_fundos_passam_do_limite_do_descendente(caso):
+    with pytest.raises(RecursionError):
+        analisa(compilador.ParserDescendente(), fluxoDe(compilador, caso), True)
+
+
+def test_coletor_volta_depois_do_fallback():
+    fluxo = fluxoDe(compilador, CASOS_INVALIDOS[2])
+    assert gc.isenabled()
+    analisa(compilador.ParserDescendente(PARSER_YACC), fluxo, False)
+    assert gc.isenabled()
@@ -0,0 +1,63 @@
+# -*- coding: utf-8 -*-
+# a análise com os corpos das funções em processos (--semantico-paralelo) tem que dar os mesmos
+# diagnósticos, na mesma ordem, e as mesmas tabelas de símbolos que a serial
+import contextlib
+import io
+
+import pytest
+
+import comum  # noqa: F401 (põe a raiz do repositório no sys.path)
+import compilador
+from gera_programa import geraPrograma
+
+
+# declarações globais no meio das funções, nomes repetidos, globais usadas antes de declaradas e
+# chamadas com tipos e quantidades erradas: cada processo tem que ver só as globais de antes da função
+def geraProgramaComErros(numero_funcoes):
+    partes = ['inteiro: g0', '']
+    for i in range(numero_funcoes):
+        if i % 5 == 0:
+            partes.append('flutuante: g%d' % (i + 1))
+        if i % 7 == 0:
+            partes.append('inteiro: g%d' % i)
+        partes += [
+            'inteiro f%d(inteiro: a, flutuante: b[])' % (i % 23),
+            '  inteiro: x, y',
+            '  flutuante: x',
+            '  x := a + g%d' % (i + 1),
+            '  g0 := b[0]',
+            '  z := f%d(x)' % ((i * 3) % 23),
+            '  se x > y então',
+            '    retorna(1.5)',
+            '  fim',
+            '  retorna(x)',
+            'fim',
+            '',
+        ]
+    partes += ['inteiro principal()', '  retorna(f0(1, 2.0))', 'fim', '']
+    return '\n'.join(partes)
+
+
+PROGRAMAS = {
+    'gerado': geraPrograma(40),
+    'com_erros': geraProgramaComErros(60),
+}
+
+
+def analisa(fonte, reduzida, processos):
+    sessao = compilador.CompilerSession(reducao_direta=reduzida, geraCodigo=False, processos=processos)
+    resultado = sessao.compile(fonte)
+    saida = io.StringIO()
+    with contextlib.redirect_stdout(saida):
+        resultado.tabelas.printaArvore()
+    return resultado.diagnosticos.formata(), saida.getvalue()
+
+
+@pytest.mark.parametrize('reduzida', [False, True], ids=['concreta', 'reduzida'])
+@pytest.mark.parametrize('nome', sorted(PROGRAMAS))
+def test_paralelo_igual_ao_serial(nome, reduzida):
+    fonte = PROGRAMAS[nome]
+    serial = analisa(fonte, reduzida, None)
+    assert serial[0]  # o programa tem que exercitar os diagnósticos
+    for processos in (1, 3):
+        assert analisa(fonte, reduzida, processos) == serial